@@ -0,0 +1,105 @@
+import threading
+from time import perf_counter
+
+
+class ComputerMoveWorker:
+    """
+    Computes the computer's move on a background thread, so a UI loop can keep running.
+
+    The UI starts the search with start(), then calls poll() every frame until it returns the column.
+    cancel() (or an expired timeout) asks the engine to stop, and it answers with the best move it
+    has so far instead of the full-depth one.
+    """
+
+    def __init__(self, computer_player, timeout_ms=None):
+        """
+        :param computer_player: The ComputerPlayer whose move is computed.
+        :param timeout_ms: Stop the search after this many milliseconds; None lets it run to the end.
+        """
+        self._computer_player = computer_player
+        self._timeout_ms = timeout_ms
+        self._thread = None
+        self._column = None
+        self._error = None
+        self._started_at = None
+        self._ready = False  # the result is known without a thread (start_with_result)
+
+    @property
+    def is_thinking(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def elapsed_ms(self):
+        if self._started_at is None:
+            return 0.0
+        return (perf_counter() - self._started_at) * 1000
+
+    def start(self, difficulty, opponent_color, time_budget_ms=None):
+        """
+        Start computing the move for a difficulty level (1-easy, 2-medium, 3-hard).
+        """
+        if self.is_thinking:
+            raise RuntimeError("The computer is already thinking.")
+        self._column = None
+        self._error = None
+        self._ready = False
+        self._started_at = perf_counter()
+        self._thread = threading.Thread(target=self._run, args=(difficulty, opponent_color, time_budget_ms),
+                                        daemon=True)
+        self._thread.start()
+
+    def start_with_result(self, column):
+        """
+        Start a "search" whose move is already known (a pondered one): poll() returns it right away.
+        """
+        if self.is_thinking:
+            raise RuntimeError("The computer is already thinking.")
+        self._column = column
+        self._error = None
+        self._started_at = perf_counter()
+        self._thread = None
+        self._ready = True
+
+    def _run(self, difficulty, opponent_color, time_budget_ms):
+        try:
+            if difficulty == 1:
+                self._column = self._computer_player.easy_difficulty()
+            elif difficulty == 2:
+                self._column = self._computer_player.medium_difficulty(opponent_color)
+            else:
+                self._column = self._computer_player.hard_difficulty(time_budget_ms=time_budget_ms)
+        except Exception as error:
+            self._error = error
+
+    def poll(self):
+        """
+        Check on the search without blocking.
+        :return: The chosen column once the search is over, None while it is still running.
+        """
+        if self._thread is None:
+            if not self._ready:
+                return None
+            self._ready = False
+            return self._column
+        if self._thread.is_alive():
+            if self._timeout_ms is not None and self.elapsed_ms > self._timeout_ms:
+                self._computer_player.request_stop()
+            return None
+        self._thread = None
+        if self._error is not None:
+            raise self._error
+        return self._column
+
+    def cancel(self):
+        """
+        Ask the running search to stop; the next poll() returns its best move so far.
+        """
+        if self.is_thinking:
+            self._computer_player.request_stop()
+
+    def wait(self, timeout=None):
+        """
+        Block until the search ends (used when the UI shuts down).
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
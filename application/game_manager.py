@@ -2,27 +2,42 @@ from core.player import Player
 from core.board import Board
 from core.computer import ComputerPlayer
 from core.color_class import Color
+from application.ponder import Ponderer
 from exceptions.exceptions import OutOfBoundsExceptions, ColumnFilled
 import time
 
 class ConnectFourApp:
-    def __init__(self):
+    def __init__(self, workers=1, ponder=False):
+        """
+        :param workers: Number of processes the computer may use for its hard difficulty search.
+        :param ponder: Let the hard computer search on the human's time (see application.ponder).
+        """
         self.board = Board()
+        self.workers = workers
+        self.ponder = ponder
+        self.ponderer = None
         self.human_player = None
         self.computer_player = None
         self.current_player = None
+        self.computer_color = None
         self.is_running = True
         self.difficulty = None
 
-    def setup_game(self, player_color, difficulty):
+    def setup_game(self, player_color, difficulty, local_computer=True):
         """
         Set up the game: assign colors and initialize players.
+        :param local_computer: Build the ComputerPlayer. False leaves computer_player None: the
+            computer's moves are searched elsewhere (see application.server) and given to play_computer_move.
         """
         self.human_player = Player(self.board, player_color)
-        self.computer_player = ComputerPlayer(self.board)
-        self.computer_player.set_color(Color.WHITE)  # Set computer player color to WHITE
+        self.computer_color = Color.WHITE  # Set computer player color to WHITE
+        if local_computer:
+            self.computer_player = ComputerPlayer(self.board, workers=self.workers, opponent_color=player_color)
+            self.computer_player.set_color(self.computer_color)
         self.current_player = self.human_player
         self.difficulty = difficulty
+        if self.ponder and difficulty == 3 and local_computer:
+            self.ponderer = Ponderer(self.computer_player)
 
     def play_turn(self):
         """
@@ -46,9 +61,48 @@ class ConnectFourApp:
             elif self.difficulty == 2:
                 column = self.computer_player.medium_difficulty(self.human_player.color)
             elif self.difficulty == 3:
-                column = self.computer_player.hard_difficulty()
+                column = self.ponderer.take(self.board) if self.ponderer is not None else None
+                if column is None:
+                    column = self.computer_player.hard_difficulty()
 
             self.board.place_disc(column, self.computer_player.color)
+            if self.ponderer is not None:
+                self.ponderer.start(self.board, self.human_player.color)
+
+    def play_human_move(self, column):
+        """
+        Play a move of the human player without any input or output.
+        :raises OutOfBoundsExceptions, ColumnFilled: The move is not legal; the board is left unchanged.
+        :return: The outcome after the move (see outcome).
+        """
+        self.board.place_disc(column, self.human_player.color)
+        return self._end_turn()
+
+    def play_computer_move(self, column):
+        """
+        Play a move of the computer chosen outside of play_turn, without any input or output.
+        :return: The outcome after the move (see outcome).
+        """
+        self.board.place_disc(column, self.computer_color)
+        return self._end_turn()
+
+    def _end_turn(self):
+        result = self.outcome()
+        if result is not None:
+            self.is_running = False
+        return result
+
+    def outcome(self):
+        """
+        The result of the game so far, without printing anything.
+        :return: None while the game goes on, "win" if the human won, "loss" if the computer won, "draw".
+        """
+        if self.board.check_last_move_victory():
+            row, column = self.board.last_move
+            return "win" if self.board.get_element(row, column) == self.human_player.color else "loss"
+        if self.board.is_full():
+            return "draw"
+        return None
 
     def switch_player(self):
         """
@@ -60,7 +114,8 @@ class ConnectFourApp:
         """
         Check if the game has ended with a win or a draw.
         """
-        if self.board.check_victory(self.current_player.color):
+        if self.board.check_last_move_victory():
+            self.stop_pondering()
             print(self.board)
             if isinstance(self.current_player, Player):
                 print("Congratulations! You won! :)")
@@ -70,10 +125,15 @@ class ConnectFourApp:
             return
 
         if self.board.is_full():
+            self.stop_pondering()
             print(self.board)
             print("The game is a draw!")
             self.is_running = False
 
+    def stop_pondering(self):
+        if self.ponderer is not None:
+            self.ponderer.stop()
+
     def check_draw(self):
         """
         Check if the game is a draw.
@@ -0,0 +1,109 @@
+import threading
+
+
+class Ponderer:
+    """
+    Searches on the opponent's time.
+
+    Once the computer has moved, start() searches the computer's answer to the opponent's replies
+    on a background thread, the most likely replies first, with the same settings as the real
+    search. When the opponent has moved, take() stops the thread and returns the answer to the
+    move actually played if it was searched to the end; the other answers are dropped. Either
+    way the real search finds a transposition table warmed up by the pondering, since the
+    pondering player is a fork of the computer player sharing its table and move orderer.
+    """
+
+    def __init__(self, computer_player, replies=None):
+        """
+        :param computer_player: The ComputerPlayer to ponder for; it must not search while pondering runs.
+        :param replies: How many of the most likely replies to search; None searches all of them.
+        """
+        self._computer_player = computer_player
+        self._replies = replies
+        self._thread = None
+        self._player = None  # fork of the computer player searching on a copy of the board
+        self._stop = threading.Event()
+        self._results = {}  # Zobrist hash of the position after a reply -> computer's answer
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def is_pondering(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def answers_ready(self):
+        """
+        The number of replies whose answer is already computed.
+        """
+        return len(self._results)
+
+    def start(self, board, opponent_color, depth=3, time_budget_ms=None):
+        """
+        Start pondering on a position where the opponent is to move.
+        :param depth: Depth of the real hard_difficulty search.
+        :param time_budget_ms: Time budget of the real hard_difficulty search.
+        """
+        self.stop()
+        self._results = {}
+        if board.is_full() or board.check_last_move_victory():
+            return
+        self._stop.clear()
+        self._player = self._computer_player.fork(board.copy())
+        self._thread = threading.Thread(target=self._run, args=(self._player, opponent_color, depth, time_budget_ms),
+                                        daemon=True)
+        self._thread.start()
+
+    def likely_replies(self, player, opponent_color):
+        """
+        Order the opponent's replies: the one the last search expected first, then the replies
+        leaving the computer the worst evaluation.
+        """
+        board = player.board
+        expected = player.expected_reply()
+        scored = []
+        for col in range(board.columns):
+            if not player.is_valid_move(col):
+                continue
+            board.place_disc(col, opponent_color)
+            score = -float("inf") if board.check_last_move_victory() else player.evaluate_board(board)
+            board.undo_move(col)
+            scored.append((col != expected, score, col))
+        replies = [col for _, _, col in sorted(scored)]
+        return replies if self._replies is None else replies[:self._replies]
+
+    def _run(self, player, opponent_color, depth, time_budget_ms):
+        board = player.board
+        for reply in self.likely_replies(player, opponent_color):
+            if self._stop.is_set():
+                return
+            board.place_disc(reply, opponent_color)
+            if not board.check_last_move_victory() and not board.is_full():
+                column = player.hard_difficulty(depth, time_budget_ms=time_budget_ms)
+                if self._stop.is_set():  # interrupted: the answer is only the fallback move
+                    return
+                self._results[board.zobrist_hash] = column
+            board.undo_move(reply)
+
+    def stop(self):
+        """
+        Stop pondering and wait for the background search to return.
+        """
+        self._stop.set()
+        while self._thread is not None and self._thread.is_alive():
+            self._player.request_stop()  # again each time: hard_difficulty clears the request when it starts
+            self._thread.join(0.01)
+        self._thread = None
+
+    def take(self, board):
+        """
+        Stop pondering and return the computer's answer to the position reached, or None when it was not searched.
+        """
+        self.stop()
+        column = self._results.get(board.zobrist_hash)
+        self._results = {}
+        if column is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return column
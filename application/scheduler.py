@@ -0,0 +1,153 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class LevelPolicy:
+    """
+    The bounds of the searches of one difficulty level: whatever the load, a search gets at
+    least min_ms and searches at least min_depth plies (its guaranteed strength), and it never
+    gets more than max_ms.
+    """
+
+    def __init__(self, min_depth, min_ms, max_ms):
+        if not 0 < min_ms <= max_ms:
+            raise ValueError("A level needs 0 < min_ms <= max_ms.")
+        if min_depth < 1:
+            raise ValueError("A level searches at least one ply.")
+        self.min_depth = min_depth
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+
+
+class SearchGrant:
+    """
+    What the scheduler allows one search: a time budget and a minimum depth.
+    """
+
+    def __init__(self, difficulty, time_budget_ms, min_depth, queue_depth):
+        self.difficulty = difficulty
+        self.time_budget_ms = time_budget_ms
+        self.min_depth = min_depth
+        self.queue_depth = queue_depth  # searches active when it was granted, this one included
+        self.started_at = perf_counter()
+
+    @property
+    def elapsed_ms(self):
+        return (perf_counter() - self.started_at) * 1000
+
+    def __repr__(self):
+        return f"SearchGrant({self.time_budget_ms:.0f} ms, min depth {self.min_depth}, queue {self.queue_depth})"
+
+
+class SearchScheduler:
+    """
+    Shares a global CPU budget among the computer searches running at the same time.
+
+    There are `slots` searches' worth of CPU (processes or cores), and every search should be
+    answered within target_latency_ms, its wait in the queue included. With N searches active,
+    each one gets target_latency_ms * slots / N milliseconds, kept within the bounds of its
+    level. A deep queue gets short budgets, so the moves stay fast. An idle machine gives the
+    level's max_ms. The minimum depth of a level is always searched, so under any load a hard
+    computer plays at least that well.
+
+    Searches of levels without a policy (the easy and medium ones, which take microseconds) are
+    neither counted nor limited. The scheduler is thread-safe.
+    """
+    DEFAULT_POLICIES = {3: LevelPolicy(min_depth=4, min_ms=20, max_ms=1000)}
+
+    def __init__(self, slots=1, target_latency_ms=500, policies=None, history=1000):
+        """
+        :param slots: Number of searches the machine runs at full speed at the same time.
+        :param target_latency_ms: Time to answer a move, its wait in the queue included.
+        :param policies: dict difficulty -> LevelPolicy (DEFAULT_POLICIES when omitted).
+        :param history: Number of recent grants kept for the metrics.
+        """
+        if slots < 1:
+            raise ValueError("The scheduler needs at least one slot.")
+        self.slots = slots
+        self.target_latency_ms = target_latency_ms
+        self.policies = dict(self.DEFAULT_POLICIES if policies is None else policies)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._peak = 0
+        self._grants = 0
+        self._recent = deque(maxlen=history)  # (granted ms, ms from grant to release) of the last searches
+
+    @property
+    def queue_depth(self):
+        """
+        The number of scheduled searches running or waiting.
+        """
+        return self._active
+
+    def acquire(self, difficulty):
+        """
+        Count a new search and return its SearchGrant, or None for a level without a policy.
+        Every grant must be given back with release.
+        """
+        policy = self.policies.get(difficulty)
+        if policy is None:
+            return None
+        with self._lock:
+            self._active += 1
+            self._grants += 1
+            self._peak = max(self._peak, self._active)
+            active = self._active
+        share = self.target_latency_ms * self.slots / active
+        return SearchGrant(difficulty, min(policy.max_ms, max(policy.min_ms, share)), policy.min_depth, active)
+
+    def release(self, grant):
+        """
+        Count a search as finished.
+        """
+        if grant is None:
+            return
+        with self._lock:
+            self._active -= 1
+            self._recent.append((grant.time_budget_ms, grant.elapsed_ms))
+
+    @contextmanager
+    def search(self, difficulty):
+        """
+        acquire and release around a with block.
+        """
+        grant = self.acquire(difficulty)
+        try:
+            yield grant
+        finally:
+            self.release(grant)
+
+    def play(self, player, difficulty, opponent_color):
+        """
+        Return a ComputerPlayer's move at a difficulty level, the hard search within its grant.
+        """
+        if difficulty == 1:
+            return player.easy_difficulty()
+        if difficulty == 2:
+            return player.medium_difficulty(opponent_color)
+        with self.search(difficulty) as grant:
+            if grant is None:
+                return player.hard_difficulty()
+            return player.hard_difficulty(time_budget_ms=grant.time_budget_ms, min_depth=grant.min_depth)
+
+    def metrics(self):
+        """
+        Return the queue depth, and the budgets granted to the recent searches with the time they
+        took from grant to release, queueing included, to compare with target_latency_ms (in milliseconds).
+        """
+        with self._lock:
+            recent = list(self._recent)
+            metrics = {"queue_depth": self._active, "peak_queue_depth": self._peak, "grants": self._grants}
+        granted = sorted(budget for budget, _ in recent)
+        latencies = sorted(elapsed for _, elapsed in recent)
+        metrics.update({
+            "granted_ms_mean": sum(granted) / len(granted) if granted else 0.0,
+            "granted_ms_min": granted[0] if granted else 0.0,
+            "granted_ms_median": granted[len(granted) // 2] if granted else 0.0,
+            "granted_ms_max": granted[-1] if granted else 0.0,
+            "latency_ms_mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_ms_max": latencies[-1] if latencies else 0.0,
+        })
+        return metrics
@@ -0,0 +1,252 @@
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import combinations
+from time import perf_counter
+
+from core.board import Board
+from core.computer import ComputerPlayer
+from core.color_class import Color
+from core.position import position_key, position_moves
+from core.search_options import SearchOptions
+
+
+def easy_strategy(player, opponent_color):
+    return player.easy_difficulty()
+
+
+def medium_strategy(player, opponent_color):
+    return player.medium_difficulty(opponent_color)
+
+
+def hard_strategy(player, opponent_color, depth=3, time_budget_ms=None, options=None):
+    if options is not None:
+        player.search_options = options
+    return player.hard_difficulty(depth, time_budget_ms=time_budget_ms)
+
+
+def mcts_strategy(player, opponent_color, playouts=None, time_budget_ms=None):
+    return player.monte_carlo(playouts, time_budget_ms)
+
+
+def strategy_name(strategy):
+    """
+    Readable name of a strategy, e.g. "hard(depth=5)" for partial(hard_strategy, depth=5).
+    """
+    if isinstance(strategy, partial):
+        arguments = ", ".join(f"{key}={value}" for key, value in strategy.keywords.items())
+        return f"{strategy_name(strategy.func)}({arguments})"
+    return getattr(strategy, "__name__", repr(strategy)).replace("_strategy", "")
+
+
+def parse_strategy(text):
+    """
+    Build a strategy from its command-line form: "easy", "medium", "hard", "hard:5" (depth)
+    or "hard:t200" (200 ms per move), optionally followed by search options for the hard level,
+    e.g. "hard:t200:+lmr" or "hard:6:classic" (see SearchOptions.parse). Monte Carlo tree search
+    is "mcts", "mcts:5000" (playouts) or "mcts:t200".
+    """
+    name, _, argument = text.partition(":")
+    argument, _, options = argument.partition(":")
+    if name == "easy":
+        return easy_strategy
+    if name == "medium":
+        return medium_strategy
+    if name == "hard":
+        keywords = {"options": SearchOptions.parse(options)} if options else {}
+        if argument.startswith("t"):
+            keywords["time_budget_ms"] = float(argument[1:])
+        elif argument:
+            keywords["depth"] = int(argument)
+        return partial(hard_strategy, **keywords) if keywords else hard_strategy
+    if name == "mcts":
+        if argument.startswith("t"):
+            return partial(mcts_strategy, time_budget_ms=float(argument[1:]))
+        return partial(mcts_strategy, playouts=int(argument)) if argument else mcts_strategy
+    raise ValueError(f"Unknown strategy: {text}")
+
+
+def play_game(first_strategy, second_strategy, rows=6, columns=7, seed=None):
+    """
+    Play one game between two computer strategies, without any input or output.
+    Each strategy is called as strategy(player, opponent_color) and returns a column.
+    :return: dict with the winner (0 for the first strategy, 1 for the second, None for a draw),
+             the number of moves, the move string and key of the final position (see core.position),
+             and per strategy the time spent, the moves played and the nodes searched (playouts for mcts).
+    """
+    if seed is not None:
+        random.seed(seed)
+    board = Board(rows, columns)
+    players = []
+    for color, opponent_color in ((Color.WHITE, Color.RED), (Color.RED, Color.WHITE)):
+        player = ComputerPlayer(board, opponent_color=opponent_color)
+        player.set_color(color)
+        players.append(player)
+    strategies = (first_strategy, second_strategy)
+    seconds = [0.0, 0.0]
+    moves = [0, 0]
+    nodes = [0, 0]
+    winner = None
+    turn = 0
+    while not board.is_full():
+        player = players[turn]
+        start = perf_counter()
+        column = strategies[turn](player, players[1 - turn].color)
+        seconds[turn] += perf_counter() - start
+        nodes[turn] += player.nodes_searched  # stays 0 for the strategies that do not search
+        moves[turn] += 1
+        board.place_disc(column, player.color)
+        if board.check_last_move_victory():
+            winner = turn
+            break
+        turn = 1 - turn
+    return {"winner": winner, "moves": board.move_count, "seconds": seconds, "moves_played": moves, "nodes": nodes,
+            "history": position_moves(board), "key": position_key(board, Color.WHITE)}
+
+
+def _play_pairing(pairing):
+    """
+    Worker of run_match: play one game, swapping sides on odd game numbers so both strategies start equally often.
+    """
+    strategy_a, strategy_b, rows, columns, game_number, seed = pairing
+    if game_number % 2 == 0:
+        result = play_game(strategy_a, strategy_b, rows, columns, seed)
+    else:
+        result = play_game(strategy_b, strategy_a, rows, columns, seed)
+        result["winner"] = None if result["winner"] is None else 1 - result["winner"]
+        for key in ("seconds", "moves_played", "nodes"):
+            result[key].reverse()
+    return result
+
+
+class MatchResult:
+    """
+    Totals of a match between two strategies, from the point of view of the first one.
+    """
+
+    def __init__(self, name_a, name_b):
+        self.names = (name_a, name_b)
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.seconds = [0.0, 0.0]
+        self.moves = [0, 0]
+        self.nodes = [0, 0]
+
+    def add(self, game):
+        if game["winner"] is None:
+            self.draws += 1
+        elif game["winner"] == 0:
+            self.wins += 1
+        else:
+            self.losses += 1
+        for side in (0, 1):
+            self.seconds[side] += game["seconds"][side]
+            self.moves[side] += game["moves_played"][side]
+            self.nodes[side] += game["nodes"][side]
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def average_move_ms(self, side):
+        return self.seconds[side] * 1000 / self.moves[side] if self.moves[side] else 0.0
+
+    def nodes_per_second(self, side):
+        return self.nodes[side] / self.seconds[side] if self.seconds[side] else 0.0
+
+    def to_dict(self):
+        return {
+            "strategies": list(self.names),
+            "games": self.games,
+            "wins": self.wins,
+            "draws": self.draws,
+            "losses": self.losses,
+            "average_move_ms": [self.average_move_ms(0), self.average_move_ms(1)],
+            "nodes_per_second": [self.nodes_per_second(0), self.nodes_per_second(1)],
+        }
+
+
+def run_match(strategy_a, strategy_b, games, workers=1, rows=6, columns=7, seed=0, pool=None, archive=None):
+    """
+    Play `games` games between two strategies, each starting half of them.
+    :param workers: Number of processes; 1 plays every game in this process.
+    :param pool: An executor to reuse instead of starting one.
+    :param archive: A core.position_store.PositionStore to append every game to.
+    """
+    result = MatchResult(strategy_name(strategy_a), strategy_name(strategy_b))
+    pairings = [(strategy_a, strategy_b, rows, columns, number, seed + number) for number in range(games)]
+    if pool is None and workers <= 1:
+        games_played = map(_play_pairing, pairings)
+    elif pool is not None:
+        games_played = pool.map(_play_pairing, pairings, chunksize=max(1, games // (4 * workers)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as own_pool:
+            games_played = list(own_pool.map(_play_pairing, pairings, chunksize=max(1, games // (4 * workers))))
+    for game in games_played:
+        result.add(game)
+        if archive is not None:
+            # the last player to move won, so the parity of the game length tells which one
+            outcome = 0 if game["winner"] is None else (1 if game["moves"] % 2 else -1)
+            archive.append_game(game["key"], game["history"], outcome)
+    return result
+
+
+def run_tournament(strategies, games, workers=1, rows=6, columns=7, seed=0, archive=None):
+    """
+    Play a match between every pair of strategies.
+    :param strategies: List of strategy functions.
+    :param archive: A core.position_store.PositionStore to append every game to.
+    :return: List of MatchResult, one per pair.
+    """
+    results = []
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for strategy_a, strategy_b in combinations(strategies, 2):
+            results.append(run_match(strategy_a, strategy_b, games, workers, rows, columns, seed, pool, archive))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
+
+
+def format_results(results):
+    """
+    Render match results as a text table.
+    """
+    lines = [f"{'strategy A':<24}{'strategy B':<24}{'W':>6}{'D':>6}{'L':>6}{'ms/move A':>11}{'ms/move B':>11}"
+             f"{'nps A':>10}{'nps B':>10}"]
+    for result in results:
+        lines.append(f"{result.names[0]:<24}{result.names[1]:<24}{result.wins:>6}{result.draws:>6}{result.losses:>6}"
+                     f"{result.average_move_ms(0):>11.2f}{result.average_move_ms(1):>11.2f}"
+                     f"{result.nodes_per_second(0):>10.0f}{result.nodes_per_second(1):>10.0f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Play computer-vs-computer Connect Four matches.")
+    parser.add_argument("strategies", nargs="+", help='e.g. easy medium hard:4 hard:t200 hard:t200:classic mcts:t200')
+    parser.add_argument("--games", type=int, default=100, help="Games per pair of strategies.")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to write the results to.")
+    parser.add_argument("--archive", help="Position store to append the games to.")
+    arguments = parser.parse_args()
+
+    game_archive = None
+    if arguments.archive:
+        from core.position_store import PositionStore
+        game_archive = PositionStore(arguments.archive)
+    try:
+        match_results = run_tournament([parse_strategy(text) for text in arguments.strategies], arguments.games,
+                                       arguments.workers, seed=arguments.seed, archive=game_archive)
+    finally:
+        if game_archive is not None:
+            game_archive.close()
+    print(format_results(match_results))
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            json.dump([result.to_dict() for result in match_results], output, indent=2)
@@ -0,0 +1,404 @@
+"""
+Game server: many Connect Four games in one process, over a line-based TCP protocol.
+
+Every game is a ConnectFourApp kept in memory without a ComputerPlayer of its own; the hard
+computer's moves are searched in a bounded process pool, so a slow search never stalls the
+event loop, each worker keeping one core.engine.Engine for all the games it serves. The easy
+and medium ones (a few microseconds) are played inline.
+
+Protocol: one command per line, one reply line per command, in order.
+
+    NEW <difficulty> [human|computer]  ->  SESSION <id> [<computer's first column>]
+    MOVE <id> <column>                 ->  MOVED <computer's column or -> <playing|win|loss|draw>
+    BOARD <id>                         ->  BOARD <moves played, as a core.position move string>
+    END <id>                           ->  OK
+    STATS                              ->  STATS <name>=<value> ...
+    PING                               ->  PONG
+
+Errors are answered with ERR <code> <message>. The codes are bad-request, unknown-session,
+illegal-move, over (the game is finished), full (too many sessions) and busy. Busy means
+the search queue is full or the session already has a move in progress. Nothing was played
+then, so the client may send the same command again a little later.
+
+Backpressure: a connection's next line is only read once the reply to the previous one is
+written out, and at most max_pending searches wait for or run in the pool. Past that, moves
+are refused with ERR busy instead of queueing without limit. Sessions idle for session_timeout
+seconds are dropped, and so are connections that stay silent that long. A search that does not
+answer within move_timeout seconds is replaced by the medium move. With an
+application.scheduler.SearchScheduler, every search gets a share of the workers instead of a
+fixed time_budget_ms: short while the queue is deep, long while it is empty.
+
+Run from the repository root:
+
+    python -m application.server --port 5000 --workers 4
+    python -m application.server --port 5000 --workers 4 --adaptive --target-latency 300
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import count
+from time import monotonic
+
+from application.game_manager import ConnectFourApp
+from application.scheduler import SearchScheduler
+from core.color_class import Color
+from core.computer import ComputerPlayer
+from core.engine import Engine
+from core.move_cache import MoveCache
+from core.position import position_moves
+from core.transposition import TranspositionTable
+from exceptions.exceptions import OutOfBoundsExceptions, ColumnFilled
+
+MAX_LINE = 256
+
+_engine = Engine()  # engine of a worker process, whose caches all the searches of that process share
+
+
+def _start_worker(cache_path):
+    """
+    Initializer of the pool's processes: give the worker's engine the shared move cache, if any.
+    """
+    if cache_path is not None:
+        _engine.move_cache = MoveCache(cache_path)
+
+
+def _search_move(moves, computer_color, human_color, depth, time_budget_ms, min_depth=1):
+    """
+    Worker of the pool: the hard computer's move in the position reached by a move string.
+    """
+    return _engine.best_move(moves, computer_color, time_budget_ms, human_color, depth, min_depth)
+
+
+class ProtocolError(Exception):
+    """
+    A command that gets an ERR reply.
+    """
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class GameSession:
+    """
+    One game of the server: a ConnectFourApp whose computer moves are given by the server.
+    """
+
+    def __init__(self, session_id, difficulty, player_color=Color.RED):
+        self.id = session_id
+        self.app = ConnectFourApp()
+        self.app.setup_game(player_color, difficulty, local_computer=False)
+        self.busy = False  # a move of this session is being played
+        self.last_active = monotonic()
+
+    def touch(self):
+        self.last_active = monotonic()
+
+
+class GameServer:
+    """
+    Hosts the games and serves the protocol of this module.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, workers=2, depth=3, time_budget_ms=200, max_sessions=10000,
+                 max_pending=None, session_timeout=300.0, move_timeout=10.0, cache_path=None, scheduler=None):
+        """
+        :param port: TCP port to listen on; 0 picks a free one (see port once started).
+        :param workers: Number of processes searching the hard computer's moves.
+        :param depth: Search depth of the hard computer.
+        :param time_budget_ms: Time budget of every hard search; None searches to the full depth.
+        :param max_sessions: Number of games kept at most; NEW is refused past it.
+        :param max_pending: Number of searches waiting for or running in the pool at most (4 per worker by default).
+        :param session_timeout: Seconds after which an idle session, or a silent connection, is dropped.
+        :param move_timeout: Seconds to wait for a search, queueing included, before playing the medium move
+            instead (as when the pool is broken).
+        :param cache_path: A core.move_cache.MoveCache file shared by the worker processes (optional).
+        :param scheduler: An application.scheduler.SearchScheduler granting the budget of every hard
+            search instead of time_budget_ms, shorter as more searches are pending (optional).
+        """
+        if workers < 1:
+            raise ValueError("The server needs at least one worker process.")
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.depth = depth
+        self.time_budget_ms = time_budget_ms
+        self.max_sessions = max_sessions
+        self.max_pending = max_pending if max_pending is not None else 4 * workers
+        self.session_timeout = session_timeout
+        self.move_timeout = move_timeout
+        self.cache_path = cache_path
+        self.scheduler = scheduler
+        self.sessions = {}
+        self._ids = count(1)
+        self._pool = None
+        self._server = None
+        self._reaper = None
+        self._connections = {}  # task serving each open connection -> its writer, closed with the server
+        self.pending = 0  # searches submitted to the pool and not finished yet
+        self.commands = 0
+        self.searches = 0
+        self.rejected = 0  # moves refused with ERR busy
+        self.fallbacks = 0  # searches replaced by the medium move after move_timeout
+        self.expired = 0  # sessions dropped after session_timeout
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        """
+        Start the worker processes and listen; self.port is the port actually bound.
+        """
+        # forked workers would inherit the client sockets open at the time and keep them from closing
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_start_worker,
+                                         initargs=(self.cache_path,))
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port, limit=MAX_LINE)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._reaper = asyncio.create_task(self._reap_sessions())
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        if self._server is not None:
+            self._server.close()
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def stats(self):
+        stats = {
+            "sessions": len(self.sessions),
+            "connections": len(self._connections),
+            "pending": self.pending,
+            "commands": self.commands,
+            "searches": self.searches,
+            "rejected": self.rejected,
+            "fallbacks": self.fallbacks,
+            "expired": self.expired,
+        }
+        if self.scheduler is not None:
+            stats.update({f"scheduler_{name}": round(value, 1) if isinstance(value, float) else value
+                          for name, value in self.scheduler.metrics().items()})
+        return stats
+
+    async def _serve_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), self.session_timeout)
+                except (asyncio.TimeoutError, ValueError, ConnectionError):
+                    break  # silent client, line over MAX_LINE or connection reset
+                if not line:
+                    break
+                writer.write((await self.handle(line.decode("ascii", "replace")) + "\n").encode("ascii"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self._connections[task]
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _reap_sessions(self):
+        while True:
+            await asyncio.sleep(max(0.05, self.session_timeout / 4))
+            limit = monotonic() - self.session_timeout
+            for session_id in [key for key, session in self.sessions.items()
+                               if session.last_active < limit and not session.busy]:
+                del self.sessions[session_id]
+                self.expired += 1
+
+    async def handle(self, line):
+        """
+        Execute one command line and return its reply line.
+        """
+        self.commands += 1
+        words = line.split()
+        try:
+            if not words:
+                raise ProtocolError("bad-request", "empty command")
+            command = words[0].upper()
+            if command == "NEW":
+                return await self._new(words[1:])
+            if command == "MOVE":
+                return await self._move(words[1:])
+            if command == "BOARD":
+                return "BOARD " + position_moves(self._session(words[1:], 1).app.board)
+            if command == "END":
+                self.sessions.pop(self._session(words[1:], 1).id)
+                return "OK"
+            if command == "STATS":
+                return "STATS " + " ".join(f"{name}={value}" for name, value in self.stats().items())
+            if command == "PING":
+                return "PONG"
+            raise ProtocolError("bad-request", f"unknown command {words[0]}")
+        except ProtocolError as error:
+            return f"ERR {error.code} {error}"
+
+    def _session(self, arguments, expected):
+        if len(arguments) != expected:
+            raise ProtocolError("bad-request", f"expected {expected} argument(s)")
+        session = self.sessions.get(arguments[0])
+        if session is None:
+            raise ProtocolError("unknown-session", f"no session {arguments[0]}")
+        session.touch()
+        return session
+
+    async def _new(self, arguments):
+        if not 1 <= len(arguments) <= 2 or arguments[0] not in ("1", "2", "3") \
+                or arguments[1:] not in ([], ["human"], ["computer"]):
+            raise ProtocolError("bad-request", "usage: NEW <1|2|3> [human|computer]")
+        if len(self.sessions) >= self.max_sessions:
+            raise ProtocolError("full", "too many sessions")
+        if arguments[1:] == ["computer"]:
+            self._check_queue(int(arguments[0]))  # before the session exists, so NEW can simply be sent again
+        session = GameSession(str(next(self._ids)), int(arguments[0]))
+        self.sessions[session.id] = session
+        if arguments[1:] != ["computer"]:
+            return f"SESSION {session.id}"
+        column, _ = await self._play_computer(session)
+        return f"SESSION {session.id} {column}"
+
+    async def _move(self, arguments):
+        if len(arguments) != 2:
+            raise ProtocolError("bad-request", "usage: MOVE <id> <column>")
+        session = self._session(arguments[:1], 1)
+        try:
+            column = int(arguments[1])
+        except ValueError:
+            raise ProtocolError("bad-request", f"invalid column {arguments[1]}") from None
+        app = session.app
+        if not app.is_running:
+            raise ProtocolError("over", "the game is finished")
+        if session.busy:
+            raise ProtocolError("busy", "a move of this session is in progress")
+        self._check_queue(app.difficulty)
+        try:
+            result = app.play_human_move(column)
+        except (OutOfBoundsExceptions, ColumnFilled) as error:
+            raise ProtocolError("illegal-move", str(error)) from None
+        if result is not None:
+            return f"MOVED - {result}"
+        column, result = await self._play_computer(session)
+        return f"MOVED {column} {result or 'playing'}"
+
+    def _check_queue(self, difficulty):
+        """
+        Refuse a computer move that needs a search while max_pending searches are queued.
+        """
+        if difficulty == 3 and self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ProtocolError("busy", "the search queue is full")
+
+    async def _play_computer(self, session):
+        """
+        Find and play the computer's move of a session.
+        :return: (column, outcome after the move)
+        """
+        app = session.app
+        session.busy = True
+        try:
+            if app.difficulty == 3:
+                column = await self._search(session)
+            else:
+                column = self._quick_move(session, app.difficulty)
+            return column, app.play_computer_move(column)
+        finally:
+            session.busy = False
+            session.touch()
+
+    @staticmethod
+    def _quick_move(session, difficulty):
+        """
+        The easy (1) or medium (2) move of a session, found inline.
+        """
+        app = session.app
+        player = ComputerPlayer(app.board, TranspositionTable(1))
+        player.set_color(app.computer_color)
+        if difficulty == 1:
+            return player.easy_difficulty()
+        return player.medium_difficulty(app.human_player.color)
+
+    async def _search(self, session):
+        app = session.app
+        loop = asyncio.get_running_loop()
+        grant = self.scheduler.acquire(app.difficulty) if self.scheduler is not None else None
+        budget, min_depth = (self.time_budget_ms, 1) if grant is None else (grant.time_budget_ms, grant.min_depth)
+        try:
+            try:
+                future = self._pool.submit(_search_move, position_moves(app.board), app.computer_color,
+                                           app.human_player.color, self.depth, budget, min_depth)
+            except BaseException:
+                self._release(grant)
+                raise
+            self.pending += 1
+            self.searches += 1
+            # counted until the worker is done, even when the answer is no longer awaited
+            future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._search_done, grant))
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.move_timeout)
+        except (asyncio.TimeoutError, BrokenProcessPool):
+            self.fallbacks += 1
+            return self._quick_move(session, 2)
+
+    def _search_done(self, grant=None):
+        self.pending -= 1
+        self._release(grant)
+
+    def _release(self, grant):
+        if self.scheduler is not None:
+            self.scheduler.release(grant)
+
+
+async def _serve(arguments):
+    scheduler = SearchScheduler(arguments.workers, arguments.target_latency) if arguments.adaptive else None
+    server = GameServer(arguments.host, arguments.port, arguments.workers, arguments.depth, arguments.time_budget,
+                        arguments.max_sessions, arguments.max_pending, arguments.session_timeout,
+                        cache_path=arguments.cache, scheduler=scheduler)
+    async with server:
+        print(f"Serving Connect Four on {server.host}:{server.port}")
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve Connect Four games over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=2, help="Processes searching the hard computer's moves.")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--time-budget", type=float, default=200, help="Milliseconds per hard search.")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--max-pending", type=int, help="Searches queued at most (4 per worker by default).")
+    parser.add_argument("--session-timeout", type=float, default=300, help="Seconds before an idle session is dropped.")
+    parser.add_argument("--cache", help="Move cache file shared by the worker processes (see core.move_cache).")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Share the workers among the pending searches instead of a fixed --time-budget.")
+    parser.add_argument("--target-latency", type=float, default=500,
+                        help="Milliseconds to answer a hard move, queueing included, with --adaptive.")
+    arguments = parser.parse_args()
+    try:
+        asyncio.run(_serve(arguments))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,192 @@
+"""
+Engine benchmark suite: board operations, evaluation and search on fixed positions.
+
+Every benchmark runs on the same canonical positions, so two runs of the suite can be compared
+number by number. Results are written as JSON; --compare flags the benchmarks that got slower
+than a saved baseline (or whose node counts changed) and exits with status 1 when there are any.
+Run from the repository root:
+
+    python -m benchmarks.bench_engine --output bench.json
+    python -m benchmarks.bench_engine --compare bench.json --threshold 0.15
+"""
+import json
+import platform
+import sys
+from time import perf_counter, strftime
+
+from core.board import Board
+from core.computer import ComputerPlayer
+from core.color_class import Color
+
+# name -> columns played from the empty board, RED first; the computer (WHITE) is always to move
+POSITIONS = {
+    "opening": "3",
+    "midgame": "12361504611",
+    "endgame": "12361504611313133022652364552246045",
+    "forced_win": "62630",
+}
+
+
+def load_position(name):
+    """
+    Build the board of a canonical position.
+    """
+    board = Board()
+    for index, column in enumerate(POSITIONS[name]):
+        board.place_disc(int(column), Color.RED if index % 2 == 0 else Color.WHITE)
+    return board
+
+
+def _best_time(function, repeat, number):
+    """
+    Best time of `repeat` runs of `number` calls, in seconds per call.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, perf_counter() - start)
+    return best / number
+
+
+def perft(board, depth, colors=(Color.WHITE, Color.RED)):
+    """
+    Count the leaf positions of the full game tree to `depth`, stopping at won and full positions.
+    """
+    if depth == 0 or board.is_full():
+        return 1
+    nodes = 0
+    for column in range(board.columns):
+        if board.get_element(0, column) != ' ':
+            continue
+        board.place_disc(column, colors[0])
+        if board.check_last_move_victory():
+            nodes += 1
+        else:
+            nodes += perft(board, depth - 1, (colors[1], colors[0]))
+        board.undo_move(column)
+    return nodes
+
+
+def bench_board(name, repeat):
+    board = load_position(name)
+    columns = [column for column in range(board.columns) if board.get_element(0, column) == ' ']
+
+    def place_undo():
+        for column in columns:
+            board.place_disc(column, Color.WHITE)
+            board.undo_move(column)
+
+    per_cycle = _best_time(place_undo, repeat, 200) / len(columns)
+    return {
+        "place_undo": {"seconds": per_cycle},
+        "check_victory": {"seconds": _best_time(lambda: board.check_victory(Color.WHITE), repeat, 2000)},
+        "check_last_move_victory": {"seconds": _best_time(board.check_last_move_victory, repeat, 2000)},
+        "is_full": {"seconds": _best_time(board.is_full, repeat, 2000)},
+    }
+
+
+def bench_evaluation(name, repeat):
+    board = load_position(name)
+    computer = ComputerPlayer(board)
+    computer.evaluate_board(board)  # builds the incremental evaluator outside the timing
+    return {
+        "evaluate_board": {"seconds": _best_time(lambda: computer.evaluate_board(board), repeat, 2000)},
+        "evaluate_board_full": {"seconds": _best_time(lambda: computer.evaluate_board_full(board), repeat, 200)},
+        "medium_difficulty": {"seconds": _best_time(lambda: computer.medium_difficulty(Color.RED), repeat, 50)},
+    }
+
+
+def bench_search(name, max_depth):
+    results = {}
+    for depth in range(1, max_depth + 1):
+        board = load_position(name)
+        computer = ComputerPlayer(board)  # fresh tables, so every depth is measured from a cold start
+        start = perf_counter()
+        score, column = computer.minimax(board, depth, -float("inf"), float("inf"), True, Color.RED)
+        seconds = perf_counter() - start
+        results[f"minimax_d{depth}"] = {"seconds": seconds, "nodes": computer.nodes_searched,
+                                        "score": score, "column": column}
+    return results
+
+
+def bench_perft(name, max_depth):
+    results = {}
+    for depth in range(1, max_depth + 1):
+        board = load_position(name)
+        start = perf_counter()
+        nodes = perft(board, depth)
+        results[f"perft_d{depth}"] = {"seconds": perf_counter() - start, "nodes": nodes}
+    return results
+
+
+def run(repeat=5, max_depth=10, perft_depth=5, positions=None):
+    """
+    Run the whole suite.
+    :return: dict with the run's metadata and "results": {"position/benchmark": {"seconds": ..., ...}}.
+    """
+    results = {}
+    for name in positions or POSITIONS:
+        for group in (bench_board(name, repeat), bench_evaluation(name, repeat), bench_search(name, max_depth),
+                      bench_perft(name, perft_depth)):
+            for benchmark, result in group.items():
+                results[f"{name}/{benchmark}"] = result
+    return {
+        "meta": {"python": sys.version.split()[0], "platform": platform.platform(), "date": strftime("%Y-%m-%d %H:%M:%S"),
+                 "max_depth": max_depth, "perft_depth": perft_depth},
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.10, min_seconds=1e-4):
+    """
+    Compare two runs of the suite.
+    :param threshold: Relative slowdown tolerated before a benchmark counts as a regression.
+    :param min_seconds: Timings below this in both runs are too noisy to be compared.
+    :return: List of messages, one per regression.
+    """
+    regressions = []
+    for benchmark, result in current["results"].items():
+        reference = baseline["results"].get(benchmark)
+        if reference is None:
+            continue
+        if "nodes" in reference and benchmark.split("/")[1].startswith("perft") and result["nodes"] != reference["nodes"]:
+            regressions.append(f"{benchmark}: perft count {result['nodes']} != {reference['nodes']}")
+        if "nodes" in reference and result["nodes"] > reference["nodes"] * (1 + threshold):
+            regressions.append(f"{benchmark}: {result['nodes']} nodes, baseline {reference['nodes']}")
+        if max(result["seconds"], reference["seconds"]) < min_seconds:
+            continue
+        if result["seconds"] > reference["seconds"] * (1 + threshold):
+            slowdown = result["seconds"] / reference["seconds"] - 1 if reference["seconds"] else float("inf")
+            regressions.append(f"{benchmark}: {result['seconds'] * 1000:.3f} ms, "
+                               f"baseline {reference['seconds'] * 1000:.3f} ms (+{slowdown:.0%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the Connect Four engine.")
+    parser.add_argument("--output", help="JSON file to write the results to.")
+    parser.add_argument("--compare", help="Baseline JSON file to compare the results with.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Tolerated relative slowdown.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-depth", type=int, default=10, help="Deepest minimax search measured.")
+    parser.add_argument("--perft-depth", type=int, default=5)
+    parser.add_argument("--positions", nargs="*", choices=sorted(POSITIONS))
+    arguments = parser.parse_args()
+
+    run_results = run(arguments.repeat, arguments.max_depth, arguments.perft_depth, arguments.positions)
+    for benchmark_name, benchmark_result in run_results["results"].items():
+        nodes = f"{benchmark_result['nodes']:>12}" if "nodes" in benchmark_result else " " * 12
+        print(f"{benchmark_name:<40}{benchmark_result['seconds'] * 1000:>14.4f} ms{nodes}")
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            json.dump(run_results, output_file, indent=2)
+    if arguments.compare:
+        with open(arguments.compare) as baseline_file:
+            found = compare(run_results, json.load(baseline_file), arguments.threshold)
+        for message in found:
+            print("REGRESSION", message)
+        sys.exit(1 if found else 0)
@@ -0,0 +1,157 @@
+"""
+Load generator of the game server (application.server): throughput and tail latency.
+
+Every client opens one connection and plays games one after the other, choosing random legal
+moves, and times each MOVE from the request to the reply. Moves refused with ERR busy are
+counted and sent again after a pause growing with every refusal (with some jitter, so the
+clients do not all come back at once); their latency runs until the move is accepted.
+Without --host the server is started in this process first, so one command measures it.
+Run from the repository root:
+
+    python -m benchmarks.bench_server --clients 200 --games 5 --workers 4
+    python -m benchmarks.bench_server --clients 200 --games 5 --workers 4 --adaptive --target-latency 300
+    python -m benchmarks.bench_server --host 127.0.0.1 --port 5000 --clients 1000
+"""
+import asyncio
+import json
+import random
+from time import perf_counter
+
+from application.scheduler import SearchScheduler
+from application.server import GameServer
+from core.board import Board
+from core.color_class import Color
+
+BUSY_PAUSE = 0.01  # seconds before sending a refused move again, doubled up to MAX_BUSY_PAUSE while refused
+MAX_BUSY_PAUSE = 0.32
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a list of numbers (0 for an empty list).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+class LoadReport:
+    """
+    What the clients measured; latencies are in milliseconds.
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.games = 0
+        self.busy = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    def to_dict(self):
+        return {
+            "games": self.games,
+            "moves": len(self.latencies),
+            "seconds": self.seconds,
+            "moves_per_second": len(self.latencies) / self.seconds if self.seconds else 0.0,
+            "busy": self.busy,
+            "errors": self.errors,
+            "latency_ms": {name: percentile(self.latencies, fraction)
+                           for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))},
+        }
+
+
+async def _client(host, port, games, difficulty, report, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def command(line):
+        writer.write(line.encode("ascii") + b"\n")
+        await writer.drain()
+        return (await reader.readline()).decode("ascii").split()
+
+    try:
+        for _ in range(games):
+            reply = await command(f"NEW {difficulty}")
+            if reply[0] != "SESSION":
+                report.errors += 1
+                continue
+            session = reply[1]
+            board = Board()
+            state = "playing"
+            while state == "playing":
+                column = rng.choice([col for col in range(board.columns) if board.get_element(0, col) == " "])
+                start = perf_counter()
+                reply = await command(f"MOVE {session} {column}")
+                pause = BUSY_PAUSE
+                while reply[:2] == ["ERR", "busy"]:
+                    report.busy += 1
+                    await asyncio.sleep(pause * rng.uniform(0.5, 1.5))
+                    pause = min(2 * pause, MAX_BUSY_PAUSE)
+                    reply = await command(f"MOVE {session} {column}")
+                report.latencies.append((perf_counter() - start) * 1000)
+                if reply[0] != "MOVED":
+                    report.errors += 1
+                    break
+                board.place_disc(column, Color.RED)
+                if reply[1] != "-":
+                    board.place_disc(int(reply[1]), Color.WHITE)
+                state = reply[2]
+            await command(f"END {session}")
+            report.games += 1
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_load(host, port, clients=100, games=5, difficulty=3, seed=0):
+    """
+    Play `games` games on each of `clients` concurrent connections.
+    :return: A LoadReport.
+    """
+    report = LoadReport()
+    start = perf_counter()
+    await asyncio.gather(*(_client(host, port, games, difficulty, report, seed + number)
+                           for number in range(clients)))
+    report.seconds = perf_counter() - start
+    return report
+
+
+async def _main(arguments):
+    if arguments.host is not None:
+        return await run_load(arguments.host, arguments.port, arguments.clients, arguments.games, arguments.difficulty)
+    scheduler = SearchScheduler(arguments.workers, arguments.target_latency) if arguments.adaptive else None
+    async with GameServer(workers=arguments.workers, time_budget_ms=arguments.time_budget,
+                          max_sessions=max(10000, arguments.clients), scheduler=scheduler) as server:
+        report = await run_load(server.host, server.port, arguments.clients, arguments.games, arguments.difficulty)
+        print("server:", " ".join(f"{name}={value}" for name, value in server.stats().items()))
+        return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure the throughput and latency of the game server.")
+    parser.add_argument("--host", help="Server to load; without it a server is started in this process.")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=100, help="Concurrent connections.")
+    parser.add_argument("--games", type=int, default=5, help="Games per connection.")
+    parser.add_argument("--difficulty", type=int, choices=(1, 2, 3), default=3)
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes of the started server.")
+    parser.add_argument("--time-budget", type=float, default=50, help="Milliseconds per search of the started server.")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Give the started server a scheduler sharing the workers among the pending searches.")
+    parser.add_argument("--target-latency", type=float, default=500,
+                        help="Milliseconds to answer a hard move, queueing included, with --adaptive.")
+    parser.add_argument("--output", help="JSON file to write the report to.")
+    arguments = parser.parse_args()
+
+    load_report = asyncio.run(_main(arguments)).to_dict()
+    latency = load_report["latency_ms"]
+    print(f"{load_report['games']} games, {load_report['moves']} moves in {load_report['seconds']:.2f}s: "
+          f"{load_report['moves_per_second']:.1f} moves/s, latency p50 {latency['p50']:.1f} ms, "
+          f"p95 {latency['p95']:.1f} ms, p99 {latency['p99']:.1f} ms, max {latency['max']:.1f} ms, "
+          f"{load_report['busy']} busy, {load_report['errors']} errors")
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            json.dump(load_report, output_file, indent=2)
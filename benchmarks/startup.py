@@ -0,0 +1,85 @@
+"""
+Startup benchmark: how long each entry point takes to import and to play its first computer move.
+
+Every measurement runs in a fresh interpreter, so module caches from one entry point do not hide
+the cost of another. Run from the repository root:
+
+    python -m benchmarks.startup [--repeat 5] [--output startup.json]
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# entry point -> (import statement, code playing the first computer move)
+ENTRY_POINTS = {
+    "engine": (
+        "from core.board import Board; from core.computer import ComputerPlayer",
+        "ComputerPlayer(Board()).hard_difficulty()",
+    ),
+    "text_ui": (
+        "from ui.ui import UI",
+        "game = UI()._game; game.setup_game(1, 3); game.switch_player(); game.play_turn()",
+    ),
+    "gui": (
+        "from ui import gui",
+        "gui.init_display(); game = gui.ConnectFourGUI(); game.setup_game(gui.RED, 3); game.computer_turn()",
+    ),
+}
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{imports}
+imported = time.perf_counter()
+{first_move}
+moved = time.perf_counter()
+print(json.dumps({{"import_ms": (imported - start) * 1000, "first_move_ms": (moved - imported) * 1000,
+                  "pygame_loaded": "pygame" in sys.modules}}))
+"""
+
+
+def measure(entry_point):
+    """
+    Run one entry point in a new interpreter and return its timings.
+    """
+    imports, first_move = ENTRY_POINTS[entry_point]
+    environment = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy",
+                       PYGAME_HIDE_SUPPORT_PROMPT="1", PYTHONPATH=ROOT)
+    output = subprocess.run([sys.executable, "-c", _PROBE.format(imports=imports, first_move=first_move)],
+                            cwd=ROOT, env=environment, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(repeat=5):
+    """
+    Measure every entry point `repeat` times and keep the best (least noisy) run of each.
+    """
+    results = {}
+    for entry_point in ENTRY_POINTS:
+        runs = [measure(entry_point) for _ in range(repeat)]
+        results[entry_point] = {
+            "import_ms": min(result["import_ms"] for result in runs),
+            "first_move_ms": min(result["first_move_ms"] for result in runs),
+            "pygame_loaded": runs[0]["pygame_loaded"],
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure import and first-move latency of each entry point.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="JSON file to write the results to.")
+    arguments = parser.parse_args()
+
+    startup = run(arguments.repeat)
+    for name, timings in startup.items():
+        print(f"{name:<10} import {timings['import_ms']:8.1f} ms   first move {timings['first_move_ms']:8.1f} ms"
+              f"   pygame loaded: {timings['pygame_loaded']}")
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            json.dump(startup, output, indent=2)
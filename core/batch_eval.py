@@ -0,0 +1,119 @@
+"""
+Vectorized version of ComputerPlayer.evaluate_board, scoring many positions in one NumPy call.
+
+Needs NumPy, which the rest of the game does not: import this module only where it is used.
+"""
+import numpy as np
+
+from core.evaluation import board_windows, window_score_table
+
+EMPTY = 0
+OWN = 1  # a disc of the evaluated color
+OPPONENT = 2
+OTHER = 3  # a disc of any other color
+
+
+class BatchEvaluator:
+    """
+    Scores stacks of boards with array operations.
+
+    A position is an int8 array of shape (rows, columns) holding EMPTY, OWN, OPPONENT or OTHER
+    for every cell, row 0 being the top row; a batch is an array of shape (N, rows, columns).
+    Every window of every board is turned into the (own, opponent, occupied) code of
+    core.evaluation and looked up in the same score table as the incremental evaluator,
+    so the scores are exactly those of ComputerPlayer.evaluate_board.
+    """
+
+    def __init__(self, rows, columns, color, opponent_color, window_score, center_weight):
+        """
+        :param color: The color the scores are computed for.
+        :param opponent_color: The color counted against it.
+        :param window_score: Function scoring a list of 4 cells for a color, like ComputerPlayer.score_window.
+        :param center_weight: Points for each disc of the player in the center column.
+        """
+        self.rows = rows
+        self.columns = columns
+        self._color = color
+        self._opponent_color = opponent_color
+        self._center_column = columns // 2
+        self._center_weight = center_weight
+        self._table = np.array(window_score_table(color, opponent_color, window_score), dtype=np.int64)
+        # (windows, 4) flat cell indexes, row * columns + column
+        self._windows = np.array([[row * columns + col for row, col in window]
+                                  for window in board_windows(rows, columns)], dtype=np.intp).reshape(-1, 4)
+        stride = rows + 1
+        # bit of every cell in the board's bitboard layout, in (rows, columns) order
+        self._cell_bits = np.array([[col * stride + rows - 1 - row for col in range(columns)] for row in range(rows)],
+                                   dtype=np.intp)
+        self._bitboard_bytes = (columns * stride + 7) // 8
+
+    @classmethod
+    def for_player(cls, player, board):
+        """
+        Build the evaluator matching a ComputerPlayer's evaluate_board on boards of this geometry.
+        """
+        return cls(board.rows, board.columns, player.color, player.get_opponent_color(), player.score_window,
+                   player.CENTER_COLUMN_WEIGHT)
+
+    def _unpack(self, bitboard):
+        bits = np.unpackbits(np.frombuffer(bitboard.to_bytes(self._bitboard_bytes, "little"), dtype=np.uint8),
+                             bitorder="little")
+        return bits[self._cell_bits]
+
+    def encode(self, board):
+        """
+        Return the (rows, columns) array of a Board.
+        """
+        own = self._unpack(board.bitboard(self._color))
+        opponent = self._unpack(board.bitboard(self._opponent_color))
+        occupied = self._unpack(board.mask)
+        position = np.where(occupied, OTHER, EMPTY).astype(np.int8)
+        position[opponent.astype(bool)] = OPPONENT
+        position[own.astype(bool)] = OWN
+        return position
+
+    def encode_many(self, boards):
+        return np.stack([self.encode(board) for board in boards])
+
+    def expand_children(self, board, color, columns=None):
+        """
+        Build the batch of positions reached by one disc of `color` in each playable column.
+        :param columns: The columns to play, in the order wanted (every playable column when omitted);
+            full columns are left out, like moves is_valid_move refuses.
+        :return: (columns, batch) where batch[i] is the board after playing columns[i].
+        """
+        parent = self.encode(board)
+        empty = (parent == EMPTY).sum(axis=0)
+        if columns is None:
+            columns = range(self.columns)
+        columns = [col for col in columns if empty[col]]
+        children = np.repeat(parent[np.newaxis], len(columns), axis=0)
+        if color == self._color:
+            code = OWN
+        elif color == self._opponent_color:
+            code = OPPONENT
+        else:
+            code = OTHER
+        index = np.arange(len(columns))
+        columns_array = np.array(columns, dtype=np.intp)
+        children[index, empty[columns_array] - 1, columns_array] = code
+        return columns, children
+
+    def evaluate(self, positions):
+        """
+        Score a batch of positions.
+        :param positions: Array of shape (N, rows, columns), or a single (rows, columns) position.
+        :return: Array of N integer scores (a 0-d array for a single position).
+        """
+        positions = np.asarray(positions)
+        single = positions.ndim == 2
+        if single:
+            positions = positions[np.newaxis]
+        flat = positions.reshape(len(positions), -1)
+        cells = flat[:, self._windows]  # (N, windows, 4)
+        own = (cells == OWN).sum(axis=2)
+        opponent = (cells == OPPONENT).sum(axis=2)
+        occupied = (cells != EMPTY).sum(axis=2)
+        scores = self._table[own * 25 + opponent * 5 + occupied].sum(axis=1)
+        scores += (positions[:, :, self._center_column] == OWN).sum(axis=1) * self._center_weight
+        return scores[0] if single else scores
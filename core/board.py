@@ -1,12 +1,67 @@
+from random import Random
 from exceptions.exceptions import OutOfBoundsExceptions, ColumnFilled
 
+_zobrist_tables = {}
 
-#creating a board with 6 rows and 7 columns, np.zeros creates me a matrix 6X7
+
+def _zobrist_keys(color, size):
+    """
+    Return the Zobrist keys of a color, one random 64-bit number per bit of the bitboard.
+    The keys are seeded by the color so every board (and every process) agrees on them.
+    """
+    keys = _zobrist_tables.get((color, size))
+    if keys is None:
+        rng = Random(repr((color, size)))
+        keys = [rng.getrandbits(64) for _ in range(size)]
+        _zobrist_tables[(color, size)] = keys
+    return keys
+
+
+def line_completions(position, stride):
+    """
+    Return the cells (occupied or not, on the board or not) that would complete four aligned
+    discs of a bitboard laid out with `stride` bits per column.
+    """
+    # vertical
+    result = (position << 1) & (position << 2) & (position << 3)
+    for shift in (stride, stride - 1, stride + 1):
+        pairs = (position << shift) & (position << 2 * shift)
+        result |= pairs & (position << 3 * shift)
+        result |= pairs & (position >> shift)
+        pairs = (position >> shift) & (position >> 2 * shift)
+        result |= pairs & (position << shift)
+        result |= pairs & (position >> 3 * shift)
+    return result
+
+
+#creating a board with 6 rows and 7 columns, stored as one bitboard per color
 class Board:
+    """
+    Connect Four board backed by bitboards.
+
+    Every column takes ``rows + 1`` bits: the bottom cell of column ``c`` is bit
+    ``c * (rows + 1)`` and the extra bit on top of each column is always empty, so
+    that shifting a bitboard never wraps a line from one column into the next.
+    Row 0 is still the top row of the board, like in the original grid version.
+    """
+
     def __init__(self,rows = 6, columns = 7):
         self.__rows = rows
         self.__columns = columns
-        self._board = [[' ' for _ in range(self.__columns)] for _ in range(self.__rows)]
+        self._stride = rows + 1
+        self._bitboards = {}  # color -> bitboard with the discs of that color
+        self._mask = 0  # bitboard with every occupied cell
+        self._heights = [0] * columns  # number of discs in each column
+        self._top_mask = sum(1 << (column * self._stride + rows - 1) for column in range(columns))
+        self._bottom_mask = sum(1 << (column * self._stride) for column in range(columns))
+        self._board_mask = self._bottom_mask * ((1 << rows) - 1)
+        self._threats = {}  # color -> its winning cells, computed on demand until the next change
+        self._neighborhoods = self._line_neighborhoods()
+        self._history = []  # columns played with place_disc, in order
+        self._hash = 0  # Zobrist hash of the position, updated on every change
+        self._mirror_hash = 0  # Zobrist hash of the left-right mirror image of the position
+        self._keys = {}  # color -> Zobrist keys of that color
+        self._listeners = []  # objects told about every disc placed or removed
 
     @property
     def columns(self):
@@ -16,32 +71,217 @@ class Board:
     def rows(self):
         return self.__rows
 
+    @property
+    def zobrist_hash(self):
+        return self._hash
+
+    @property
+    def mirror_hash(self):
+        """
+        The Zobrist hash of the position mirrored left to right, kept up to date like zobrist_hash.
+        """
+        return self._mirror_hash
+
+    @property
+    def canonical_hash(self):
+        """
+        The smaller of zobrist_hash and mirror_hash: the same for a position and its mirror image.
+        """
+        return min(self._hash, self._mirror_hash)
+
+    def mirror_column(self, column):
+        return self.__columns - 1 - column
+
+    def mirror(self):
+        """
+        Return a new board holding the mirror image of this one (history included).
+        """
+        board = Board(self.__rows, self.__columns)
+        heights = [0] * self.__columns
+        for column in self._history:
+            heights[column] += 1
+            board.place_disc(self.mirror_column(column), self.get_element(self.__rows - heights[column], column))
+        for row in range(self.__rows):  # discs set with add_element are not in the history
+            for column in range(self.__columns):
+                element = self.get_element(row, column)
+                if element != board.get_element(row, self.mirror_column(column)):
+                    board.add_element(row, self.mirror_column(column), element)
+        return board
+
+    @property
+    def mask(self):
+        """
+        Bitboard of every occupied cell (rows + 1 bits per column, bottom cell first).
+        """
+        return self._mask
+
+    def bitboard(self, color):
+        """
+        Bitboard of the discs of one color, in the same layout as mask.
+        """
+        return self._bitboards.get(color, 0)
+
+    @property
+    def disc_count(self):
+        return bin(self._mask).count("1")
+
+    @property
+    def move_count(self):
+        return len(self._history)
+
+    @property
+    def history(self):
+        """
+        The columns played with place_disc, in order.
+        """
+        return list(self._history)
+
+    @property
+    def last_move(self):
+        """
+        The (row, column) of the last disc placed with place_disc, or None on an empty history.
+        """
+        if not self._history:
+            return None
+        column = self._history[-1]
+        return self.__rows - self._heights[column], column
+
+    def _bit(self, row, column):
+        """
+        Return the bit of the cell (row, column), row 0 being the top row.
+        """
+        return 1 << (column * self._stride + self.__rows - 1 - row)
+
+    def add_listener(self, listener):
+        """
+        Register an object with disc_placed(row, column, color) and disc_removed(row, column, color)
+        methods, called after every change of a cell (used by incremental evaluators).
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def copy(self):
+        """
+        Return an independent copy of the board, without its listeners.
+        """
+        board = Board.__new__(Board)
+        board.__setstate__(self.__getstate__())
+        return board
+
+    def __getstate__(self):
+        # listeners belong to the process that registered them, they are not copied or pickled
+        state = self.__dict__.copy()
+        state['_listeners'] = []
+        state['_bitboards'] = dict(self._bitboards)
+        state['_heights'] = list(self._heights)
+        state['_history'] = list(self._history)
+        state['_keys'] = dict(self._keys)
+        state['_threats'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def _mirror_index(self, index):
+        return (self.__columns - 1 - index // self._stride) * self._stride + index % self._stride
+
+    def _line_neighborhoods(self):
+        """
+        For every bit, the cells of the board within three steps of it along the four line directions.
+        """
+        rows, columns, stride = self.__rows, self.__columns, self._stride
+        neighborhoods = [0] * (columns * stride)
+        for column in range(columns):
+            for height in range(rows):
+                cells = 0
+                for step_column, step_height in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    for distance in range(-3, 4):
+                        other_column = column + distance * step_column
+                        other_height = height + distance * step_height
+                        if 0 <= other_column < columns and 0 <= other_height < rows:
+                            cells |= 1 << (other_column * stride + other_height)
+                neighborhoods[column * stride + height] = cells
+        return neighborhoods
+
+    def _color_keys(self, color):
+        keys = self._keys.get(color)
+        if keys is None:
+            keys = self._keys[color] = _zobrist_keys(color, self.__columns * self._stride)
+        return keys
+
+    def _column_height(self, column):
+        """
+        Recompute the height of a column from the mask (used after add_element).
+        """
+        height = self.__rows
+        while height > 0 and not self._mask & self._bit(self.__rows - height, column):
+            height -= 1
+        return height
+
     def add_element(self,row,column,value):
-        self._board[row][column] = value
-        return self._board
+        bit = self._bit(row, column)
+        index = bit.bit_length() - 1
+        if self._mask & bit:
+            for color, bitboard in self._bitboards.items():
+                if bitboard & bit:
+                    self._bitboards[color] = bitboard & ~bit
+                    self._hash ^= self._color_keys(color)[index]
+                    self._mirror_hash ^= self._color_keys(color)[self._mirror_index(index)]
+                    for listener in self._listeners:
+                        listener.disc_removed(row, column, color)
+            self._mask &= ~bit
+        if value != ' ':
+            self._bitboards[value] = self._bitboards.get(value, 0) | bit
+            self._mask |= bit
+            self._hash ^= self._color_keys(value)[index]
+            self._mirror_hash ^= self._color_keys(value)[self._mirror_index(index)]
+            for listener in self._listeners:
+                listener.disc_placed(row, column, value)
+        self._heights[column] = self._column_height(column)
+        self._threats.clear()
+        return self
 
     def get_element(self,row,column):
-        return self._board[row][column]
+        bit = self._bit(row, column)
+        if not self._mask & bit:
+            return ' '
+        for color, bitboard in self._bitboards.items():
+            if bitboard & bit:
+                return color
+        return ' '
 
 
 
 
 #place element on the last available row of my input column (just like the game)
-    def place_disc(self,column,color): #TODO implement a class for the elements
+    def place_disc(self,column,color):
         if not (0<=column < self.__columns):
             raise OutOfBoundsExceptions()
-        if self._board[0][column] != ' ':
+        height = self._heights[column]
+        if height == self.__rows:
             raise ColumnFilled()
 
-        i = 0
-        while i < self.__rows and self._board[i][column] == ' ':
-            i += 1
-        # Place the element in the last empty row
-        self._board[i - 1][column] = color
-        #print(f"Element placed successfully on row {i-1} and column {column}")
+        index = column * self._stride + height
+        bit = 1 << index
+        self._bitboards[color] = self._bitboards.get(color, 0) | bit
+        self._mask |= bit
+        keys = self._color_keys(color)
+        self._hash ^= keys[index]
+        self._mirror_hash ^= keys[(self.__columns - 1 - column) * self._stride + height]
+        self._heights[column] = height + 1
+        self._history.append(column)
+        self._threats.clear()
+        for listener in self._listeners:
+            listener.disc_placed(self.__rows - 1 - height, column, color)
 
     def __getitem__(self, item):
-        return self._board[item]
+        """
+        The cells of a row, as a read-only tuple: the board is changed with place_disc and add_element only.
+        """
+        return tuple(self.get_element(item, column) for column in range(self.__columns))
 
     @staticmethod
     def _colorize(element):
@@ -65,10 +305,27 @@ class Board:
         Removes the topmost non-empty disc from the column.
         :param col: The column where the last move is to be undone.
         """
-        for row in range(self.__rows):
-            if self._board[row][col] != ' ':
-                self._board[row][col] = ' '  # Reset the topmost non-empty cell
+        height = self._heights[col]
+        if height == 0:
+            return
+        index = col * self._stride + height - 1
+        bit = 1 << index
+        for color, bitboard in self._bitboards.items():
+            if bitboard & bit:
+                self._bitboards[color] = bitboard & ~bit
+                keys = self._color_keys(color)
+                self._hash ^= keys[index]
+                self._mirror_hash ^= keys[(self.__columns - 1 - col) * self._stride + height - 1]
+                for listener in self._listeners:
+                    listener.disc_removed(self.__rows - height, col, color)
                 break
+        self._mask &= ~bit
+        self._heights[col] = height - 1
+        self._threats.clear()
+        if self._history and self._history[-1] == col:
+            self._history.pop()
+        elif col in self._history:
+            del self._history[len(self._history) - 1 - self._history[::-1].index(col)]
 
 
     def __str__(self):
@@ -77,53 +334,88 @@ class Board:
         """
         header = ' ' + ' '.join(str(i) for i in range(self.__columns))
         board_rows = []
-        for row in self._board:
-            colored_row = ' ' +' '.join(self._colorize(cell) for cell in row)
+        for row in range(self.__rows):
+            colored_row = ' ' +' '.join(self._colorize(cell) for cell in self[row])
             board_rows.append(colored_row)
         return header + '\n' + '\n'.join(board_rows) + '\n' + header
 
+    def _has_four(self, bitboard):
+        """
+        Check a bitboard for four aligned discs with shift-and-mask operations.
+        """
+        # vertical, horizontal, diagonal (up-left) and diagonal (up-right) shifts
+        for shift in (1, self._stride, self._stride - 1, self._stride + 1):
+            pairs = bitboard & (bitboard >> shift)
+            if pairs & (pairs >> (2 * shift)):
+                return True
+        return False
+
     def check_victory(self, color):
         """
         Check if the given color has achieved a victory.
         :param color: The color of the current player (integer).
         :return: True if the player has won, False otherwise.
         """
-        # Horizontal check
-        for row in range(self.rows):
-            for col in range(self.columns - 3):
-                if all(self.get_element(row, col + i) == color for i in range(4)):
-                    return True
-
-        # Vertical check
-        for row in range(self.rows - 3):
-            for col in range(self.columns):
-                if all(self.get_element(row + i, col) == color for i in range(4)):
-                    return True
-
-        # Diagonal Check (down-right)
-        for row in range(self.rows - 3):
-            for col in range(self.columns - 3):
-                if all(self.get_element(row + i, col + i) == color for i in range(4)):
-                    return True
-
-        # Diagonal Check (up-right)
-        for row in range(3, self.rows):
-            for col in range(self.columns - 3):
-                if all(self.get_element(row - i, col + i) == color for i in range(4)):
-                    return True
+        return self._has_four(self._bitboards.get(color, 0))
 
+    def check_last_move_victory(self):
+        """
+        Check if the last disc placed completes four in a row.
+        Only the four lines going through that cell are inspected, which makes this the
+        check to use right after place_disc; check_victory still validates any position.
+        :return: True if the last move won the game, False otherwise.
+        """
+        if not self._history:
+            return False
+        column = self._history[-1]
+        index = column * self._stride + self._heights[column] - 1
+        bit = 1 << index
+        for bitboard in self._bitboards.values():
+            if bitboard & bit:
+                return self._has_four(bitboard & self._neighborhoods[index])
         return False
 
+    def winning_cells(self, color):
+        """
+        Bitboard of the empty cells where a disc of `color` would complete four, playable now or not.
+        Kept until the board changes, so repeated queries on a position cost nothing.
+        """
+        cells = self._threats.get(color)
+        if cells is None:
+            cells = line_completions(self._bitboards.get(color, 0), self._stride) & (self._board_mask ^ self._mask)
+            self._threats[color] = cells
+        return cells
+
+    def winning_columns(self, color):
+        """
+        The columns where a disc of `color` wins the game right now, in increasing order.
+        """
+        cells = self.winning_cells(color) & (self._mask + self._bottom_mask)
+        if not cells:
+            return []
+        column_bits = (1 << self._stride) - 1
+        return [column for column in range(self.__columns) if cells >> (column * self._stride) & column_bits]
+
+    def threats(self, color):
+        """
+        The (row, column) of every empty cell where a disc of `color` would complete four, playable now or not.
+        """
+        cells = self.winning_cells(color)
+        result = []
+        for column in range(self.__columns):
+            for height in range(self.__rows):
+                if cells >> (column * self._stride + height) & 1:
+                    result.append((self.__rows - 1 - height, column))
+        return result
+
     def check_draw(self):
-        if all(self.get_element(0,col) != ' ' for col in range(self.columns)):
-            return True
-        return False
+        return self.is_full()
 
     def is_full(self):
         """
         Check if the board is completely filled.
         """
-        return all(self.get_element(0, col) != ' ' for col in range(self.columns))
+        return self._mask & self._top_mask == self._top_mask
 
 
 
@@ -141,5 +433,3 @@ board.place_disc(1, 4)  # Computer places a WHITE disc
 board.place_disc(1, 1)  # Human places another RED disc
 
 print(board)"""
-
-
@@ -1,10 +1,35 @@
-from pygame.key import set_text_input_rect
-
 from core.board import Board
-from exceptions.exceptions import OutOfBoundsExceptions, ColumnFilled
+from core.transposition import TranspositionTable
+from core.move_ordering import MoveOrderer, HeuristicMoveOrderer
+from core.evaluation import IncrementalEvaluator
+from core.solver import Solver, OpeningBook
+from core.mcts import MonteCarloTreeSearch
+from core.search_stats import SearchStats
+from core.search_options import SearchOptions
+from exceptions.exceptions import OutOfBoundsExceptions, ColumnFilled, SearchTimeout
 from random import randint
+from time import perf_counter
 from core.color_class import Color
-from typing import Tuple, Optional
+from typing import Tuple, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from core.move_cache import MoveCache  # sqlite3 is only loaded by the programs using a cache
+
+
+def _search_root_move(board: Board, color, opponent_color, column: int, depth: int,
+                      search_options: SearchOptions) -> Tuple[int, float, int]:
+    """
+    Worker of the parallel root search: play one root move on a copy of the board and search it
+    with a full window and the parent's search options, so its exact minimax score is known.
+    :return: (column, score, nodes searched)
+    """
+    player = ComputerPlayer(board, search_options=search_options, opponent_color=opponent_color)
+    player.set_color(color)
+    board.place_disc(column, color)
+    if board.check_last_move_victory():
+        return column, float("inf"), 1
+    score, _ = player.minimax(board, depth - 1, -float("inf"), float("inf"), False, opponent_color)
+    return column, score, player.nodes_searched
 
 class ComputerPlayer:
     MAX_DEPTH = 10  # Maximum depth for minimax
@@ -14,19 +39,141 @@ class ComputerPlayer:
     BLOCK_OPPONENT_SCORE = -90
     CENTER_COLUMN_WEIGHT = 3
 
-    def __init__(self, board: Board):
+    MINIMIZING_KEY = 0x9E3779B97F4A7C15  # xor-ed into the hash when the opponent is to move
+    TIME_CHECK_INTERVAL = 64  # nodes searched between two looks at the clock
+    SOLVE_BUDGET_MS = 1000  # time given to the exact solver before solve falls back to hard_difficulty
+
+    def __init__(self, board: Board, transposition_table: Optional[TranspositionTable] = None,
+                 move_orderer: Optional[MoveOrderer] = None, opening_book: Optional[OpeningBook] = None,
+                 workers: int = 1, collect_stats: bool = False, search_options: Optional[SearchOptions] = None,
+                 opponent_color: Optional[int] = None, move_cache: Optional["MoveCache"] = None):
+        """
+        :param workers: Number of processes used by hard_difficulty; 1 keeps the search in this process.
+        :param collect_stats: Record a SearchStats for every call of hard_difficulty (see enable_stats).
+        :param search_options: The search techniques to use (SearchOptions defaults when omitted).
+        :param opponent_color: The opponent's color (see get_opponent_color when omitted).
+        :param move_cache: A persistent cache of searched positions, consulted before every hard_difficulty search.
+        """
         self._color = 6  # Assuming 6 is the color code for the computer
+        self._opponent_color = opponent_color
         self.__board = board
+        # kept for the whole game so every call of hard_difficulty reuses earlier searches
+        self._transposition_table = transposition_table if transposition_table is not None else TranspositionTable()
+        self._move_orderer = move_orderer if move_orderer is not None else HeuristicMoveOrderer()
+        self._evaluator = None  # built on first use, follows self.__board incrementally
+        self._batch_evaluator = None  # NumPy evaluator of evaluate_children, built on first use
+        self._opening_book = opening_book
+        self._solver = None  # exact solver, built on the first call of solve
+        self._mcts = None  # Monte Carlo tree search, built on the first call of monte_carlo and kept for its tree
+        self._nodes = 0
+        self._deadline = None
+        self._stop_requested = False
+        self._last_search_depth = 0
+        self._workers = max(1, workers)
+        self._pool = None  # process pool of the parallel root search, started on first use
+        self._collect_stats = collect_stats
+        self._search_stats = None  # SearchStats of the running search; None when statistics are off
+        self._last_stats = None
+        self.search_options = search_options if search_options is not None else SearchOptions()
+        self.move_cache = move_cache
+        self._last_score = None  # score of the last completed search, from the computer's point of view
+
+    @property
+    def board(self):
+        return self.__board
+
+    @property
+    def transposition_table(self):
+        return self._transposition_table
+
+    @property
+    def nodes_searched(self):
+        """
+        The number of minimax nodes visited by the last call of hard_difficulty.
+        """
+        return self._nodes
+
+    @property
+    def last_search_depth(self):
+        """
+        The depth of the last completed search of hard_difficulty.
+        """
+        return self._last_search_depth
 
     @property
     def color(self):
         return self._color
 
+    @property
+    def workers(self):
+        return self._workers
+
+    @property
+    def stats(self) -> Optional[SearchStats]:
+        """
+        The statistics of the last call of hard_difficulty, or None when they are not collected.
+        """
+        return self._last_stats
+
+    def enable_stats(self, enabled: bool = True):
+        """
+        Turn the search statistics on or off. When off, the search keeps no counters beyond nodes_searched.
+        """
+        self._collect_stats = enabled
+        if not enabled:
+            self._last_stats = None
+
+    def fork(self, board: Board) -> "ComputerPlayer":
+        """
+        Return a player for another board (usually a copy of this one's) that shares this player's
+        transposition table, move orderer and opening book, so what one searches warms up the other.
+        The two must not search at the same time.
+        """
+        player = ComputerPlayer(board, self._transposition_table, self._move_orderer, self._opening_book,
+                                search_options=self.search_options, opponent_color=self._opponent_color,
+                                move_cache=self.move_cache)
+        player._color = self._color
+        return player
+
+    def request_stop(self):
+        """
+        Ask a running hard_difficulty (usually on another thread) to return as soon as possible,
+        with the best move found so far.
+        """
+        self._stop_requested = True
+
+    def close(self):
+        """
+        Shut down the worker processes of the parallel searches, if any were started.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._mcts is not None:
+            self._mcts.close()
+
 
 
     def set_color(self,color):
+        if color != self._color:
+            self._forget_colors()
         self._color = color
 
+    def set_opponent_color(self, color):
+        if color != self.get_opponent_color():
+            self._forget_colors()
+        self._opponent_color = color
+
+    def _forget_colors(self):
+        """
+        Drop what was computed for the old colors: the table's scores and the evaluators.
+        """
+        self._transposition_table.clear()
+        if self._evaluator is not None:
+            self._evaluator.detach()
+            self._evaluator = None
+        self._batch_evaluator = None
+
     def easy_difficulty(self):
         while True:
             try:
@@ -36,16 +183,14 @@ class ComputerPlayer:
             except OutOfBoundsExceptions:
                 continue
 
-    def is_valid_move(self, col):
-        """Check if a column has space for a disc."""
-        return 0 <= col < self.__board.columns and self.__board.get_element(0, col) == ' '
+    def is_valid_move(self, col, board=None):
+        """Check if a column has space for a disc, on the player's board unless another one is given."""
+        board = self.__board if board is None else board
+        return 0 <= col < board.columns and board.get_element(0, col) == ' '
 
-    def undo_move(self, col):
-        """Undo the last move in the given column."""
-        for row in range(self.__board.rows):
-            if self.__board.get_element(row, col) != ' ':
-                self.__board.add_element(row, col, ' ')
-                break
+    def undo_move(self, col, board=None):
+        """Undo the last move in the given column, on the player's board unless another one is given."""
+        (self.__board if board is None else board).undo_move(col)
 
     def medium_difficulty(self, opponent_color):
         """
@@ -55,99 +200,543 @@ class ComputerPlayer:
         3. Make a random move.
         """
         # Try to win the game
-        for col in range(self.__board.columns):
-            if self.is_valid_move(col):
-                self.__board.place_disc(col, self._color)
-                if self.__board.check_victory(self._color):
-                    self.undo_move(col)
-                    return col
-                self.undo_move(col)
+        winning = self.__board.winning_columns(self._color)
+        if winning:
+            return winning[0]
 
         # Try to block the opponent's win
-        for col in range(self.__board.columns):
-            if self.is_valid_move(col):
-                self.__board.place_disc(col, opponent_color)
-                if self.__board.check_victory(opponent_color):
-                    self.undo_move(col)
-                    return col
-                self.undo_move(col)
+        blocking = self.__board.winning_columns(opponent_color)
+        if blocking:
+            return blocking[0]
 
         # Make a random valid move if no immediate win or block is possible
         return self.easy_difficulty()
 
     def get_opponent_color(self) -> int:
+        """
+        The color given with set_opponent_color; without one, RED against WHITE and WHITE against any other color.
+        """
+        if self._opponent_color is not None:
+            return self._opponent_color
         return 1 if self._color == 6 else 6
 
-    def hard_difficulty(self, depth: int = 3) -> int:
+    def hard_difficulty(self, depth: int = 3, time_budget_ms: Optional[float] = None, min_depth: int = 1) -> int:
         """
         Use the minimax algorithm with alpha-beta pruning to determine the best move.
         :param depth: Maximum depth to search in the game tree.
+        :param time_budget_ms: When given, search with iterative deepening (up to MAX_DEPTH) and
+                               return the move of the deepest iteration finished within this many milliseconds.
+        :param min_depth: With a time budget, the iterations up to this depth ignore it, so the
+                          search is never shallower (request_stop still interrupts them).
+        With more than one worker the last iteration of a fixed-depth search is split across processes
+        by root move.
         :return: Column number for the best move.
         """
         if depth > self.MAX_DEPTH:
             depth = self.MAX_DEPTH
 
         opponent_color = self.get_opponent_color()
+        self._transposition_table.new_search()
+        self._move_orderer.new_search()
+        self._nodes = 0
+        self._stop_requested = False
+        start_moves = self.__board.move_count
+        self._last_score = None
+        cache = self.move_cache
+        stats = self._search_stats = SearchStats() if self._collect_stats else None
+        if stats is not None:
+            stats.start(start_moves, self._transposition_table)
         try:
-            _, column = self.minimax(self.__board, depth, -float("inf"), float("inf"), True, opponent_color)
+            if cache is not None:
+                needed = depth if time_budget_ms is None else max(cache.budget_depth, min_depth)
+                cached = cache.lookup(self.__board, self._color, needed)
+                if cached is not None and self.is_valid_move(cached[0]):
+                    column, self._last_score, self._last_search_depth = cached
+                    if stats is not None:
+                        stats.cache_hit = True
+                    return column
+            if time_budget_ms is None:
+                # deepening up to the depth costs little with the table and leaves a move if stopped early;
+                # with workers the last iteration is split across processes
+                last_iteration = self._parallel_root_search if self._workers > 1 else None
+                column = self._iterative_deepening(None, opponent_color, max_depth=depth,
+                                                   last_iteration=last_iteration)
+            else:
+                column = self._iterative_deepening(time_budget_ms, opponent_color, min_depth)
             if column is not None:
+                if cache is not None and self._last_score is not None:
+                    cache.store(self.__board, self._color, column, self._last_score, self._last_search_depth)
                 return column
             else:
                 raise RuntimeError("No valid moves available during hard difficulty.")
         except RuntimeError:
             return self.medium_difficulty(opponent_color)
+        finally:
+            if stats is not None:
+                stats.finish(self._nodes, self._transposition_table)
+                self._search_stats = None
+            self._last_stats = stats
 
-    def minimax(self, board, depth: int, alpha: float, beta: float, maximizing_player: bool, opponent_color: int) -> \
-    Tuple[float, Optional[int]]:
+    def expected_reply(self) -> Optional[int]:
         """
-        Minimax with alpha-beta pruning.
+        The opponent's move the last search expects on the current board (the opponent being to move),
+        read from the transposition table; None when the position was not searched.
         """
-        if depth == 0 or board.is_full() or board.check_victory(self._color) or board.check_victory(opponent_color):
-            return self.evaluate_board(board), None
+        board = self.__board
+        key, mirrored = self._table_key(board, False)
+        entry = self._transposition_table.probe(key)
+        if entry is None or entry[3] is None:
+            return None
+        return board.mirror_column(entry[3]) if mirrored else entry[3]
+
+    def _unwind(self, move_count: int):
+        """
+        Take back the moves an interrupted search left on the board.
+        """
+        board = self.__board
+        while board.move_count > move_count:
+            board.undo_move(board.last_move[1])
+
+    def _parallel_root_search(self, board, depth: int, previous_score: Optional[float], opponent_color: int,
+                              first_move: Optional[int]) -> Tuple[float, Optional[int]]:
+        """
+        The last iteration of a fixed-depth search, with every root move searched in its own worker
+        process with a full window; a drop-in for _aspiration_search.
+        The sequential search plays the first move of its root order with the highest score, so the
+        root is ordered the way negamax orders it and the same move is picked. When the aspiration
+        window of the sequential search would have failed on a tie, its re-search orders the root
+        differently; only then is the root searched again here, sequentially. With lmr the reduced
+        searches depend on the move order of each search, so the scores, and sometimes the moves, differ.
+        """
+        if board.check_last_move_victory():
+            return self._aspiration_search(board, depth, previous_score, opponent_color, first_move)
+        winning = board.winning_columns(self._color)
+        if winning:
+            return float("inf"), winning[0]
+        key, mirrored = self._table_key(board, True)
+        entry = self._transposition_table.probe(key)
+        if entry is not None and entry[0] >= depth and entry[3] is not None:
+            # the sequential search would start from the stored result instead
+            return self._aspiration_search(board, depth, previous_score, opponent_color, first_move)
+        forced = board.winning_columns(opponent_color) if depth >= 2 else None
+        if forced and len(forced) > 1:
+            return -float("inf"), forced[0]
+        if forced:
+            valid_moves = forced
+        else:
+            tt_move = entry[3] if entry is not None else None
+            if mirrored and tt_move is not None:
+                tt_move = board.mirror_column(tt_move)
+            valid_moves = [col for col in range(board.columns) if self.is_valid_move(col, board)]
+            valid_moves = self._move_orderer.order(board, valid_moves, True,
+                                                   first_move if first_move in valid_moves else tt_move)
+        if self._pool is None:
+            from concurrent.futures import ProcessPoolExecutor  # imported here: it pulls in multiprocessing
+            self._pool = ProcessPoolExecutor(max_workers=self._workers)
+        snapshot = board.copy()
+        futures = [self._pool.submit(_search_root_move, snapshot, self._color, opponent_color, col, depth,
+                                     self.search_options) for col in valid_moves]
+        scores = []
+        for future in futures:
+            column, score, nodes = future.result()
+            self._nodes += nodes
+            scores.append(score)
+        best_score = max(scores)
+        if best_score == -float("inf"):
+            return best_score, None  # every move loses: the sequential search finds no best column either
+        best_column = valid_moves[scores.index(best_score)]
+        options = self.search_options
+        if scores.count(best_score) > 1 and options.negamax and options.aspiration and previous_score is not None \
+                and previous_score not in (float("inf"), -float("inf")):
+            alpha = previous_score - options.aspiration_window
+            beta = previous_score + options.aspiration_window
+            # failing high, the re-search starts with the first move that reached beta, which keeps the
+            # tie when it has the best score; after any other failure the order of the re-search is unknown
+            first_high = next((score for score in scores if score >= beta), None)
+            if not alpha < best_score < beta and first_high != best_score:
+                return self._aspiration_search(board, depth, previous_score, opponent_color, first_move)
+        return best_score, best_column
+
+    def _iterative_deepening(self, time_budget_ms: Optional[float], opponent_color: int, min_depth: int = 1,
+                             max_depth: Optional[int] = None, last_iteration=None) -> Optional[int]:
+        """
+        Search at depth 1, 2, 3, ... until the time budget runs out (or max_depth, MAX_DEPTH by default,
+        is searched), trying the previous best move first. Without a budget only request_stop ends
+        it early. The iterations up to min_depth (at least the first one) ignore the budget, only
+        request_stop interrupts them, so there is a move even with a tiny budget.
+        :param last_iteration: Searches the root of the deepest iteration instead of _aspiration_search.
+        """
+        board = self.__board
+        start_moves = board.move_count
+        empty_cells = board.rows * board.columns - board.disc_count
+        deadline = None if time_budget_ms is None else perf_counter() + time_budget_ms / 1000
+        best_column = None
+        self._last_search_depth = 0
+        scores = {}  # depth -> score of the iteration
+        max_depth = min(self.MAX_DEPTH if max_depth is None else max_depth, empty_cells)
+        for depth in range(1, max_depth + 1):
+            self._deadline = deadline if depth > max(1, min_depth) else None
+            search = last_iteration if depth == max_depth and last_iteration is not None else self._aspiration_search
+            try:
+                # the evaluation swings with the side that made the last move, so the window is
+                # centred on the last iteration whose leaves had the same side to move
+                score, column = search(board, depth, scores.get(depth - 2), opponent_color, best_column)
+            except SearchTimeout:
+                self._unwind(start_moves)
+                if self._search_stats is not None:
+                    self._search_stats.timed_out = True
+                break
+            finally:
+                self._deadline = None
+            if column is None:
+                break
+            best_column = column
+            scores[depth] = self._last_score = score
+            self._last_search_depth = depth
+            if self._search_stats is not None:
+                self._search_stats.record_iteration(depth, self._nodes, score, column)
+            if score in (float("inf"), -float("inf")):
+                break
+        return best_column
 
-        valid_moves = [col for col in range(board.columns) if self.is_valid_move(col)]
-        if not valid_moves:
+    def _aspiration_search(self, board, depth: int, previous_score: Optional[float], opponent_color: int,
+                           first_move: Optional[int]) -> Tuple[float, Optional[int]]:
+        """
+        Search the root, with an aspiration window around the previous iteration's score when enabled.
+        A score outside the window only bounds the real one, so the window is opened on that side and
+        the root searched again.
+        """
+        options = self.search_options
+        if not (options.negamax and options.aspiration) or previous_score is None \
+                or previous_score in (float("inf"), -float("inf")):
+            return self.minimax(board, depth, -float("inf"), float("inf"), True, opponent_color, first_move=first_move)
+        alpha = previous_score - options.aspiration_window
+        beta = previous_score + options.aspiration_window
+        while True:
+            score, column = self.negamax(board, depth, alpha, beta, True, opponent_color, first_move=first_move)
+            if score <= alpha != -float("inf"):
+                alpha = -float("inf")
+            elif score >= beta != float("inf"):
+                beta = float("inf")
+            else:
+                return score, column
+            first_move = column if column is not None else first_move
+
+    def solve(self, time_budget_ms: Optional[float] = None) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Play perfectly: solve the position exactly, the computer being the side to move.
+        Without an opening book early positions take minutes to solve, so the solver gets
+        time_budget_ms (SOLVE_BUDGET_MS by default); when it runs out, hard_difficulty answers
+        instead with the same budget, so the move takes at most about twice as long.
+        :param time_budget_ms: Milliseconds for the solver; float("inf") waits for the exact answer.
+        :return: (score, column) where score is 0 for a draw, positive when the computer wins
+                 (larger for quicker wins) and negative when it loses; column is None on a full board.
+                 score is None when the solver ran out of time and the column is hard_difficulty's.
+        """
+        if time_budget_ms is None:
+            time_budget_ms = self.SOLVE_BUDGET_MS
+        board = self.__board
+        if self._solver is None or (self._solver.rows, self._solver.columns) != (board.rows, board.columns):
+            book = self._opening_book
+            if book is not None and (book.rows, book.columns) != (board.rows, board.columns):
+                book = None
+            self._solver = Solver(board.rows, board.columns, book)
+        budget = None if time_budget_ms == float("inf") else time_budget_ms
+        try:
+            return self._solver.best_move(board.bitboard(self._color), board.mask, budget)
+        except SearchTimeout:
+            return None, self.hard_difficulty(time_budget_ms=time_budget_ms)
+
+    def monte_carlo(self, playouts: Optional[int] = None, time_budget_ms: Optional[float] = None) -> int:
+        """
+        Use Monte Carlo tree search (core.mcts) instead of minimax to determine the best move.
+        The search is anytime: request_stop ends it with the most played move so far. Its tree is
+        kept from one move to the next, and with more than one worker the other processes grow
+        trees of their own from the same position. nodes_searched counts the playouts.
+        :param playouts: Number of playouts (MonteCarloTreeSearch.DEFAULT_PLAYOUTS without a time budget).
+        :param time_budget_ms: When given, search for this many milliseconds (or until `playouts`, if given too).
+        :return: Column number for the best move.
+        """
+        board = self.__board
+        if self._mcts is None or (self._mcts.rows, self._mcts.columns) != (board.rows, board.columns):
+            if self._mcts is not None:
+                self._mcts.close()
+            self._mcts = MonteCarloTreeSearch(board.rows, board.columns, self._workers)
+        self._stop_requested = False
+        column = self._mcts.best_move(board.bitboard(self._color), board.mask, time_budget_ms, playouts,
+                                      stop=lambda: self._stop_requested)
+        self._nodes = self._mcts.playouts
+        return column
+
+    def minimax(self, board, depth: int, alpha: float, beta: float, maximizing_player: bool, opponent_color: int,
+                first_move: Optional[int] = None) -> Tuple[float, Optional[int]]:
+        """
+        Search a position with alpha-beta pruning and a transposition table.
+        Scores are always from the computer's point of view, the computer maximizing them.
+        Runs the negamax core or the classic alpha-beta, depending on search_options.
+        :param first_move: A column to search before the others (the best move of a previous iteration).
+        """
+        if not self.search_options.negamax:
+            return self._alpha_beta(board, depth, alpha, beta, maximizing_player, opponent_color, first_move)
+        if maximizing_player:
+            return self.negamax(board, depth, alpha, beta, True, opponent_color, first_move)
+        score, column = self.negamax(board, depth, -beta, -alpha, False, opponent_color, first_move)
+        return -score, column
+
+    def negamax(self, board, depth: int, alpha: float, beta: float, computer_to_move: bool, opponent_color: int,
+                first_move: Optional[int] = None) -> Tuple[float, Optional[int]]:
+        """
+        Negamax with alpha-beta pruning, the side to move maximizing its own score; with principal
+        variation search and late-move reductions when search_options enable them.
+        The transposition table keeps the computer's point of view, like the classic search.
+        :return: (score for the side to move, best column)
+        """
+        self._nodes += 1
+        if self._nodes % self.TIME_CHECK_INTERVAL == 0 and (
+                self._stop_requested or self._deadline is not None and perf_counter() > self._deadline):
+            raise SearchTimeout()
+        sign = 1 if computer_to_move else -1
+        if board.is_full() or board.check_last_move_victory():
+            if self._search_stats is not None:
+                self._search_stats.record_leaf(board.move_count)
+            return sign * self.evaluate_board(board), None
+        mover, other = (self._color, opponent_color) if computer_to_move else (opponent_color, self._color)
+        winning = board.winning_columns(mover)
+        if winning:
+            if self._search_stats is not None:
+                self._search_stats.record_leaf(board.move_count)
+            return float("inf"), winning[0]
+        if depth == 0:
+            if self._search_stats is not None:
+                self._search_stats.record_leaf(board.move_count)
+            return sign * self.evaluate_board(board), None
+
+        key, mirrored = self._table_key(board, computer_to_move)
+        entry = self._transposition_table.probe(key)
+        tt_move = entry[3] if entry is not None else None
+        if mirrored and tt_move is not None:
+            tt_move = board.mirror_column(tt_move)
+        if entry is not None and entry[0] >= depth and tt_move is not None:
+            entry_score, flag = sign * entry[1], entry[2]
+            if flag != TranspositionTable.EXACT and sign < 0:  # a bound for the computer is the opposite one here
+                flag = TranspositionTable.LOWER_BOUND + TranspositionTable.UPPER_BOUND - flag
+            if flag == TranspositionTable.EXACT:
+                if self._search_stats is not None:
+                    self._search_stats.table_cutoffs += 1
+                return entry_score, tt_move
+            if flag == TranspositionTable.LOWER_BOUND:
+                alpha = max(alpha, entry_score)
+            else:
+                beta = min(beta, entry_score)
+            if alpha >= beta:
+                if self._search_stats is not None:
+                    self._search_stats.table_cutoffs += 1
+                return entry_score, tt_move
+        original_alpha, original_beta = alpha, beta
+
+        forced = board.winning_columns(other) if depth >= 2 else None
+        if forced and len(forced) > 1:
+            return -float("inf"), forced[0]
+        if forced:
+            valid_moves = forced
+        else:
+            valid_moves = [col for col in range(board.columns) if self.is_valid_move(col, board)]
+            valid_moves = self._move_orderer.order(board, valid_moves, computer_to_move,
+                                                   first_move if first_move in valid_moves else tt_move)
+
+        options = self.search_options
+        reduce_late_moves = options.lmr and depth >= options.lmr_min_depth and not forced
+        value = -float("inf")
+        best_column = None
+        for index, col in enumerate(valid_moves):
+            board.place_disc(col, mover)
+            if index == 0:
+                score = -self.negamax(board, depth - 1, -beta, -alpha, not computer_to_move, opponent_color)[0]
+            else:
+                # a null window only asks whether the move beats alpha, which is cheaper to answer
+                probe_beta = alpha + 1 if options.pvs and alpha != -float("inf") else beta
+                reduction = 1 if reduce_late_moves and index >= options.lmr_full_moves else 0
+                score = -self.negamax(board, depth - 1 - reduction, -probe_beta, -alpha, not computer_to_move,
+                                      opponent_color)[0]
+                if reduction and score > alpha:
+                    score = -self.negamax(board, depth - 1, -probe_beta, -alpha, not computer_to_move,
+                                          opponent_color)[0]
+                if probe_beta != beta and alpha < score < beta:
+                    score = -self.negamax(board, depth - 1, -beta, -alpha, not computer_to_move, opponent_color)[0]
+            board.undo_move(col)
+            if score > value:
+                value = score
+                best_column = col
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                self._move_orderer.record_cutoff(board, col, depth, computer_to_move)
+                if self._search_stats is not None:
+                    self._search_stats.record_cutoff(index)
+                break
+        stored_column = board.mirror_column(best_column) if mirrored and best_column is not None else best_column
+        if computer_to_move:
+            self._store(key, depth, value, original_alpha, original_beta, stored_column)
+        else:
+            self._store(key, depth, -value, -original_beta, -original_alpha, stored_column)
+        return value, best_column
+
+    def _alpha_beta(self, board, depth: int, alpha: float, beta: float, maximizing_player: bool, opponent_color: int,
+                    first_move: Optional[int] = None) -> Tuple[float, Optional[int]]:
+        """
+        Classic minimax with alpha-beta pruning and a transposition table, with a maximizing and
+        a minimizing branch; scores are always from the computer's point of view.
+        """
+        self._nodes += 1
+        if self._nodes % self.TIME_CHECK_INTERVAL == 0 and (
+                self._stop_requested or self._deadline is not None and perf_counter() > self._deadline):
+            raise SearchTimeout()
+        if board.is_full() or board.check_last_move_victory():
+            if self._search_stats is not None:
+                self._search_stats.record_leaf(board.move_count)
+            return self.evaluate_board(board), None
+        # the board's threat map settles the node when the side to move wins at once, at any depth
+        winning = board.winning_columns(self._color if maximizing_player else opponent_color)
+        if winning:
+            if self._search_stats is not None:
+                self._search_stats.record_leaf(board.move_count)
+            return (float("inf") if maximizing_player else -float("inf")), winning[0]
+        if depth == 0:
+            if self._search_stats is not None:
+                self._search_stats.record_leaf(board.move_count)
             return self.evaluate_board(board), None
 
+        table = self._transposition_table
+        key, mirrored = self._table_key(board, maximizing_player)
+        entry = table.probe(key)
+        tt_move = entry[3] if entry is not None else None
+        if mirrored and tt_move is not None:
+            tt_move = board.mirror_column(tt_move)
+        if entry is not None and entry[0] >= depth and tt_move is not None:
+            entry_score, flag = entry[1], entry[2]
+            if flag == TranspositionTable.EXACT:
+                if self._search_stats is not None:
+                    self._search_stats.table_cutoffs += 1
+                return entry_score, tt_move
+            if flag == TranspositionTable.LOWER_BOUND:
+                alpha = max(alpha, entry_score)
+            else:
+                beta = min(beta, entry_score)
+            if alpha >= beta:
+                if self._search_stats is not None:
+                    self._search_stats.table_cutoffs += 1
+                return entry_score, tt_move
+        original_alpha, original_beta = alpha, beta
+
+        if depth >= 2:
+            # a winning cell of the other side must be blocked at once; with two of them the node is lost
+            forced = board.winning_columns(opponent_color if maximizing_player else self._color)
+            if len(forced) > 1:
+                return (-float("inf") if maximizing_player else float("inf")), forced[0]
+        else:
+            forced = None
+        if forced:
+            valid_moves = forced
+        else:
+            valid_moves = [col for col in range(board.columns) if self.is_valid_move(col, board)]
+            valid_moves = self._move_orderer.order(board, valid_moves, maximizing_player,
+                                                   first_move if first_move in valid_moves else tt_move)
+
         if maximizing_player:
             value = -float("inf")
             best_column = None
-            for col in valid_moves:
+            for index, col in enumerate(valid_moves):
                 board.place_disc(col, self._color)
-                if board.check_victory(self._color):
-                    board.undo_move(col)
-                    return float("inf"), col
-                score, _ = self.minimax(board, depth - 1, alpha, beta, False, opponent_color)
+                score, _ = self._alpha_beta(board, depth - 1, alpha, beta, False, opponent_color)
                 board.undo_move(col)
                 if score > value:
                     value = score
                     best_column = col
                 alpha = max(alpha, value)
                 if alpha >= beta:
+                    self._move_orderer.record_cutoff(board, col, depth, True)
+                    if self._search_stats is not None:
+                        self._search_stats.record_cutoff(index)
                     break
+            self._store(key, depth, value, original_alpha, original_beta,
+                        board.mirror_column(best_column) if mirrored and best_column is not None else best_column)
             return value, best_column
         else:
             value = float("inf")
             best_column = None
-            for col in valid_moves:
+            for index, col in enumerate(valid_moves):
                 board.place_disc(col, opponent_color)
-                if board.check_victory(opponent_color):
-                    board.undo_move(col)
-                    return -float("inf"), col
-                score, _ = self.minimax(board, depth - 1, alpha, beta, True, opponent_color)
+                score, _ = self._alpha_beta(board, depth - 1, alpha, beta, True, opponent_color)
                 board.undo_move(col)
                 if score < value:
                     value = score
                     best_column = col
                 beta = min(beta, value)
                 if alpha >= beta:
+                    self._move_orderer.record_cutoff(board, col, depth, False)
+                    if self._search_stats is not None:
+                        self._search_stats.record_cutoff(index)
                     break
+            self._store(key, depth, value, original_alpha, original_beta,
+                        board.mirror_column(best_column) if mirrored and best_column is not None else best_column)
             return value, best_column
 
+    def _table_key(self, board, maximizing_player: bool) -> Tuple[int, bool]:
+        """
+        Return the transposition table key of a position and whether it is the key of its mirror image.
+        On boards with an odd number of columns the evaluation is left-right symmetric, so a position
+        and its mirror image share the entry of the smaller hash; its move is stored for that image.
+        """
+        position_hash = board.zobrist_hash
+        mirrored = board.columns % 2 == 1 and board.mirror_hash < position_hash
+        if mirrored:
+            position_hash = board.mirror_hash
+        return (position_hash if maximizing_player else position_hash ^ self.MINIMIZING_KEY), mirrored
+
+    def _store(self, key: int, depth: int, value: float, alpha: float, beta: float, best_column: Optional[int]):
+        """
+        Save a searched node in the transposition table with the bound its window allows.
+        """
+        if value <= alpha:
+            flag = TranspositionTable.UPPER_BOUND
+        elif value >= beta:
+            flag = TranspositionTable.LOWER_BOUND
+        else:
+            flag = TranspositionTable.EXACT
+        self._transposition_table.store(key, depth, value, flag, best_column)
+
     def evaluate_board(self, board) -> int:
         """
         Evaluate the board state for the computer player.
         Positive values favor the computer; negative values favor the opponent.
+        The player's own board is scored by an incremental evaluator, other boards by a full scan.
+        The board's threat map is read by the search instead (wins and forced blocks settle a node
+        before any evaluation): stacked and odd/even threat terms made every leaf about 15% slower
+        without a measurable gain in self-play, so the score stays made of windows.
+        """
+        if board is not self.__board:
+            return self.evaluate_board_full(board)
+        if self._evaluator is None:
+            self._evaluator = IncrementalEvaluator(board, self._color, self.get_opponent_color(),
+                                                   self.score_window, self.CENTER_COLUMN_WEIGHT)
+        return self._evaluator.score
+
+    def evaluate_children(self, color) -> dict:
+        """
+        Score every move of `color` on the player's board in one vectorized call (needs NumPy).
+        :return: dict column -> evaluate_board score of the board after that move.
+        """
+        from core.batch_eval import BatchEvaluator  # imported here: NumPy is only needed for batches
+        board = self.__board
+        evaluator = self._batch_evaluator
+        if evaluator is None or (evaluator.rows, evaluator.columns) != (board.rows, board.columns):
+            evaluator = self._batch_evaluator = BatchEvaluator.for_player(self, board)
+        columns, children = evaluator.expand_children(board, color)
+        return {column: int(score) for column, score in zip(columns, evaluator.evaluate(children))}
+
+    def evaluate_board_full(self, board) -> int:
+        """
+        Evaluate the board by scanning all of its windows; gives the same scores as evaluate_board.
         """
         score = 0
 
@@ -0,0 +1,162 @@
+"""
+Engine API that does not belong to any game.
+
+ComputerPlayer plays on one Board that it follows move by move. Engine answers
+best_move(position, side_to_move, budget) on a snapshot of any position instead, and keeps
+only its caches between calls. EnginePool shares a few engines between threads. Servers and
+batch jobs can keep one engine, or one pool, for all their games.
+"""
+import queue
+from contextlib import contextmanager
+from typing import Optional
+
+from core.board import Board
+from core.color_class import Color
+from core.computer import ComputerPlayer
+from core.position import board_from_key, board_from_moves, split_key
+from core.transposition import TranspositionTable
+
+
+class Engine:
+    """
+    A reusable search engine.
+
+    best_move never touches the position it is given. It searches a private board built from
+    the snapshot and keeps nothing of it except what warms up later searches: the transposition
+    table and move orderer of each pair of colors, the opening book and the move cache. Scores
+    in a table are from the point of view of the side to move, so every pair (side to move,
+    opponent) gets its own. An engine runs one search at a time; use an EnginePool to share
+    engines between threads.
+    """
+
+    def __init__(self, rows=6, columns=7, depth=3, table_size=TranspositionTable.DEFAULT_SIZE, opening_book=None,
+                 search_options=None, move_cache=None):
+        """
+        :param depth: Search depth of best_move without a budget.
+        :param table_size: Slots of each transposition table.
+        :param opening_book: A core.solver.OpeningBook shared by every search (optional).
+        :param search_options: A core.search_options.SearchOptions (defaults when omitted).
+        :param move_cache: A core.move_cache.MoveCache consulted before every search and filled by them (optional).
+        """
+        self.rows = rows
+        self.columns = columns
+        self.depth = depth
+        self._table_size = table_size
+        self._opening_book = opening_book
+        self._search_options = search_options
+        self.move_cache = move_cache
+        self._players = {}  # (side to move, opponent) -> player on an empty board, holding the caches
+        self.searches = 0
+
+    def best_move(self, position, side_to_move: int, budget: Optional[float] = None,
+                  opponent_color: Optional[int] = None, depth: Optional[int] = None, min_depth: int = 1) -> int:
+        """
+        Return the best column for the side to move.
+        :param position: A Board (left untouched), a core.position key or a move string from the
+            empty board. The players of a key or move string are side_to_move and opponent_color,
+            the one to move being side_to_move.
+        :param side_to_move: The color to play.
+        :param budget: Milliseconds to search with iterative deepening; None searches to a fixed depth.
+        :param opponent_color: The other color (the other color of the Board, or RED against WHITE
+            and WHITE against any other color when omitted).
+        :param depth: The fixed depth of a search without a budget (the engine's depth when omitted).
+        :param min_depth: With a budget, the depth searched whatever the budget (see ComputerPlayer.hard_difficulty).
+        """
+        board = self._snapshot(position, side_to_move, opponent_color)
+        if opponent_color is None:
+            opponent_color = self._other_color(board, side_to_move)
+        if board.is_full() or board.check_victory(side_to_move) or board.check_victory(opponent_color):
+            raise ValueError("The game is over in this position.")
+        self.searches += 1
+        player = self._player(side_to_move, opponent_color).fork(board)
+        return player.hard_difficulty(self.depth if depth is None else depth, time_budget_ms=budget, min_depth=min_depth)
+
+    def _player(self, side_to_move, opponent_color):
+        colors = (side_to_move, opponent_color)
+        player = self._players.get(colors)
+        if player is None:
+            player = ComputerPlayer(Board(self.rows, self.columns), TranspositionTable(self._table_size),
+                                    opening_book=self._opening_book, search_options=self._search_options,
+                                    opponent_color=opponent_color, move_cache=self.move_cache)
+            player.set_color(side_to_move)
+            self._players[colors] = player
+        return player
+
+    def _snapshot(self, position, side_to_move, opponent_color):
+        """
+        Build the private board of a search.
+        """
+        if isinstance(position, Board):
+            if (position.rows, position.columns) != (self.rows, self.columns):
+                raise ValueError(f"The engine plays on {self.rows}x{self.columns} boards, "
+                                 f"not {position.rows}x{position.columns}.")
+            return position.copy()
+        if opponent_color is None:
+            opponent_color = self._default_opponent(side_to_move)
+        if isinstance(position, str):
+            moves = len(position)
+            colors = (side_to_move, opponent_color) if moves % 2 == 0 else (opponent_color, side_to_move)
+            return board_from_moves(position, colors, self.rows, self.columns)
+        # the side to move of a key is the first player exactly when an even number of discs was played
+        discs = bin(split_key(position, self.rows, self.columns)[1]).count("1")
+        colors = (side_to_move, opponent_color) if discs % 2 == 0 else (opponent_color, side_to_move)
+        return board_from_key(position, colors, self.rows, self.columns)
+
+    @staticmethod
+    def _default_opponent(side_to_move):
+        return Color.RED if side_to_move == Color.WHITE else Color.WHITE
+
+    def _other_color(self, board, side_to_move):
+        """
+        The color of a disc of the board that is not side_to_move's, or the default opponent on a board without one.
+        """
+        for row in range(board.rows - 1, -1, -1):
+            for col in range(board.columns):
+                element = board.get_element(row, col)
+                if element not in (' ', side_to_move):
+                    return element
+        return self._default_opponent(side_to_move)
+
+
+class EnginePool:
+    """
+    A fixed set of engines shared by threads. best_move borrows an idle engine, waiting for one
+    while they are all busy, and gives it back warmer; the engine used last is lent first.
+    """
+
+    def __init__(self, size=2, **engine_options):
+        """
+        :param size: Number of engines, so of searches running at the same time.
+        :param engine_options: Arguments of every Engine.
+        """
+        if size < 1:
+            raise ValueError("An engine pool needs at least one engine.")
+        self.size = size
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(Engine(**engine_options))
+
+    @contextmanager
+    def engine(self, timeout=None):
+        """
+        Borrow an engine for a with block.
+        :param timeout: Seconds to wait for an idle engine; None waits as long as it takes.
+        :raises TimeoutError: No engine became idle in time.
+        """
+        try:
+            engine = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No engine became idle in time.") from None
+        try:
+            yield engine
+        finally:
+            self._idle.put(engine)
+
+    def best_move(self, position, side_to_move, budget=None, opponent_color=None, depth=None, min_depth=1,
+                  timeout=None):
+        """
+        Engine.best_move on an idle engine of the pool.
+        :param timeout: Seconds to wait for an idle engine (see engine).
+        """
+        with self.engine(timeout) as engine:
+            return engine.best_move(position, side_to_move, budget, opponent_color, depth, min_depth)
@@ -0,0 +1,134 @@
+from functools import lru_cache
+
+_OTHER = object()  # stands for a disc that belongs to neither player when building the score table
+
+
+@lru_cache(maxsize=None)
+def board_windows(rows, columns):
+    """
+    Return every line of 4 cells of a board geometry, as tuples of (row, column).
+    The order is the one ComputerPlayer.evaluate_board uses: horizontal, vertical, then both diagonals.
+    """
+    windows = []
+    for row in range(rows):
+        for col in range(columns - 3):
+            windows.append(tuple((row, col + i) for i in range(4)))
+    for col in range(columns):
+        for row in range(rows - 3):
+            windows.append(tuple((row + i, col) for i in range(4)))
+    for row in range(rows - 3):
+        for col in range(columns - 3):
+            windows.append(tuple((row + i, col + i) for i in range(4)))
+    for row in range(rows - 3):
+        for col in range(columns - 3):
+            windows.append(tuple((row + 3 - i, col + i) for i in range(4)))
+    return tuple(windows)
+
+
+@lru_cache(maxsize=None)
+def cell_windows(rows, columns):
+    """
+    Return, for every cell (indexed row * columns + column), the indexes of the windows that contain it.
+    """
+    cells = [[] for _ in range(rows * columns)]
+    for index, window in enumerate(board_windows(rows, columns)):
+        for row, col in window:
+            cells[row * columns + col].append(index)
+    return tuple(tuple(indexes) for indexes in cells)
+
+
+def window_score_table(color, opponent_color, window_score):
+    """
+    Return the score of a window for every (own, opponent, occupied) count of discs in it,
+    flattened as own * 25 + opponent * 5 + occupied (a list of 125 scores).
+    """
+    table = [0] * 125
+    for own in range(5):
+        for opponent in range(5 - own):
+            for other in range(5 - own - opponent):
+                window = [color] * own + [opponent_color] * opponent + [_OTHER] * other
+                window += [' '] * (4 - len(window))
+                table[own * 25 + opponent * 5 + own + opponent + other] = window_score(window, color)
+    return table
+
+
+class IncrementalEvaluator:
+    """
+    Keeps the heuristic score of a board up to date while discs are placed and removed.
+
+    For every window it stores how many discs of the player, of the opponent and in total it
+    holds; a move only touches the (at most 16) windows through its cell, so the score of a
+    leaf is read from a running total instead of rescanning all the windows of the board.
+    The evaluator registers itself as a listener of the board it is built for.
+    """
+
+    def __init__(self, board, color, opponent_color, window_score, center_weight):
+        """
+        :param board: The board to follow.
+        :param color: The color the score is computed for.
+        :param opponent_color: The color counted against it.
+        :param window_score: Function scoring a list of 4 cells for a color, like ComputerPlayer.score_window.
+        :param center_weight: Points for each disc of the player in the center column.
+        """
+        self._board = board
+        self._color = color
+        self._opponent_color = opponent_color
+        self._center_column = board.columns // 2
+        self._center_weight = center_weight
+        self._columns = board.columns
+        self._cell_windows = cell_windows(board.rows, board.columns)
+        windows = board_windows(board.rows, board.columns)
+
+        self._table = window_score_table(color, opponent_color, window_score)
+
+        self._codes = [0] * len(windows)
+        self._score = 0
+        for index, window in enumerate(windows):
+            code = 0
+            for row, col in window:
+                code += self._cell_code(board.get_element(row, col))
+            self._codes[index] = code
+            self._score += self._table[code]
+        for row in range(board.rows):
+            if board.get_element(row, self._center_column) == color:
+                self._score += center_weight
+        board.add_listener(self)
+
+    def _cell_code(self, element):
+        if element == ' ':
+            return 0
+        if element == self._color:
+            return 26
+        if element == self._opponent_color:
+            return 6
+        return 1
+
+    @property
+    def score(self):
+        return self._score
+
+    def disc_placed(self, row, column, color):
+        self._update(row, column, self._cell_code(color))
+        if column == self._center_column and color == self._color:
+            self._score += self._center_weight
+
+    def disc_removed(self, row, column, color):
+        self._update(row, column, -self._cell_code(color))
+        if column == self._center_column and color == self._color:
+            self._score -= self._center_weight
+
+    def _update(self, row, column, delta):
+        table = self._table
+        codes = self._codes
+        score = self._score
+        for index in self._cell_windows[row * self._columns + column]:
+            code = codes[index]
+            score += table[code + delta] - table[code]
+            codes[index] = code + delta
+        self._score = score
+
+    def detach(self):
+        """
+        Stop following the board.
+        """
+        self._board.remove_listener(self)
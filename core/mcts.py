@@ -0,0 +1,271 @@
+"""
+Monte Carlo tree search: an anytime alternative to the minimax search of ComputerPlayer.
+
+The search works on the bitboards of core.solver.Solver: a position is (current, mask), the
+discs of the side to move and all the discs. Every iteration walks down the tree with UCT,
+adds one node and finishes the game with a light playout (win when possible, otherwise block
+the opponent's win, otherwise a random column), then counts the result in every node of the
+path. The move played is the most visited one, so the search can stop after any iteration
+and still answer.
+
+The tree is kept between searches: when the next position follows the root by one or two
+moves (the computer's move and the reply), the matching subtree becomes the root and its
+playouts count again. With several workers, other processes grow trees of their own from
+the same root (root parallelization) and the visits of the root moves are added up.
+"""
+from math import log, sqrt
+from random import Random
+from time import perf_counter
+from typing import Callable, Optional
+
+from core.board import line_completions
+
+_worker_searches = {}  # (rows, columns) -> search of a worker process, kept so its tree is reused as well
+
+
+def _search_in_worker(rows, columns, exploration, current, mask, time_budget_ms, playouts):
+    """
+    Worker of the root parallelization: grow the tree of this process from a position.
+    :return: (statistics of the root moves, playouts run)
+    """
+    search = _worker_searches.get((rows, columns))
+    if search is None or search.exploration != exploration:
+        search = _worker_searches[(rows, columns)] = MonteCarloTreeSearch(rows, columns, exploration=exploration)
+    deadline = None if time_budget_ms is None else perf_counter() + time_budget_ms / 1000
+    done = search.grow(current, mask, deadline, playouts)
+    return search.root_statistics(), done
+
+
+class _Node:
+    __slots__ = ("column", "children", "untried", "visits", "wins", "result")
+
+    def __init__(self, column, untried, result=None):
+        self.column = column  # move leading to the node
+        self.children = []
+        self.untried = untried  # playable columns without a child yet
+        self.visits = 0
+        self.wins = 0.0  # playout results for the player who moved into the node (a draw counts half)
+        self.result = result  # 1.0 when that move won, 0.5 when it filled the board, None while the game goes on
+
+
+class MonteCarloTreeSearch:
+    """
+    UCT search with light playouts, keeping its tree from one search to the next.
+    One search runs at a time; request a stop through the `stop` argument of best_move.
+    """
+    EXPLORATION = 1.4  # UCT exploration constant, about sqrt(2)
+    DEFAULT_PLAYOUTS = 1000  # playouts of a search given neither a budget nor a number of playouts
+    MAX_NODES = 1000000  # past this many nodes the tree stops growing, the playouts go on
+
+    def __init__(self, rows=6, columns=7, workers=1, exploration=EXPLORATION, max_nodes=MAX_NODES, seed=None):
+        """
+        :param workers: Number of processes growing trees; 1 keeps the search in this process.
+        :param exploration: The UCT constant; larger values try the less promising moves more often.
+        :param max_nodes: Size of the tree past which no node is added.
+        :param seed: Seed of the playouts of this process (random when omitted).
+        """
+        self.rows = rows
+        self.columns = columns
+        self.workers = max(1, workers)
+        self.exploration = exploration
+        self.max_nodes = max_nodes
+        self._stride = rows + 1
+        self._bottom_mask = sum(1 << (col * self._stride) for col in range(columns))
+        self._board_mask = self._bottom_mask * ((1 << rows) - 1)
+        self._column_masks = [((1 << rows) - 1) << (col * self._stride) for col in range(columns)]
+        center = (columns - 1) / 2
+        self._column_order = sorted(range(columns), key=lambda col: (abs(col - center), col))
+        self._random = Random(seed)
+        self._root = None
+        self._root_position = None  # (current, mask) of the root
+        self._size = 0  # nodes in the tree, counted from above: every playout adds at most one
+        self._pool = None  # worker processes, started on first use
+        self.playouts = 0  # playouts of the last search, in every process
+        self.reused = 0  # playouts of the root kept from earlier searches when the last one started
+
+    def close(self):
+        """
+        Shut down the worker processes, if any were started.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def best_move(self, current, mask, time_budget_ms: Optional[float] = None, playouts: Optional[int] = None,
+                  stop: Optional[Callable[[], bool]] = None) -> int:
+        """
+        Return the column of the most visited root move.
+        :param current: Bitboard of the side to move.
+        :param mask: Bitboard of all the discs.
+        :param time_budget_ms: Milliseconds to search.
+        :param playouts: Number of playouts to run, in all the processes together. With a budget
+            as well the search ends at the first limit reached; with neither it runs DEFAULT_PLAYOUTS.
+        :param stop: Called after every playout; when it returns True the search ends with the best
+            move so far, without waiting for the other processes (at least one playout is run).
+        """
+        possible = (mask + self._bottom_mask) & self._board_mask
+        if not possible:
+            raise ValueError("The board is full.")
+        winning = line_completions(current, self._stride) & possible
+        columns = [col for col in self._column_order if possible & self._column_masks[col]]
+        for col in columns:
+            if winning & self._column_masks[col]:
+                self.playouts = self.reused = 0
+                return col
+        if time_budget_ms is None and playouts is None:
+            playouts = self.DEFAULT_PLAYOUTS
+        deadline = None if time_budget_ms is None else perf_counter() + time_budget_ms / 1000
+        helpers = self.workers - 1
+        local_playouts = None if playouts is None else max(1, playouts // self.workers)
+        futures = []
+        if helpers:
+            if self._pool is None:
+                from concurrent.futures import ProcessPoolExecutor  # imported here: it pulls in multiprocessing
+                self._pool = ProcessPoolExecutor(max_workers=helpers)
+            futures = [self._pool.submit(_search_in_worker, self.rows, self.columns, self.exploration, current, mask,
+                                         time_budget_ms, local_playouts) for _ in range(helpers)]
+        self.playouts = self.grow(current, mask, deadline, local_playouts, stop)
+        visits = {col: child_visits for col, (child_visits, _) in self.root_statistics().items()}
+        for future in futures:
+            if stop is not None and stop() and not future.done():
+                continue  # interrupted: the helpers finish their budget on their own
+            statistics, done = future.result()
+            self.playouts += done
+            for col, (child_visits, _) in statistics.items():
+                visits[col] = visits.get(col, 0) + child_visits
+        # most visited move, the central one among equals
+        return max(columns, key=lambda col: (visits.get(col, 0), -self._column_order.index(col)))
+
+    def root_statistics(self):
+        """
+        The (visits, wins) of every expanded root move, wins counting for the side to move, by column.
+        """
+        if self._root is None:
+            return {}
+        return {child.column: (child.visits, child.wins) for child in self._root.children}
+
+    def grow(self, current, mask, deadline: Optional[float] = None, playouts: Optional[int] = None,
+             stop: Optional[Callable[[], bool]] = None) -> int:
+        """
+        Run playouts from (current, mask) in this process until the perf_counter() deadline, the
+        number of playouts or a stop request, whichever comes first (at least one).
+        :return: The number of playouts run.
+        """
+        self._reroot(current, mask)
+        self.reused = self._root.visits
+        done = 0
+        while True:
+            self._iterate(current, mask)
+            done += 1
+            if playouts is not None and done >= playouts:
+                break
+            if deadline is not None and perf_counter() >= deadline:
+                break
+            if stop is not None and stop():
+                break
+        return done
+
+    def _reroot(self, current, mask):
+        """
+        Make (current, mask) the root, keeping the subtree of the old root when it is one or two moves further.
+        """
+        root, position = self._root, self._root_position
+        if position == (current, mask):
+            return
+        node = None
+        if root is not None:
+            node_current, node_mask = position
+            plies = (mask ^ node_mask).bit_count()
+            if not node_mask & ~mask and plies <= 2:
+                node = root
+                for ply in range(plies):
+                    # the side to move of the new root owns `current` when an even number of discs follow
+                    mover = current if (plies - ply) % 2 == 0 else current ^ mask
+                    move = mover & (node_mask + self._bottom_mask) & self._board_mask
+                    column = (move.bit_length() - 1) // self._stride
+                    node = next((child for child in node.children if child.column == column), None) if move else None
+                    if node is None:
+                        break
+                    node_current, node_mask = node_current ^ node_mask, node_mask | move
+                if node is not None and (node_current, node_mask) != (current, mask):
+                    node = None
+        if node is None or node.result is not None:
+            node = _Node(None, self._playable(mask))
+        node.column = None
+        self._root, self._root_position = node, (current, mask)
+        self._size = node.visits + 1
+
+    def _playable(self, mask):
+        possible = (mask + self._bottom_mask) & self._board_mask
+        return [col for col in range(self.columns) if possible & self._column_masks[col]]
+
+    def _iterate(self, current, mask):
+        """
+        One playout: select with UCT, expand one node, play the game out and count the result along the path.
+        """
+        node = self._root
+        path = [node]
+        bottom, column_masks, exploration = self._bottom_mask, self._column_masks, self.exploration
+        while node.result is None and not node.untried:
+            scale = exploration * sqrt(log(node.visits))
+            best, best_value = None, -1.0
+            for child in node.children:
+                value = child.wins / child.visits + scale / sqrt(child.visits)
+                if value > best_value:
+                    best, best_value = child, value
+            node = best
+            current, mask = current ^ mask, mask | ((mask + bottom) & column_masks[node.column])
+            path.append(node)
+        if node.result is None and self._size < self.max_nodes:
+            untried = node.untried
+            column = untried.pop(self._random.randrange(len(untried)))
+            move = (mask + bottom) & column_masks[column]
+            if line_completions(current, self._stride) & move:
+                child = _Node(column, [], 1.0)
+            elif mask | move == self._board_mask:
+                child = _Node(column, [], 0.5)
+            else:
+                child = _Node(column, self._playable(mask | move))
+            current, mask = current ^ mask, mask | move
+            node.children.append(child)
+            path.append(child)
+            node = child
+            self._size += 1
+        result = node.result if node.result is not None else 1.0 - self._playout(current, mask)
+        for node in reversed(path):
+            node.visits += 1
+            node.wins += result
+            result = 1.0 - result
+
+    def _playout(self, current, mask):
+        """
+        Play a game out from (current, mask): win when possible, otherwise block, otherwise a random column.
+        :return: 1.0 when the side to move wins, 0.0 when it loses, 0.5 for a draw.
+        """
+        stride, bottom, board_mask = self._stride, self._bottom_mask, self._board_mask
+        random = self._random.random
+        mine = line_completions(current, stride)
+        theirs = line_completions(current ^ mask, stride)
+        result = 1.0  # for the side to move of the loop, flipped after every move
+        while True:
+            possible = (mask + bottom) & board_mask
+            if not possible:
+                return 0.5
+            if mine & possible:
+                return result
+            forced = theirs & possible
+            if forced:
+                if forced & (forced - 1):
+                    return 1.0 - result  # two threats, one of them wins
+                move = forced
+            else:
+                moves = []
+                while possible:
+                    cell = possible & -possible
+                    moves.append(cell)
+                    possible ^= cell
+                move = moves[int(random() * len(moves))]
+            current, mask = current ^ mask, mask | move
+            # the opponent's discs did not change, nor did the cells where they would win
+            mine, theirs = theirs, line_completions(current ^ mask, stride)
+            result = 1.0 - result
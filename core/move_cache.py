@@ -0,0 +1,315 @@
+"""
+Persistent best-move cache: position -> (best move, score, depth searched), in an SQLite file.
+
+Results of ComputerPlayer.hard_difficulty are kept across games, restarts and processes, so
+common positions (the openings above all) are searched once. The file is an SQLite database
+in WAL mode: any number of processes on one host can read it while one of them writes, and
+writers wait for each other (busy timeout) instead of failing.
+
+Positions are keyed by the canonical core.position key of the side to move: a position and its
+mirror image share one entry, its move being stored for the smaller key (on boards with an odd
+number of columns only, where the search treats both alike). The key says nothing of
+the colors, and the evaluation only knows "own" and "opponent" discs, so an entry serves any
+pair of colors.
+
+The cache holds at most `capacity` positions. Every hit refreshes the position's last use, and
+the least recently used ones are evicted when it grows past that.
+Run from the repository root:
+
+    python -m core.move_cache cache.db stats
+    python -m core.move_cache cache.db warmup --plies 4 --depth 8
+    python -m core.move_cache cache.db compact --capacity 100000 --min-depth 4
+"""
+import os
+import sqlite3
+import threading
+from time import time
+
+from core.position import check_key_size, mirror_key
+
+
+class MoveCache:
+    VERSION = 1
+    DEFAULT_CAPACITY = 1000000
+    FLUSH_INTERVAL = 256  # most misses unwritten to the file's counters, stores between two size checks
+    EVICTION_SLACK = 0.1  # fraction of the capacity freed at once, so eviction does not run on every store
+
+    def __init__(self, path, rows=6, columns=7, capacity=DEFAULT_CAPACITY, budget_depth=8, timeout=10.0):
+        """
+        Open a cache, creating it for this board geometry when the file does not exist.
+        :param capacity: Number of positions kept at most.
+        :param budget_depth: Depth an entry needs to answer a search with a time budget, whose depth is not known ahead.
+        :param timeout: Seconds to wait for another process's write before giving up.
+        """
+        check_key_size(rows, columns)
+        if capacity < 1:
+            raise ValueError("The move cache needs room for at least one position.")
+        self.path = path
+        self.rows = rows
+        self.columns = columns
+        self.capacity = capacity
+        self.budget_depth = budget_depth
+        self.hits = 0
+        self.misses = 0
+        self._unflushed = [0, 0]  # hits and misses not yet added to the file's counters
+        self._stores = 0  # stores since the size was last checked
+        self._lock = threading.Lock()  # one connection, shared by the threads of a player and its forks
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._transaction() as cursor:
+            cursor.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+            cursor.execute("CREATE TABLE IF NOT EXISTS moves (key INTEGER PRIMARY KEY, move INTEGER, score REAL, "
+                           "depth INTEGER, used REAL)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS moves_used ON moves (used)")
+            for name, value in (("version", self.VERSION), ("rows", rows), ("columns", columns), ("hits", 0),
+                                ("misses", 0)):
+                cursor.execute("INSERT OR IGNORE INTO meta VALUES (?, ?)", (name, value))
+            meta = dict(cursor.execute("SELECT name, value FROM meta"))
+        if meta["version"] != self.VERSION:
+            raise ValueError(f"{path} is a move cache of another version.")
+        if (meta["rows"], meta["columns"]) != (rows, columns):
+            raise ValueError(f"{path} caches {meta['rows']}x{meta['columns']} positions, not {rows}x{columns}.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._connection is not None:
+            self.flush()
+            self._connection.close()
+            self._connection = None
+
+    def _transaction(self):
+        return _Transaction(self._connection)
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM moves").fetchone()[0]
+
+    def key(self, board, color):
+        """
+        Return (stored key, mirrored) of a board with `color` to move; mirrored when the mirror image's key is stored.
+        """
+        key = board.bitboard(color) + board.mask
+        if self.columns % 2 == 0:
+            return _signed(key), False  # the search is not left-right symmetric there (see ComputerPlayer._table_key)
+        mirrored = mirror_key(key, self.rows, self.columns)
+        if mirrored < key:
+            return _signed(mirrored), True
+        return _signed(key), False
+
+    def _row(self, key):
+        return self._connection.execute("SELECT move, score, depth FROM moves WHERE key = ?", (key,)).fetchone()
+
+    def contains(self, board, color, depth):
+        """
+        Whether lookup would find the position, without counting a hit or a miss.
+        """
+        with self._lock:
+            row = self._row(self.key(board, color)[0])
+        return row is not None and row[2] >= depth
+
+    def lookup(self, board, color, depth):
+        """
+        Return (move, score, depth) for `color` to move, searched at least `depth` deep, or None.
+        """
+        key, mirrored = self.key(board, color)
+        with self._lock:
+            row = self._row(key)
+            hit = row is not None and row[2] >= depth
+            if hit:
+                self.hits += 1
+                self._unflushed[0] += 1
+                with self._transaction() as cursor:
+                    cursor.execute("UPDATE moves SET used = ? WHERE key = ?", (time(), key))
+                    self._write_counters(cursor)
+            else:
+                self.misses += 1
+                self._unflushed[1] += 1
+                if self._unflushed[1] >= self.FLUSH_INTERVAL:
+                    self._flush_counters()
+        if not hit:
+            return None
+        move, score, searched = row
+        return (board.mirror_column(move) if mirrored else move), score, searched
+
+    def store(self, board, color, move, score, depth):
+        """
+        Save the result of a search of `color` to move; a deeper entry already there is kept.
+        """
+        key, mirrored = self.key(board, color)
+        if mirrored:
+            move = board.mirror_column(move)
+        with self._lock, self._transaction() as cursor:
+            cursor.execute("INSERT INTO moves VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                           "move = excluded.move, score = excluded.score, depth = excluded.depth, used = excluded.used "
+                           "WHERE excluded.depth >= moves.depth", (key, move, score, depth, time()))
+            self._write_counters(cursor)
+            # counting is a scan, so the size is only checked now and then
+            self._stores += 1
+            if self._stores >= max(1, min(self.FLUSH_INTERVAL, int(self.capacity * self.EVICTION_SLACK))):
+                self._stores = 0
+                if cursor.execute("SELECT COUNT(*) FROM moves").fetchone()[0] > self.capacity:
+                    self._evict(cursor, int(self.capacity * (1 - self.EVICTION_SLACK)))
+
+    @staticmethod
+    def _evict(cursor, keep):
+        """
+        Delete the least recently used positions but `keep` of them.
+        """
+        cursor.execute("DELETE FROM moves WHERE key IN "
+                       "(SELECT key FROM moves ORDER BY used DESC LIMIT -1 OFFSET ?)", (keep,))
+
+    def flush(self):
+        """
+        Add the hits and misses counted since the last flush to the file's counters.
+        """
+        with self._lock:
+            self._flush_counters()
+
+    def _flush_counters(self):
+        if any(self._unflushed):
+            with self._transaction() as cursor:
+                self._write_counters(cursor)
+
+    def _write_counters(self, cursor):
+        """
+        Add the unflushed counters to the file's within a running transaction (most misses are followed by a store).
+        """
+        hits, misses = self._unflushed
+        if hits or misses:
+            cursor.execute("UPDATE meta SET value = value + ? WHERE name = 'hits'", (hits,))
+            cursor.execute("UPDATE meta SET value = value + ? WHERE name = 'misses'", (misses,))
+            self._unflushed = [0, 0]
+
+    def stats(self):
+        """
+        Return the file's statistics: positions, their depths and the hits of every process that flushed.
+        """
+        self.flush()
+        with self._lock:
+            connection = self._connection
+            meta = dict(connection.execute("SELECT name, value FROM meta"))
+            depths = dict(connection.execute("SELECT depth, COUNT(*) FROM moves GROUP BY depth ORDER BY depth"))
+        lookups = meta["hits"] + meta["misses"]
+        return {
+            "positions": sum(depths.values()),
+            "capacity": self.capacity,
+            "depths": depths,
+            "hits": meta["hits"],
+            "misses": meta["misses"],
+            "hit_rate": meta["hits"] / lookups if lookups else 0.0,
+            "bytes": sum(os.path.getsize(self.path + suffix) for suffix in ("", "-wal") if
+                         os.path.exists(self.path + suffix)),
+        }
+
+    def compact(self, capacity=None, min_depth=0):
+        """
+        Drop the positions searched less than `min_depth` deep, evict down to the capacity and
+        give the freed space back to the file system.
+        :param capacity: The new capacity (the current one when omitted).
+        """
+        if capacity is not None:
+            self.capacity = capacity
+        with self._lock:
+            with self._transaction() as cursor:
+                cursor.execute("DELETE FROM moves WHERE depth < ?", (min_depth,))
+                self._evict(cursor, self.capacity)
+            self._connection.execute("VACUUM")
+            self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def warm_up(self, engine, plies, depth=None, budget=None, progress=None):
+        """
+        Search every position of the first `plies` moves not cached deep enough yet, one of each
+        mirrored pair on odd widths, with a core.engine.Engine consulting this cache.
+        :param depth: The depth of the searches (the engine's when omitted).
+        :param budget: Milliseconds per search instead of a fixed depth.
+        :param progress: Optional function called with (positions done, positions in total).
+        :return: The number of positions searched.
+        """
+        from core.color_class import Color
+        from core.position import board_from_moves, format_moves
+
+        colors = (Color.RED, Color.WHITE)
+        positions = {}  # stored key -> move string
+        level = [""]
+        for ply in range(plies + 1):
+            next_level = []
+            for moves in level:
+                board = board_from_moves(moves, colors, self.rows, self.columns)
+                key, _ = self.key(board, colors[ply % 2])
+                if key in positions or board.check_last_move_victory() or board.is_full():
+                    continue
+                positions[key] = moves
+                next_level.extend(moves + format_moves([col]) for col in range(self.columns)
+                                  if board.get_element(0, col) == " ")
+            level = next_level
+        searched = 0
+        for done, moves in enumerate(positions.values(), start=1):
+            side = colors[len(moves) % 2]
+            board = board_from_moves(moves, colors, self.rows, self.columns)
+            if not self.contains(board, side, engine.depth if depth is None else depth):
+                engine.best_move(moves, side, budget, colors[1 - len(moves) % 2], depth)
+                searched += 1
+            if progress is not None:
+                progress(done, len(positions))
+        return searched
+
+
+def _signed(key):
+    """
+    SQLite integers are signed 64-bit: keys from 2**63 on are stored as negative numbers.
+    """
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class _Transaction:
+    """
+    An immediate transaction: the write lock is taken at once, so two writers never deadlock on an upgrade.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __enter__(self):
+        self._connection.execute("BEGIN IMMEDIATE")
+        return self._connection.cursor()
+
+    def __exit__(self, exc_type, *exc_info):
+        self._connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from core.engine import Engine
+
+    parser = argparse.ArgumentParser(description="Inspect, fill or compact a Connect Four move cache.")
+    parser.add_argument("cache", help="Cache file.")
+    parser.add_argument("command", choices=("stats", "warmup", "compact"))
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--columns", type=int, default=7)
+    parser.add_argument("--capacity", type=int, help="Positions kept at most.")
+    parser.add_argument("--plies", type=int, default=4, help="warmup: search the positions of this many first moves.")
+    parser.add_argument("--depth", type=int, default=8, help="warmup: depth of the searches.")
+    parser.add_argument("--budget", type=float, help="warmup: milliseconds per search instead of a fixed depth.")
+    parser.add_argument("--min-depth", type=int, default=0, help="compact: drop the shallower positions.")
+    arguments = parser.parse_args()
+
+    with MoveCache(arguments.cache, arguments.rows, arguments.columns,
+                   arguments.capacity or MoveCache.DEFAULT_CAPACITY) as cache:
+        if arguments.command == "warmup":
+            warm_engine = Engine(arguments.rows, arguments.columns, arguments.depth, move_cache=cache)
+            count = cache.warm_up(warm_engine, arguments.plies, budget=arguments.budget,
+                                  progress=lambda done, total: print(f"\r{done}/{total}", end="", flush=True))
+            print(f"\nSearched {count} positions")
+        elif arguments.command == "compact":
+            cache.compact(arguments.capacity, arguments.min_depth)
+        cache_stats = cache.stats()
+        print(f"{cache_stats['positions']} positions ({cache_stats['bytes']} bytes), "
+              f"{cache_stats['hits']} hits, {cache_stats['misses']} misses, hit rate {cache_stats['hit_rate']:.1%}")
+        print("depths:", ", ".join(f"{depth}: {count}" for depth, count in cache_stats["depths"].items()))
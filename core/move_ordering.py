@@ -0,0 +1,77 @@
+class MoveOrderer:
+    """
+    Decides in which order minimax tries the valid columns of a node.
+    This base class keeps the plain left-to-right order; subclasses plug in smarter orderings.
+    """
+
+    def order(self, board, valid_moves, maximizing_player, tt_move=None):
+        """
+        Return the columns in the order they should be searched.
+        :param board: The board of the node; its move count is the ply used to index per-ply tables.
+        :param valid_moves: The playable columns, left to right.
+        :param maximizing_player: True when the computer is the side to move.
+        :param tt_move: The best move stored in the transposition table for this node, if any.
+        """
+        return valid_moves
+
+    def record_cutoff(self, board, column, depth, maximizing_player):
+        """
+        Called when a move causes an alpha-beta cutoff.
+        """
+
+    def new_search(self):
+        """
+        Called at the start of every search of hard_difficulty.
+        """
+
+
+class HeuristicMoveOrderer(MoveOrderer):
+    """
+    Orders moves with the usual alpha-beta heuristics, from the most to the least trusted:
+    the transposition-table move, the two killer moves of the ply (moves that recently caused
+    a cutoff at the same ply), the history score of the column and finally center-first order.
+    """
+    KILLERS_PER_PLY = 2
+
+    def __init__(self):
+        self._killers = {}  # ply -> list of killer columns, most recent first
+        self._history = ({}, {})  # one table per side: column -> accumulated cutoff weight
+        self._center_rank = {}  # columns count -> {column: rank in center-out order}
+
+    def _center_ranks(self, columns):
+        ranks = self._center_rank.get(columns)
+        if ranks is None:
+            center = (columns - 1) / 2
+            ordered = sorted(range(columns), key=lambda col: (abs(col - center), col))
+            ranks = self._center_rank[columns] = {col: rank for rank, col in enumerate(ordered)}
+        return ranks
+
+    def order(self, board, valid_moves, maximizing_player, tt_move=None):
+        ranks = self._center_ranks(board.columns)
+        history = self._history[0 if maximizing_player else 1]
+        killers = self._killers.get(board.move_count, ())
+        ordered = sorted(valid_moves, key=lambda col: (-history.get(col, 0), ranks[col]))
+        for killer in reversed(killers):
+            if killer in ordered:
+                ordered.remove(killer)
+                ordered.insert(0, killer)
+        if tt_move is not None and tt_move in ordered:
+            ordered.remove(tt_move)
+            ordered.insert(0, tt_move)
+        return ordered
+
+    def record_cutoff(self, board, column, depth, maximizing_player):
+        killers = self._killers.setdefault(board.move_count, [])
+        if column in killers:
+            killers.remove(column)
+        killers.insert(0, column)
+        del killers[self.KILLERS_PER_PLY:]
+        history = self._history[0 if maximizing_player else 1]
+        history[column] = history.get(column, 0) + depth * depth
+
+    def new_search(self):
+        # killers are only meaningful inside one search, history is aged so recent cutoffs dominate
+        self._killers.clear()
+        for history in self._history:
+            for column in history:
+                history[column] //= 2
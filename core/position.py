@@ -0,0 +1,136 @@
+"""
+Compact encodings of a position: a 64-bit key and a move-sequence string.
+
+The key is the one of core.solver.Solver: the discs of the side to move plus the mask of all
+the discs, in the bitboard layout of core.board.Board. Adding the two sets one extra bit on
+top of every column, so the key alone gives back every disc and the side to move; keys of
+this module can be looked up in an opening book directly.
+The move string lists the columns played, one character each ("0"-"9", then "a"-"z").
+"""
+from core.board import Board
+from core.color_class import Color
+
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def check_key_size(rows, columns):
+    if columns * (rows + 1) > 64:
+        raise ValueError(f"A {rows}x{columns} board does not fit in a 64-bit key.")
+
+
+def first_player_color(board):
+    """
+    Color of the player who moved first, read from the bottom of the first column played.
+    """
+    history = board.history
+    if not history:
+        raise ValueError("The board has no move history, give the colors explicitly.")
+    return board.get_element(board.rows - 1, history[0])
+
+
+def position_key(board, first_color=None):
+    """
+    Return the 64-bit key of a board.
+    :param first_color: The color of the player who moved first (read from the history when omitted).
+    """
+    check_key_size(board.rows, board.columns)
+    mask = board.mask
+    if not mask:
+        return 0
+    if first_color is None:
+        first_color = first_player_color(board)
+    first = board.bitboard(first_color)
+    current = first if board.disc_count % 2 == 0 else mask ^ first
+    return current + mask
+
+
+def split_key(key, rows=6, columns=7):
+    """
+    Return (current, mask) of a key: the discs of the side to move and all the discs.
+    """
+    stride = rows + 1
+    column_bits = (1 << stride) - 1
+    current = mask = 0
+    for col in range(columns):
+        value = (key >> (col * stride)) & column_bits
+        height = (value + 1).bit_length() - 1
+        if height > rows:
+            raise ValueError(f"Invalid key for a {rows}x{columns} board: {key}")
+        column_mask = (1 << height) - 1
+        mask |= column_mask << (col * stride)
+        current |= (value - column_mask) << (col * stride)
+    return current, mask
+
+
+def mirror_key(key, rows=6, columns=7):
+    """
+    Return the key of the position mirrored left to right.
+    """
+    stride = rows + 1
+    column_bits = (1 << stride) - 1
+    mirrored = 0
+    for col in range(columns):
+        mirrored |= ((key >> (col * stride)) & column_bits) << ((columns - 1 - col) * stride)
+    return mirrored
+
+
+def canonical_key(key, rows=6, columns=7):
+    """
+    Return the smaller of a key and its mirror image's key: the same for both positions.
+    """
+    return min(key, mirror_key(key, rows, columns))
+
+
+def board_from_key(key, colors=(Color.RED, Color.WHITE), rows=6, columns=7):
+    """
+    Build the Board of a key. The discs are placed column by column, so the board's history is
+    not the order of the game (keep the move string for that).
+    :param colors: The colors of the first and of the second player.
+    """
+    check_key_size(rows, columns)
+    current, mask = split_key(key, rows, columns)
+    discs = bin(mask).count("1")
+    to_move, waiting = (colors[0], colors[1]) if discs % 2 == 0 else (colors[1], colors[0])
+    stride = rows + 1
+    board = Board(rows, columns)
+    for col in range(columns):
+        for height in range(rows):
+            bit = 1 << (col * stride + height)
+            if not mask & bit:
+                break
+            board.place_disc(col, to_move if current & bit else waiting)
+    return board
+
+
+def format_moves(columns):
+    """
+    Return the move string of a list of columns.
+    """
+    return "".join(_DIGITS[col] for col in columns)
+
+
+def position_moves(board):
+    """
+    Return the move string of a board's history.
+    """
+    return format_moves(board.history)
+
+
+def parse_moves(moves):
+    """
+    Return the list of columns of a move string.
+    """
+    try:
+        return [_DIGITS.index(character) for character in moves.lower()]
+    except ValueError:
+        raise ValueError(f"Invalid move string: {moves!r}") from None
+
+
+def board_from_moves(moves, colors=(Color.RED, Color.WHITE), rows=6, columns=7):
+    """
+    Replay a move string on an empty board, the players alternating from colors[0].
+    """
+    board = Board(rows, columns)
+    for index, col in enumerate(parse_moves(moves)):
+        board.place_disc(col, colors[index % 2])
+    return board
@@ -0,0 +1,245 @@
+import mmap
+import os
+import struct
+
+from core.position import check_key_size, format_moves, parse_moves
+
+
+class PositionStore:
+    """
+    Append-only file of games and positions, read through a memory map.
+
+    The file is a header followed by records. Every record is a fixed part, a position key
+    (see core.position), a score, a move and the length of a move list, followed by that many
+    column bytes:
+    - a POSITION record is a position with a score and a best move (NO_MOVE when unknown),
+      optionally with the moves that lead to it. The score is a whole number between MIN_SCORE
+      and MAX_SCORE, wide enough for the solver's and the minimax evaluation's scores; the
+      infinite scores of won and lost minimax positions have to be mapped to numbers first;
+    - a GAME record is a whole game: the key of its final position, its result from the point
+      of view of the first player (1 win, 0 draw, -1 loss) and all its moves.
+    Records are never rewritten, so the file can keep growing while others read it.
+
+    Lookups by key go through an index file next to the store (path + ".idx"), the sorted
+    (key, offset) pairs of the records it covers; records appended after the index was last
+    built are found by scanning the end of the store. Neither the store nor its index is ever
+    loaded as a whole: both are binary-searched and scanned in place.
+    """
+    MAGIC = b"C4PS"
+    HEADER = struct.Struct("<4sBBH")  # magic, rows, columns, format version
+    VERSION = 2  # version 1 had a single-byte score
+    RECORD = struct.Struct("<BQiBB")  # kind, key, score, move, number of moves that follow
+    MIN_SCORE = -2 ** 31
+    MAX_SCORE = 2 ** 31 - 1
+
+    INDEX_MAGIC = b"C4PI"
+    INDEX_HEADER = struct.Struct("<4sQQ")  # magic, bytes of the store covered, number of entries
+    INDEX_ENTRY = struct.Struct("<QQ")  # key, offset of the record
+
+    POSITION = 1
+    GAME = 2
+    NO_MOVE = 255
+
+    def __init__(self, path, rows=6, columns=7):
+        """
+        Open a store, creating it for this board geometry when the file does not exist.
+        """
+        check_key_size(rows, columns)
+        self.path = path
+        self.index_path = path + ".idx"
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as file:
+                file.write(self.HEADER.pack(self.MAGIC, rows, columns, self.VERSION))
+        with open(path, "rb") as file:
+            magic, self.rows, self.columns, version = self.HEADER.unpack(file.read(self.HEADER.size))
+        if magic != self.MAGIC:
+            raise ValueError(f"{path} is not a position store.")
+        if version != self.VERSION:
+            raise ValueError(f"{path} is a version {version} position store, not version {self.VERSION}.")
+        if (self.rows, self.columns) != (rows, columns):
+            raise ValueError(f"{path} stores {self.rows}x{self.columns} positions, not {rows}x{columns}.")
+        self._file = open(path, "ab")
+        self._data = None  # memory map of the store, remapped when the file has grown
+        self._index = None  # memory map of the index file
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._unmap()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _unmap(self):
+        for data in (self._data, self._index):
+            if data is not None:
+                data.close()
+        self._data = self._index = None
+
+    def _append(self, kind, key, score, move, moves):
+        columns = bytes(parse_moves(moves) if isinstance(moves, str) else moves)
+        if len(columns) > 255:
+            raise ValueError("A record holds at most 255 moves.")
+        if not isinstance(score, int) or not self.MIN_SCORE <= score <= self.MAX_SCORE:
+            raise ValueError(f"A record holds whole scores from {self.MIN_SCORE} to {self.MAX_SCORE}, not {score!r}.")
+        self._file.write(self.RECORD.pack(kind, key, score, self.NO_MOVE if move is None else move, len(columns)))
+        self._file.write(columns)
+
+    def append_position(self, key, score=0, best_move=None, moves=""):
+        """
+        :param score: A whole number from MIN_SCORE to MAX_SCORE.
+        :param moves: The moves leading to the position, as a move string or a list of columns (optional).
+        """
+        self._append(self.POSITION, key, score, best_move, moves)
+
+    def append_game(self, key, moves, result):
+        """
+        :param key: Key of the final position.
+        :param moves: The moves of the game, as a move string or a list of columns.
+        :param result: 1 if the first player won, 0 for a draw, -1 if the second player won.
+        """
+        self._append(self.GAME, key, result, None, moves)
+
+    def flush(self):
+        self._file.flush()
+
+    def _map(self):
+        """
+        Return a memory map of the whole store, flushing pending writes first.
+        """
+        self._file.flush()
+        size = os.path.getsize(self.path)
+        if self._data is None or len(self._data) != size:
+            # the old map is left to the scans still reading it
+            with open(self.path, "rb") as file:
+                self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._data
+
+    def _record(self, data, offset):
+        """
+        Decode the record at an offset.
+        :return: (kind, key, score, move, move string, offset of the next record)
+        """
+        kind, key, score, move, length = self.RECORD.unpack_from(data, offset)
+        start = offset + self.RECORD.size
+        moves = format_moves(data[start:start + length])
+        return kind, key, score, None if move == self.NO_MOVE else move, moves, start + length
+
+    def scan(self, start=None, kind=None):
+        """
+        Yield every record from an offset on, as (offset, kind, key, score, move, move string).
+        :param kind: Only yield records of this kind (POSITION or GAME).
+        """
+        data = self._map()
+        offset = self.HEADER.size if start is None else start
+        end = len(data)
+        while offset < end:
+            record_kind, key, score, move, moves, next_offset = self._record(data, offset)
+            if kind is None or record_kind == kind:
+                yield offset, record_kind, key, score, move, moves
+            offset = next_offset
+
+    def __iter__(self):
+        return self.scan()
+
+    def build_index(self):
+        """
+        Write the index of every record in the store, replacing the previous one.
+        """
+        entries = sorted((key, offset) for offset, _, key, _, _, _ in self.scan())
+        covered = len(self._map())
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        temporary = self.index_path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(self.INDEX_HEADER.pack(self.INDEX_MAGIC, covered, len(entries)))
+            for key, offset in entries:
+                file.write(self.INDEX_ENTRY.pack(key, offset))
+        os.replace(temporary, self.index_path)
+
+    def _map_index(self):
+        """
+        Return (memory map, bytes of the store covered, number of entries) of the index, or None without one.
+        """
+        if self._index is None:
+            if not os.path.exists(self.index_path):
+                return None
+            with open(self.index_path, "rb") as file:
+                self._index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, covered, count = self.INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != self.INDEX_MAGIC:
+            raise ValueError(f"{self.index_path} is not a position store index.")
+        return self._index, covered, count
+
+    def find(self, key, kind=None):
+        """
+        Return every record with this key, oldest first, as the tuples of scan.
+        """
+        data = self._map()
+        offsets = []
+        tail = self.HEADER.size
+        index = self._map_index()
+        if index is not None:
+            index_data, tail, count = index
+            entry_size = self.INDEX_ENTRY.size
+            base = self.INDEX_HEADER.size
+            low, high = 0, count
+            while low < high:  # first entry with this key
+                middle = (low + high) // 2
+                if self.INDEX_ENTRY.unpack_from(index_data, base + middle * entry_size)[0] < key:
+                    low = middle + 1
+                else:
+                    high = middle
+            while low < count:
+                entry_key, offset = self.INDEX_ENTRY.unpack_from(index_data, base + low * entry_size)
+                if entry_key != key:
+                    break
+                offsets.append(offset)
+                low += 1
+            offsets.sort()
+        records = []
+        for offset in offsets:
+            record_kind, record_key, score, move, moves, _ = self._record(data, offset)
+            if kind is None or record_kind == kind:
+                records.append((offset, record_kind, record_key, score, move, moves))
+        for record in self.scan(tail, kind):
+            if record[2] == key:
+                records.append(record)
+        return records
+
+    def get(self, key, kind=POSITION):
+        """
+        Return the latest record of a position, or None.
+        """
+        records = self.find(key, kind)
+        return records[-1] if records else None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or index a Connect Four position store.")
+    parser.add_argument("store", help="Store file.")
+    parser.add_argument("command", choices=("stats", "index"))
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--columns", type=int, default=7)
+    arguments = parser.parse_args()
+
+    with PositionStore(arguments.store, arguments.rows, arguments.columns) as store:
+        if arguments.command == "index":
+            store.build_index()
+            print(f"Indexed {arguments.store}")
+        else:
+            counts = {PositionStore.POSITION: 0, PositionStore.GAME: 0}
+            results = {1: 0, 0: 0, -1: 0}
+            for _, record_kind, _, record_score, _, _ in store.scan():
+                counts[record_kind] += 1
+                if record_kind == PositionStore.GAME:
+                    results[record_score] += 1
+            print(f"{counts[PositionStore.POSITION]} positions, {counts[PositionStore.GAME]} games "
+                  f"(first player: {results[1]} wins, {results[0]} draws, {results[-1]} losses)")
@@ -0,0 +1,50 @@
+class SearchOptions:
+    """
+    Switches of ComputerPlayer's search, each of which can be turned on or off on its own.
+
+    - negamax: search with the negamax core; off falls back to the classic two-branch alpha-beta,
+      which ignores the other switches.
+    - pvs: principal variation search; every move after the first is searched with a null window
+      around alpha and searched again with the full window only when it turns out better.
+    - aspiration: iterative deepening starts each iteration with a window of aspiration_window
+      points around the previous iteration's score, and widens it when the score falls outside.
+    - lmr: late-move reductions; from lmr_min_depth on, the moves after the first lmr_full_moves
+      are searched one ply shallower, and searched again at full depth when they raise alpha.
+    """
+    FLAGS = ("negamax", "pvs", "aspiration", "lmr")
+
+    def __init__(self, negamax=True, pvs=True, aspiration=True, lmr=False, aspiration_window=60, lmr_min_depth=3,
+                 lmr_full_moves=3):
+        self.negamax = negamax
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.lmr = lmr
+        self.aspiration_window = aspiration_window
+        self.lmr_min_depth = lmr_min_depth
+        self.lmr_full_moves = lmr_full_moves
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Build options from the defaults and a comma-separated list of switches, e.g. "+lmr,-aspiration".
+        A switch without a sign is turned on; "classic" turns the negamax core off.
+        """
+        options = cls()
+        for switch in filter(None, (part.strip() for part in text.split(","))):
+            if switch == "classic":
+                options.negamax = False
+                continue
+            enabled = not switch.startswith("-")
+            name = switch.lstrip("+-")
+            if name not in cls.FLAGS:
+                raise ValueError(f"Unknown search option: {switch}")
+            setattr(options, name, enabled)
+        return options
+
+    def __eq__(self, other):
+        return isinstance(other, SearchOptions) and vars(self) == vars(other)
+
+    def __repr__(self):
+        if not self.negamax:
+            return "classic"
+        return "+".join(["negamax"] + [name for name in self.FLAGS[1:] if getattr(self, name)])
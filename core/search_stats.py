@@ -0,0 +1,111 @@
+import json
+from time import perf_counter
+
+
+class SearchStats:
+    """
+    Counters of one call of ComputerPlayer.hard_difficulty.
+
+    The player only fills them in when statistics are enabled (ComputerPlayer.enable_stats);
+    otherwise it keeps no object at all and the search pays a single None check per node.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.cutoffs = 0
+        self.cutoffs_by_move = []  # cutoffs_by_move[i]: cutoffs caused by the i-th move searched (0 = first)
+        self.table_cutoffs = 0  # nodes answered by the transposition table without searching
+        self.max_depth = 0  # deepest ply below the root reached by the search
+        self.iterations = []  # per completed depth: {"depth", "seconds", "nodes", "score", "column"}
+        self.seconds = 0.0
+        self.table_hits = 0
+        self.table_misses = 0
+        self.timed_out = False
+        self.cache_hit = False  # the move came from the move cache, nothing was searched
+        self._start = None
+        self._root_moves = 0
+        self._table_counters = (0, 0)
+
+    def start(self, root_moves, transposition_table):
+        """
+        Mark the beginning of the search.
+        :param root_moves: Number of moves on the board at the root, so plies can be measured from it.
+        """
+        self._root_moves = root_moves
+        self._table_counters = (transposition_table.hits, transposition_table.misses)
+        self._start = perf_counter()
+
+    def finish(self, nodes, transposition_table):
+        self.seconds = perf_counter() - self._start
+        self.nodes = nodes
+        self.table_hits = transposition_table.hits - self._table_counters[0]
+        self.table_misses = transposition_table.misses - self._table_counters[1]
+
+    def record_leaf(self, move_count):
+        self.leaf_evaluations += 1
+        ply = move_count - self._root_moves
+        if ply > self.max_depth:
+            self.max_depth = ply
+
+    def record_cutoff(self, move_index):
+        self.cutoffs += 1
+        while len(self.cutoffs_by_move) <= move_index:
+            self.cutoffs_by_move.append(0)
+        self.cutoffs_by_move[move_index] += 1
+
+    def record_iteration(self, depth, nodes, score, column):
+        """
+        Record a completed depth; times and nodes are cumulative since the start of the search.
+        """
+        self.iterations.append({"depth": depth, "seconds": perf_counter() - self._start, "nodes": nodes,
+                                "score": score, "column": column})
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    @property
+    def table_hit_rate(self):
+        probes = self.table_hits + self.table_misses
+        return self.table_hits / probes if probes else 0.0
+
+    @property
+    def first_move_cutoff_rate(self):
+        """
+        Share of the cutoffs caused by the first move searched, a measure of the move ordering.
+        """
+        return self.cutoffs_by_move[0] / self.cutoffs if self.cutoffs else 0.0
+
+    def to_dict(self):
+        return {
+            "nodes": self.nodes,
+            "leaf_evaluations": self.leaf_evaluations,
+            "cutoffs": self.cutoffs,
+            "cutoffs_by_move": list(self.cutoffs_by_move),
+            "first_move_cutoff_rate": self.first_move_cutoff_rate,
+            "table_cutoffs": self.table_cutoffs,
+            "max_depth": self.max_depth,
+            "iterations": [dict(iteration) for iteration in self.iterations],
+            "seconds": self.seconds,
+            "nodes_per_second": self.nodes_per_second,
+            "table_hits": self.table_hits,
+            "table_misses": self.table_misses,
+            "table_hit_rate": self.table_hit_rate,
+            "timed_out": self.timed_out,
+            "cache_hit": self.cache_hit,
+        }
+
+    def to_json(self, **kwargs):
+        data = self.to_dict()
+        for iteration in data["iterations"]:
+            if iteration["score"] in (float("inf"), -float("inf")):
+                iteration["score"] = str(iteration["score"])  # "inf" / "-inf": JSON has no infinity
+        return json.dumps(data, **kwargs)
+
+    def __str__(self):
+        if self.cache_hit:
+            return f"move cache hit in {self.seconds * 1000:.1f} ms"
+        return (f"{self.nodes} nodes in {self.seconds * 1000:.1f} ms ({self.nodes_per_second:.0f} nps), "
+                f"depth {self.max_depth}, {self.leaf_evaluations} leaves, {self.cutoffs} cutoffs "
+                f"({self.first_move_cutoff_rate:.0%} on the first move), table hit rate {self.table_hit_rate:.0%}")
@@ -0,0 +1,331 @@
+import struct
+from array import array
+from bisect import bisect_left
+from time import perf_counter
+
+from core.board import line_completions
+from core.position import canonical_key
+from core.transposition import TranspositionTable
+from exceptions.exceptions import SearchTimeout
+
+
+class Solver:
+    """
+    Exact Connect Four solver working directly on bitboards.
+
+    A position is the pair (current, mask): the discs of the side to move and all the discs,
+    in the layout of core.board.Board (rows + 1 bits per column, bottom cell first).
+    Scores follow the usual convention: 0 is a draw, a positive score means the side to move
+    wins, and the earlier the win, the larger the score (number of its own discs it still has
+    left to play when the game ends, plus one).
+
+    The search is a negamax with alpha-beta pruning, never plays a move that lets the opponent
+    win at once, orders moves by the number of threats they create, caches upper bounds in a
+    transposition table and is driven by null-window probes that narrow down the exact score.
+    A position and its mirror image have the same score, so the table and the opening book are
+    keyed by canonical_key and hold each pair once.
+
+    Without an opening book, positions with few discs can take minutes to solve; give solve and
+    best_move a time budget to bound them.
+    """
+    TIME_CHECK_INTERVAL = 1024  # nodes searched between two looks at the clock
+
+    def __init__(self, rows=6, columns=7, opening_book=None, table_size=TranspositionTable.DEFAULT_SIZE):
+        self.rows = rows
+        self.columns = columns
+        self._stride = rows + 1
+        self._cells = rows * columns
+        self._bottom_mask = sum(1 << (col * self._stride) for col in range(columns))
+        self._board_mask = self._bottom_mask * ((1 << rows) - 1)
+        self._column_masks = [((1 << rows) - 1) << (col * self._stride) for col in range(columns)]
+        self._top_masks = [1 << (rows - 1 + col * self._stride) for col in range(columns)]
+        center = (columns - 1) / 2
+        self._column_order = sorted(range(columns), key=lambda col: (abs(col - center), col))
+        # (bits of column col, shift moving it to its mirror column) for the columns left of the center,
+        # extra top bit included since keys use it
+        stride_bits = (1 << self._stride) - 1
+        self._mirror_shifts = [(stride_bits << (col * self._stride), (columns - 1 - 2 * col) * self._stride)
+                               for col in range(columns // 2)]
+        self._center_bits = stride_bits << (columns // 2 * self._stride) if columns % 2 else 0
+        self._table = TranspositionTable(table_size)
+        self._book = opening_book
+        self._deadline = None
+        self.nodes = 0
+
+    @property
+    def transposition_table(self):
+        return self._table
+
+    def set_opening_book(self, opening_book):
+        self._book = opening_book
+
+    @staticmethod
+    def key(current, mask):
+        """
+        Unique number of a position: the bottom-filling trick sets one extra bit on top of every column.
+        """
+        return current + mask
+
+    def canonical_key(self, key):
+        """
+        The smaller of a key and the key of its mirror image.
+        """
+        mirrored = key & self._center_bits
+        for column_mask, shift in self._mirror_shifts:
+            mirrored |= (key & column_mask) << shift | (key >> shift) & column_mask
+        return min(key, mirrored)
+
+    def _winning_cells(self, position, mask):
+        """
+        Return the empty cells (playable now or not) where a disc would complete four for `position`.
+        """
+        return line_completions(position, self._stride) & (self._board_mask ^ mask)
+
+    def _possible(self, mask):
+        return (mask + self._bottom_mask) & self._board_mask
+
+    def can_win_next(self, current, mask):
+        return bool(self._winning_cells(current, mask) & self._possible(mask))
+
+    def _non_losing_moves(self, current, mask):
+        """
+        Playable cells that do not give the opponent an immediate win.
+        """
+        possible = self._possible(mask)
+        opponent_wins = self._winning_cells(current ^ mask, mask)
+        forced = possible & opponent_wins
+        if forced:
+            if forced & (forced - 1):
+                return 0  # two threats at once, the game is lost
+            possible = forced
+        return possible & ~(opponent_wins >> 1)  # never play right below an opponent's winning cell
+
+    def _negamax(self, current, mask, moves, alpha, beta):
+        self.nodes += 1
+        if self._deadline is not None and self.nodes % self.TIME_CHECK_INTERVAL == 0 \
+                and perf_counter() >= self._deadline:
+            raise SearchTimeout()
+        cells = self._cells
+        candidates = self._non_losing_moves(current, mask)
+        if not candidates:
+            return -((cells - moves) // 2)
+        if moves >= cells - 2:
+            return 0
+
+        lower = -((cells - 2 - moves) // 2)
+        if alpha < lower:
+            alpha = lower
+            if alpha >= beta:
+                return alpha
+        upper = (cells - 1 - moves) // 2
+        key = self.canonical_key(current + mask)
+        entry = self._table.probe(key)
+        if entry is not None:
+            upper = entry[1]
+        if beta > upper:
+            beta = upper
+            if alpha >= beta:
+                return beta
+
+        book = self._book
+        if book is not None and moves <= book.plies:
+            score = book.get(key)
+            if score is not None:
+                return score
+
+        scored_moves = []
+        for rank, col in enumerate(self._column_order):
+            move = candidates & self._column_masks[col]
+            if move:
+                threats = self._winning_cells(current | move, mask).bit_count()
+                scored_moves.append((-threats, rank, move))
+        scored_moves.sort()
+
+        opponent = current ^ mask
+        for _, _, move in scored_moves:
+            new_mask = mask | move
+            score = -self._negamax(opponent, new_mask, moves + 1, -beta, -alpha)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        self._table.store(key, 0, alpha, TranspositionTable.UPPER_BOUND)
+        return alpha
+
+    def solve(self, current, mask, moves=None, time_budget_ms=None):
+        """
+        Return the exact score of a position that is not already won.
+        :param current: Bitboard of the side to move.
+        :param mask: Bitboard of all the discs.
+        :param moves: Number of discs on the board (computed from mask when omitted).
+        :param time_budget_ms: When given, give up after this many milliseconds.
+        :raises SearchTimeout: The time budget ran out first.
+        """
+        if time_budget_ms is not None:
+            return self._bounded(time_budget_ms, self.solve, current, mask, moves)
+        if moves is None:
+            moves = mask.bit_count()
+        if self.can_win_next(current, mask):
+            return (self._cells + 1 - moves) // 2
+        lower = -((self._cells - moves) // 2)
+        upper = (self._cells + 1 - moves) // 2
+        while lower < upper:  # null-window probes until the bounds meet
+            middle = lower + (upper - lower) // 2
+            if middle <= 0 and lower // 2 < middle:
+                middle = lower // 2
+            elif middle >= 0 and upper // 2 > middle:
+                middle = upper // 2
+            result = self._negamax(current, mask, moves, middle, middle + 1)
+            if result <= middle:
+                upper = result
+            else:
+                lower = result
+        return lower
+
+    def _bounded(self, time_budget_ms, search, *arguments):
+        """
+        Run a search of this solver with a deadline.
+        """
+        self._deadline = perf_counter() + time_budget_ms / 1000
+        try:
+            return search(*arguments)
+        finally:
+            self._deadline = None
+
+    def best_move(self, current, mask, time_budget_ms=None):
+        """
+        Return (score, column) of the best move of the side to move; column is None on a full board.
+        Among moves with the same score the most central one is chosen.
+        :param time_budget_ms: When given, give up after this many milliseconds.
+        :raises SearchTimeout: The time budget ran out first.
+        """
+        if time_budget_ms is not None:
+            return self._bounded(time_budget_ms, self.best_move, current, mask)
+        moves = mask.bit_count()
+        possible = self._possible(mask)
+        winning = self._winning_cells(current, mask) & possible
+        columns = [col for col in self._column_order if possible & self._column_masks[col]]
+        for col in columns:
+            if winning & self._column_masks[col]:
+                return (self._cells + 1 - moves) // 2, col
+        best_score, best_column = None, None
+        for col in columns:
+            new_mask = mask | (possible & self._column_masks[col])
+            score = -self.solve(current ^ mask, new_mask, moves + 1)
+            if best_score is None or score > best_score:
+                best_score, best_column = score, col
+        return (best_score if best_score is not None else 0), best_column
+
+
+class OpeningBook:
+    """
+    Exact scores of every position reachable in the first `plies` moves of a board geometry.
+
+    On disk the book is a small header followed by the entries sorted by key, each entry being
+    an unsigned 64-bit position key (Solver.key) and a signed byte score. In memory it keeps the
+    same two packed arrays and looks positions up by binary search.
+    Only the canonical key of each position is stored (see Solver.canonical_key): a position and its
+    mirror image share one entry, and get accepts either key.
+    """
+    MAGIC = b"C4OB"
+    HEADER = struct.Struct("<4sBBBI")  # magic, rows, columns, plies, number of entries
+    ENTRY = struct.Struct("<Qb")
+
+    def __init__(self, rows, columns, plies, keys=None, scores=None):
+        self.rows = rows
+        self.columns = columns
+        self.plies = plies
+        self._keys = keys if keys is not None else array("Q")
+        self._scores = scores if scores is not None else array("b")
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get(self, key):
+        key = canonical_key(key, self.rows, self.columns)
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            return self._scores[index]
+        return None
+
+    @classmethod
+    def generate(cls, plies, rows=6, columns=7, solver=None, progress=None):
+        """
+        Solve every position of the first `plies` moves, one of each mirrored pair, and build a book from them.
+        Deeper positions are solved first, so the shallower ones reuse their results.
+        :param progress: Optional function called with (ply, positions solved, positions at this ply).
+        """
+        solver = solver if solver is not None else Solver(rows, columns)
+        levels = [{Solver.key(0, 0): (0, 0)}]  # per ply: canonical key -> (current, mask) of the reachable positions
+        for ply in range(plies):
+            next_level = {}
+            for current, mask in levels[ply].values():
+                possible = solver._possible(mask)
+                if solver.can_win_next(current, mask):
+                    continue  # every child of a position with a winning move is never searched
+                for col in range(columns):
+                    move = possible & solver._column_masks[col]
+                    if move:
+                        child = (current ^ mask, mask | move)
+                        next_level[solver.canonical_key(Solver.key(*child))] = child
+            levels.append(next_level)
+
+        entries = {}
+        book = None
+        for ply in range(plies, -1, -1):
+            positions = levels[ply]
+            for done, (key, (current, mask)) in enumerate(sorted(positions.items()), start=1):
+                entries[key] = solver.solve(current, mask, ply)
+                if progress is not None:
+                    progress(ply, done, len(positions))
+            book = cls._from_entries(rows, columns, plies, entries)
+            solver.set_opening_book(book)
+        return book
+
+    @classmethod
+    def _from_entries(cls, rows, columns, plies, entries):
+        keys = array("Q")
+        scores = array("b")
+        for key in sorted(entries):
+            keys.append(key)
+            scores.append(entries[key])
+        return cls(rows, columns, plies, keys, scores)
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            file.write(self.HEADER.pack(self.MAGIC, self.rows, self.columns, self.plies, len(self._keys)))
+            for key, score in zip(self._keys, self._scores):
+                file.write(self.ENTRY.pack(key, score))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, rows, columns, plies, count = cls.HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC:
+            raise ValueError(f"{path} is not an opening book.")
+        keys = array("Q")
+        scores = array("b")
+        for key, score in cls.ENTRY.iter_unpack(data[cls.HEADER.size:cls.HEADER.size + count * cls.ENTRY.size]):
+            keys.append(key)
+            scores.append(score)
+        return cls(rows, columns, plies, keys, scores)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a Connect Four opening book.")
+    parser.add_argument("output", help="File to write the book to.")
+    parser.add_argument("--plies", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--columns", type=int, default=7)
+    arguments = parser.parse_args()
+
+    def report(ply, done, total):
+        if done == total or done % 1000 == 0:
+            print(f"ply {ply}: {done}/{total}")
+
+    opening_book = OpeningBook.generate(arguments.plies, arguments.rows, arguments.columns, progress=report)
+    opening_book.save(arguments.output)
+    print(f"Saved {len(opening_book)} positions to {arguments.output}")
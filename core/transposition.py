@@ -0,0 +1,80 @@
+class TranspositionTable:
+    """
+    Fixed-size cache of searched positions, indexed by the board's Zobrist hash.
+
+    Every slot keeps a single entry ``(key, depth, score, flag, best_move, generation)``.
+    When two positions map to the same slot, the new entry replaces the old one if it
+    was searched at least as deep, or if the old one comes from an earlier search
+    (an older generation), so deep results survive while stale ones are recycled.
+    """
+    EXACT = 0
+    LOWER_BOUND = 1  # the real score is >= the stored score (beta cutoff)
+    UPPER_BOUND = 2  # the real score is <= the stored score (no move raised alpha)
+
+    DEFAULT_SIZE = 1 << 18
+
+    def __init__(self, size: int = DEFAULT_SIZE):
+        if size <= 0:
+            raise ValueError("The transposition table needs at least one slot.")
+        self._size = size
+        self._slots = [None] * size
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    def __len__(self):
+        return sum(1 for slot in self._slots if slot is not None)
+
+    def new_search(self):
+        """
+        Mark the start of a new search, making the entries of older searches replaceable.
+        """
+        self._generation += 1
+
+    def probe(self, key: int):
+        """
+        Look up a position.
+        :param key: Zobrist hash of the position.
+        :return: (depth, score, flag, best_move) or None when the position is not stored.
+        """
+        entry = self._slots[key % self._size]
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] != key:
+            self.collisions += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1], entry[2], entry[3], entry[4]
+
+    def store(self, key: int, depth: int, score: float, flag: int, best_move=None):
+        """
+        Store the result of searching a position, following the replacement policy.
+        """
+        index = key % self._size
+        entry = self._slots[index]
+        if entry is not None and entry[0] != key and entry[1] > depth and entry[5] == self._generation:
+            return
+        if entry is not None and entry[0] == key and best_move is None:
+            best_move = entry[4]
+        self._slots[index] = (key, depth, score, flag, best_move, self._generation)
+        self.stores += 1
+
+    def clear(self):
+        """
+        Drop every entry and reset the counters.
+        """
+        self._slots = [None] * self._size
+        self._generation = 0
+        self.hits = self.misses = self.collisions = self.stores = 0
+
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
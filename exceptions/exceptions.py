@@ -9,4 +9,11 @@ class OutOfBoundsExceptions(BoardException):
 
 class ColumnFilled(BoardException):
     def __init__(self):
-        super().__init__("Column is full!")
\ No newline at end of file
+        super().__init__("Column is full!")
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the computer's search when its time budget runs out.
+    """
+    def __init__(self):
+        super().__init__("The search ran out of time!")
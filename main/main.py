@@ -1,7 +1,6 @@
 from logging import exception
 
 from ui.ui import UI
-from ui.gui import ConnectFourGUI as GUI, main as gui_main
 from tests.tests import TestConnectFourApp
 import unittest
 
@@ -27,6 +26,7 @@ if __name__ == '__main__':
                 ui.run()
                 break
             elif choice == '2':
+                from ui.gui import main as gui_main  # pygame is only loaded when the GUI is chosen
                 gui_main()
             else:
                 raise ValueError("Invalid choice")
@@ -1,10 +1,35 @@
+import importlib.util
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
 from core.board import Board
 from core.player import Player
 from core.computer import ComputerPlayer
+from core.transposition import TranspositionTable
+from core.move_ordering import MoveOrderer, HeuristicMoveOrderer
+from core.solver import Solver, OpeningBook
+from core.search_options import SearchOptions
+from core.engine import Engine, EnginePool
+from core.mcts import MonteCarloTreeSearch
 from core.color_class import Color
 from application.game_manager import ConnectFourApp
-from exceptions.exceptions import ColumnFilled, OutOfBoundsExceptions
+from application.ai_worker import ComputerMoveWorker
+from application.ponder import Ponderer
+from application.scheduler import SearchScheduler, LevelPolicy
+from core.position import position_key, position_moves, board_from_key, board_from_moves, split_key
+from core.position_store import PositionStore
+from benchmarks.bench_engine import perft, compare
+from exceptions.exceptions import ColumnFilled, OutOfBoundsExceptions, SearchTimeout
+
+# main.main imports this module, so the modules loading NumPy, sqlite3, asyncio or multiprocessing
+# are imported inside the tests using them: starting the game must not pay for them
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
 
 class TestConnectFourApp(unittest.TestCase):
 
@@ -81,3 +106,872 @@ class TestConnectFourApp(unittest.TestCase):
         column = self.app.computer_player.hard_difficulty()
         self.assertIn(column, range(self.app.board.columns))
 
+
+
+class TestBoard(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up the test case with an empty standard board.
+        """
+        self.board = Board()
+
+    def test_mirror_hash_follows_the_mirror_image(self):
+        """
+        Test that the mirror hash is the hash of the mirrored board and that both images share a canonical hash.
+        """
+        for column, color in ((0, Color.RED), (1, Color.WHITE), (0, Color.RED), (5, Color.WHITE)):
+            self.board.place_disc(column, color)
+        mirrored = self.board.mirror()
+        self.assertEqual(mirrored.get_element(5, 6), Color.RED)
+        self.assertEqual(self.board.mirror_hash, mirrored.zobrist_hash)
+        self.assertEqual(self.board.canonical_hash, mirrored.canonical_hash)
+        self.board.undo_move(5)
+        mirrored.undo_move(1)
+        self.assertEqual(self.board.mirror_hash, mirrored.zobrist_hash)
+
+    def test_threat_map_matches_trial_moves(self):
+        """
+        Test that winning columns and threats agree with placing a disc and checking for a victory.
+        """
+        random.seed(7)
+        for _ in range(200):
+            board = Board()
+            for _ in range(random.randint(0, 30)):
+                columns = [col for col in range(board.columns) if board.get_element(0, col) == ' ']
+                board.place_disc(random.choice(columns), random.choice((Color.RED, Color.WHITE)))
+            for color in (Color.RED, Color.WHITE):
+                expected = []
+                for col in range(board.columns):
+                    if board.get_element(0, col) == ' ':
+                        board.place_disc(col, color)
+                        if board.check_last_move_victory():
+                            expected.append(col)
+                        board.undo_move(col)
+                self.assertEqual(board.winning_columns(color), expected)
+                for row, col in board.threats(color):
+                    self.assertEqual(board.get_element(row, col), ' ')
+                    board.add_element(row, col, color)
+                    self.assertTrue(board.check_victory(color))
+                    board.add_element(row, col, ' ')
+
+    def test_place_disc_fills_from_bottom(self):
+        """
+        Test that discs stack from the bottom row (the last row index) upwards.
+        """
+        self.board.place_disc(3, Color.RED)
+        self.board.place_disc(3, Color.WHITE)
+        self.assertEqual(self.board.get_element(5, 3), Color.RED)
+        self.assertEqual(self.board.get_element(4, 3), Color.WHITE)
+        self.assertEqual(self.board[3][3], ' ')
+        with self.assertRaises(TypeError):  # rows are snapshots, a write must not be silently lost
+            self.board[5][3] = Color.WHITE
+
+    def test_undo_move_restores_board(self):
+        """
+        Test that undo_move removes the topmost disc and frees the column again.
+        """
+        for _ in range(self.board.rows):
+            self.board.place_disc(0, Color.RED)
+        self.board.undo_move(0)
+        self.assertEqual(self.board.get_element(0, 0), ' ')
+        self.assertEqual(self.board.get_element(1, 0), Color.RED)
+        self.board.place_disc(0, Color.WHITE)
+        self.assertEqual(self.board.get_element(0, 0), Color.WHITE)
+
+    def test_is_full(self):
+        """
+        Test that the board is only full once every column is filled.
+        """
+        for col in range(self.board.columns):
+            for row in range(self.board.rows):
+                self.assertFalse(self.board.is_full())
+                self.board.place_disc(col, Color.RED if (row + col // 2) % 2 else Color.WHITE)
+        self.assertTrue(self.board.is_full())
+
+    def test_victory_on_custom_size(self):
+        """
+        Test that victories are detected on boards that are not 6x7, without wrapping between columns.
+        """
+        board = Board(rows=4, columns=9)
+        for col in range(3):
+            board.place_disc(col, Color.RED)
+        board.place_disc(3, Color.WHITE)
+        for _ in range(3):
+            board.place_disc(8, Color.RED)
+        self.assertFalse(board.check_victory(Color.RED))
+        board.place_disc(6, Color.RED)
+        board.place_disc(7, Color.RED)
+        board.place_disc(7, Color.RED)
+        for col in range(5, 9):
+            board.place_disc(col, Color.WHITE)
+        self.assertTrue(board.check_victory(Color.WHITE))
+
+    def test_last_move_victory_matches_full_scan(self):
+        """
+        Test that the last-move victory check agrees with the full-board scan over random games.
+        """
+        rng = random.Random(2)
+        for _ in range(50):
+            board = Board()
+            colors = (Color.RED, Color.WHITE)
+            while not board.is_full():
+                col = rng.choice([c for c in range(board.columns) if board.get_element(0, c) == ' '])
+                color = colors[board.move_count % 2]
+                board.place_disc(col, color)
+                self.assertEqual(board.check_last_move_victory(), board.check_victory(color))
+                if board.check_victory(color):
+                    break
+
+    def test_undo_move_restores_last_move(self):
+        """
+        Test that undoing a move makes the previous move the last one again.
+        """
+        self.board.place_disc(2, Color.RED)
+        self.board.place_disc(4, Color.WHITE)
+        self.assertEqual(self.board.last_move, (5, 4))
+        self.board.undo_move(4)
+        self.assertEqual(self.board.last_move, (5, 2))
+        self.board.undo_move(2)
+        self.assertIsNone(self.board.last_move)
+        self.assertFalse(self.board.check_last_move_victory())
+
+    def test_zobrist_hash_is_incremental(self):
+        """
+        Test that the Zobrist hash depends only on the position, not on the move order, and is restored by undo.
+        """
+        other = Board()
+        self.board.place_disc(1, Color.RED)
+        self.board.place_disc(2, Color.WHITE)
+        other.place_disc(2, Color.WHITE)
+        other.place_disc(1, Color.RED)
+        self.assertEqual(self.board.zobrist_hash, other.zobrist_hash)
+        self.board.undo_move(2)
+        self.board.undo_move(1)
+        self.assertEqual(self.board.zobrist_hash, Board().zobrist_hash)
+
+
+class TestComputerSearch(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up the test case with a midgame position and a computer player on it.
+        """
+        self.board = Board()
+        for col in (3, 3, 2, 4, 4, 2, 5):
+            self.board.place_disc(col, Color.RED if self.board.move_count % 2 == 0 else Color.WHITE)
+        self.computer = ComputerPlayer(self.board)
+
+    def test_transposition_table_keeps_scores(self):
+        """
+        Test that searching with the transposition table gives the same score as searching without it.
+        """
+        no_table = ComputerPlayer(self.board, TranspositionTable(1))
+        expected, _ = no_table.minimax(self.board, 4, -float("inf"), float("inf"), True, Color.RED)
+        score, _ = self.computer.minimax(self.board, 4, -float("inf"), float("inf"), True, Color.RED)
+        self.assertEqual(score, expected)
+
+    def test_transposition_table_persists_between_moves(self):
+        """
+        Test that the table keeps its entries between two hard_difficulty calls and gets hits from them.
+        """
+        self.computer.hard_difficulty(3)
+        stored = len(self.computer.transposition_table)
+        hits = self.computer.transposition_table.hits
+        self.computer.hard_difficulty(3)
+        self.assertGreater(stored, 0)
+        self.assertGreater(self.computer.transposition_table.hits, hits)
+
+    def test_time_budget_search(self):
+        """
+        Test that a time-budgeted search returns a valid move, leaves the board untouched and reports its depth.
+        """
+        moves = self.board.move_count
+        position = self.board.zobrist_hash
+        start = time.perf_counter()
+        column = self.computer.hard_difficulty(time_budget_ms=100)
+        elapsed = time.perf_counter() - start
+        self.assertTrue(self.computer.is_valid_move(column))
+        self.assertGreaterEqual(self.computer.last_search_depth, 1)
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(self.board.move_count, moves)
+        self.assertEqual(self.board.zobrist_hash, position)
+
+    def test_move_ordering_reduces_nodes(self):
+        """
+        Test that heuristic move ordering finds the same score as left-to-right order with fewer nodes.
+        """
+        plain = ComputerPlayer(self.board, TranspositionTable(1), MoveOrderer())
+        ordered = ComputerPlayer(self.board, TranspositionTable(1))
+        expected, _ = plain.minimax(self.board, 5, -float("inf"), float("inf"), True, Color.RED)
+        score, _ = ordered.minimax(self.board, 5, -float("inf"), float("inf"), True, Color.RED)
+        self.assertEqual(score, expected)
+        self.assertLess(ordered.nodes_searched, plain.nodes_searched)
+
+    def test_center_first_order(self):
+        """
+        Test that without any cutoff history the columns are ordered from the center out.
+        """
+        orderer = HeuristicMoveOrderer()
+        self.assertEqual(orderer.order(Board(), list(range(7)), True), [3, 2, 4, 1, 5, 0, 6])
+
+    def test_incremental_evaluation_matches_full_scan(self):
+        """
+        Test that the incremental evaluator gives the same scores as the full-board scan while playing and undoing.
+        """
+        rng = random.Random(7)
+        board = Board()
+        computer = ComputerPlayer(board)
+        for _ in range(20):
+            while not board.is_full():
+                col = rng.choice([c for c in range(board.columns) if computer.is_valid_move(c)])
+                board.place_disc(col, rng.choice((Color.WHITE, Color.RED, Color.BLUE)))
+                self.assertEqual(computer.evaluate_board(board), computer.evaluate_board_full(board))
+            while board.move_count:
+                board.undo_move(board.last_move[1])
+            self.assertEqual(computer.evaluate_board(board), computer.evaluate_board_full(board))
+
+    def test_parallel_search_picks_sequential_move(self):
+        """
+        Test that splitting the root moves across processes returns the move of the sequential search,
+        immediate wins and forced blocks included.
+        """
+        expected = ComputerPlayer(self.board).hard_difficulty(5)
+        parallel = ComputerPlayer(self.board, workers=2)
+        try:
+            self.assertEqual(parallel.hard_difficulty(5), expected)
+        finally:
+            parallel.close()
+        # a win in one for WHITE, and a threat of RED that WHITE must block
+        for moves, column in (("31036415362103246", 5), ("06162", 3)):
+            board = board_from_moves(moves, (Color.RED, Color.WHITE))
+            players = [ComputerPlayer(board, opponent_color=Color.RED, workers=workers) for workers in (1, 2)]
+            try:
+                for player in players:
+                    player.set_color(Color.WHITE)
+                    self.assertEqual(player.hard_difficulty(4), column, moves)
+            finally:
+                players[1].close()
+
+    def test_parallel_search_breaks_ties_like_sequential(self):
+        """
+        Test that the parallel search plays the sequential move, not just one with the same score,
+        on random positions where root moves tie.
+        """
+        rng = random.Random(3)
+        positions = [("56", 4), ("2523", 4), ("216631", 4), ("252656554", 3), ("12", 5), ("0662120", 5)]
+        while len(positions) < 30:
+            board, moves = Board(), ""
+            for _ in range(rng.randrange(14)):
+                col = rng.choice([col for col in range(board.columns) if board.get_element(0, col) == ' '])
+                board.place_disc(col, (Color.RED, Color.WHITE)[len(moves) % 2])
+                moves += str(col)
+                if board.check_last_move_victory():
+                    break
+            if not board.check_last_move_victory():
+                positions.append((moves, rng.choice((3, 4, 5))))
+        for moves, depth in positions:
+            board = board_from_moves(moves, (Color.RED, Color.WHITE))
+            color, opponent = (Color.RED, Color.WHITE) if len(moves) % 2 == 0 else (Color.WHITE, Color.RED)
+            players = [ComputerPlayer(board, opponent_color=opponent, workers=workers) for workers in (1, 2)]
+            try:
+                results = []
+                for player in players:
+                    player.set_color(color)
+                    results.append((player.hard_difficulty(depth), player.last_search_depth))
+                self.assertEqual(results[1], results[0], (moves, depth))
+            finally:
+                players[1].close()
+
+    def test_move_worker_can_be_cancelled(self):
+        """
+        Test that a background search stopped early still returns a valid move and leaves the board as it was.
+        """
+        position = self.board.zobrist_hash
+        worker = ComputerMoveWorker(self.computer)
+        worker.start(3, Color.RED, time_budget_ms=60000)
+        self.assertIsNone(worker.poll())
+        worker.cancel()
+        worker.wait(5)
+        column = worker.poll()
+        self.assertTrue(self.computer.is_valid_move(column))
+        self.assertEqual(self.board.zobrist_hash, position)
+
+    def test_stopped_fixed_depth_search_keeps_deepest_move(self):
+        """
+        Test that a fixed-depth search stopped early plays the move of its deepest finished iteration.
+        """
+        player = ComputerPlayer(Board())
+        timer = threading.Timer(0.2, player.request_stop)
+        timer.start()
+        column = player.hard_difficulty(10)
+        timer.join()
+        depth = player.last_search_depth
+        self.assertTrue(1 <= depth < 10)
+        self.assertEqual(column, ComputerPlayer(Board()).hard_difficulty(depth))
+
+    def test_search_statistics(self):
+        """
+        Test that enabled statistics describe the search and that disabled ones are not kept.
+        """
+        self.assertIsNone(self.computer.stats)
+        self.computer.enable_stats()
+        self.computer.hard_difficulty(time_budget_ms=200)
+        stats = self.computer.stats
+        self.assertEqual(stats.nodes, self.computer.nodes_searched)
+        self.assertEqual(sum(stats.cutoffs_by_move), stats.cutoffs)
+        self.assertEqual([iteration["depth"] for iteration in stats.iterations],
+                         list(range(1, self.computer.last_search_depth + 1)))
+        self.assertGreaterEqual(stats.max_depth, self.computer.last_search_depth)
+        self.assertGreater(stats.leaf_evaluations, 0)
+        self.assertEqual(json.loads(stats.to_json())["nodes"], stats.nodes)
+        self.computer.enable_stats(False)
+        self.computer.hard_difficulty(2)
+        self.assertIsNone(self.computer.stats)
+
+
+    @unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+    def test_batch_evaluation_matches_evaluate_board(self):
+        """
+        Test that the vectorized evaluator gives the scores of evaluate_board, for a batch and for the children
+        of a node, full columns left out.
+        """
+        from core.batch_eval import BatchEvaluator
+        boards = [Board(), self.board]
+        random.seed(3)
+        for _ in range(20):
+            board = Board()
+            for _ in range(random.randint(1, 30)):
+                columns = [col for col in range(board.columns) if board.get_element(0, col) == ' ']
+                board.place_disc(random.choice(columns), random.choice((Color.RED, Color.WHITE, Color.GREEN)))
+            boards.append(board)
+        evaluator = BatchEvaluator.for_player(self.computer, self.board)
+        scores = evaluator.evaluate(evaluator.encode_many(boards))
+        self.assertEqual([int(score) for score in scores], [self.computer.evaluate_board_full(board) for board in boards])
+
+        children = self.computer.evaluate_children(Color.RED)
+        for col, score in children.items():
+            self.board.place_disc(col, Color.RED)
+            self.assertEqual(score, self.computer.evaluate_board(self.board))
+            self.board.undo_move(col)
+        self.assertEqual(len(children), self.board.columns)
+
+        full = Board()
+        for row in range(full.rows):
+            full.place_disc(0, (Color.RED, Color.WHITE)[row % 2])
+        columns, batch = evaluator.expand_children(full, Color.RED, [0, 1, 2])
+        self.assertEqual((columns, len(batch)), ([1, 2], 2))
+        self.assertNotIn(0, ComputerPlayer(full).evaluate_children(Color.RED))
+
+    def test_mirrored_position_shares_table_entries(self):
+        """
+        Test that the mirror image of a searched position is answered from the table, with the move mirrored.
+        """
+        score, column = self.computer.minimax(self.board, 4, -float("inf"), float("inf"), True, Color.RED)
+        mirrored = self.board.mirror()
+        player = ComputerPlayer(mirrored, self.computer.transposition_table)
+        hits = self.computer.transposition_table.hits
+        self.assertEqual(player.minimax(mirrored, 4, -float("inf"), float("inf"), True, Color.RED),
+                         (score, mirrored.mirror_column(column)))
+        self.assertGreater(self.computer.transposition_table.hits, hits)
+
+    def test_negamax_matches_classic_search(self):
+        """
+        Test that the negamax core, with and without null-window searches, scores like the classic alpha-beta.
+        """
+        for depth in range(1, 6):
+            classic = ComputerPlayer(self.board, search_options=SearchOptions(negamax=False))
+            expected, _ = classic.minimax(self.board, depth, -float("inf"), float("inf"), True, Color.RED)
+            for options in (SearchOptions(pvs=False), SearchOptions()):
+                player = ComputerPlayer(self.board, search_options=options)
+                score, _ = player.minimax(self.board, depth, -float("inf"), float("inf"), True, Color.RED)
+                self.assertEqual(score, expected, f"{options!r} at depth {depth}")
+
+    def test_search_options_from_text(self):
+        """
+        Test the command-line form of the search options, alone and in a strategy.
+        """
+        from application.self_play import parse_strategy, strategy_name
+        options = SearchOptions.parse("+lmr,-aspiration")
+        self.assertEqual((options.negamax, options.pvs, options.aspiration, options.lmr), (True, True, False, True))
+        self.assertEqual(SearchOptions.parse("classic"), SearchOptions(negamax=False))
+        self.assertRaises(ValueError, SearchOptions.parse, "+nullmove")
+        self.assertEqual(strategy_name(parse_strategy("hard:2:classic")), "hard(options=classic, depth=2)")
+
+    def test_pondered_answer_is_reused(self):
+        """
+        Test that pondering answers every reply and that the real search agrees with the pondered answer.
+        """
+        self.board.place_disc(self.computer.hard_difficulty(3), self.computer.color)
+        ponderer = Ponderer(self.computer)
+        ponderer.start(self.board, Color.RED)
+        deadline = time.time() + 30
+        while ponderer.is_pondering and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(ponderer.answers_ready, self.board.columns)
+        self.board.place_disc(0, Color.RED)
+        column = ponderer.take(self.board)
+        self.assertEqual((ponderer.hits, ponderer.answers_ready), (1, 0))
+        self.assertEqual(self.computer.hard_difficulty(3), column)
+
+    def test_pondering_stops_when_the_opponent_moves(self):
+        """
+        Test that an unfinished pondering search is dropped quickly and leaves the real board alone.
+        """
+        position = self.board.zobrist_hash
+        ponderer = Ponderer(self.computer)
+        ponderer.start(self.board, Color.RED, time_budget_ms=60000)
+        time.sleep(0.05)
+        start = time.time()
+        self.assertIsNone(ponderer.take(self.board))
+        self.assertLess(time.time() - start, 1)
+        self.assertFalse(ponderer.is_pondering)
+        self.assertEqual(self.board.zobrist_hash, position)
+
+
+class TestEngine(unittest.TestCase):
+
+    def test_computer_blocks_any_opponent_color(self):
+        """
+        Test that the hard computer blocks a three in a row of a human not playing RED.
+        """
+        board = board_from_moves("0516", colors=(Color.GREEN, Color.WHITE))
+        computer = ComputerPlayer(board, opponent_color=Color.GREEN)
+        computer.set_color(Color.WHITE)
+        board.place_disc(2, Color.GREEN)
+        self.assertEqual(computer.hard_difficulty(3), 3)
+
+    def test_best_move_on_snapshots(self):
+        """
+        Test that a Board, its key and its move string get the same move, and that the Board is left untouched.
+        """
+        engine = Engine()
+        board = board_from_moves("33425")
+        position = board.zobrist_hash
+        column = engine.best_move(board, Color.WHITE)
+        self.assertEqual(board.zobrist_hash, position)
+        self.assertEqual(engine.best_move(position_key(board), Color.WHITE), column)
+        self.assertEqual(engine.best_move("33425", Color.WHITE), column)
+        self.assertEqual(engine.best_move("33425", Color.BLUE, opponent_color=Color.PINK), column)
+        with self.assertRaises(ValueError):
+            engine.best_move("3344556", Color.WHITE)
+
+    def test_pool_shared_by_threads(self):
+        """
+        Test that threads sharing a pool get the moves of a single engine.
+        """
+        positions = ["3", "334", "12361504611", "2233"]
+        sides = [Color.WHITE if len(moves) % 2 else Color.RED for moves in positions]
+        expected = [Engine().best_move(moves, side) for moves, side in zip(positions, sides)]
+        pool = EnginePool(2)
+        results = [None] * len(positions)
+
+        def search(index):
+            results[index] = pool.best_move(positions[index], sides[index])
+
+        threads = [threading.Thread(target=search, args=(index,)) for index in range(len(positions))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, expected)
+        with pool.engine(), pool.engine():
+            self.assertRaises(TimeoutError, pool.best_move, "3", Color.WHITE, timeout=0.01)
+
+
+class TestMoveCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "moves.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_mirrored_lookup_and_eviction(self):
+        """
+        Test that a position answers its mirror image, that shallow entries are not used and that the least
+        recently used positions are evicted.
+        """
+        from core.move_cache import MoveCache
+        with MoveCache(self.path, capacity=3) as cache:
+            board = board_from_moves("1")
+            cache.store(board, Color.WHITE, 2, 5.0, 4)
+            self.assertEqual(cache.lookup(board_from_moves("5"), Color.WHITE, 4), (4, 5.0, 4))
+            self.assertIsNone(cache.lookup(board, Color.WHITE, 5))
+            for moves in ("0", "2", "3"):
+                cache.store(board_from_moves(moves), Color.WHITE, 3, 0.0, 4)
+                cache.lookup(board, Color.WHITE, 1)  # keeps "1" the most recently used
+            self.assertLessEqual(len(cache), 3)
+            self.assertIsNotNone(cache.lookup(board, Color.WHITE, 1))
+            self.assertIsNone(cache.lookup(board_from_moves("0"), Color.WHITE, 1))
+
+    def test_even_width_positions_are_not_mirrored(self):
+        """
+        Test that on an even number of columns, where the search is not symmetric, a position does not answer its mirror image.
+        """
+        from core.move_cache import MoveCache
+        with MoveCache(self.path, rows=6, columns=8) as cache:
+            board = board_from_moves("1", rows=6, columns=8)
+            cache.store(board, Color.WHITE, 2, 5.0, 4)
+            self.assertFalse(cache.key(board, Color.WHITE)[1])
+            self.assertIsNone(cache.lookup(board_from_moves("6", rows=6, columns=8), Color.WHITE, 4))
+            self.assertEqual(cache.lookup(board, Color.WHITE, 4), (2, 5.0, 4))
+
+    def test_computer_reuses_cached_searches(self):
+        """
+        Test that a new player finds a searched position in the cache, counted in the file across reopenings,
+        and that its statistics report the hit instead of an earlier search.
+        """
+        from core.move_cache import MoveCache
+        board = board_from_moves("33425")
+        with MoveCache(self.path) as cache:
+            computer = ComputerPlayer(board, move_cache=cache)
+            column = computer.hard_difficulty(4)
+            self.assertGreater(computer.nodes_searched, 0)
+        with MoveCache(self.path) as cache:
+            computer = ComputerPlayer(board, move_cache=cache, collect_stats=True)
+            self.assertEqual(computer.hard_difficulty(4), column)
+            self.assertEqual(computer.nodes_searched, 0)
+            self.assertEqual((computer.stats.cache_hit, computer.stats.nodes), (True, 0))
+            computer.hard_difficulty(5)
+            self.assertGreater(computer.nodes_searched, 0)
+            self.assertFalse(computer.stats.cache_hit)
+            cache.compact(min_depth=5)
+            stats = cache.stats()
+        self.assertEqual((stats["positions"], stats["depths"]), (1, {5: 1}))
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+
+class TestSolver(unittest.TestCase):
+
+    def test_solve_takes_immediate_win(self):
+        """
+        Test that the perfect-play mode plays a winning move and reports a positive score.
+        """
+        board = Board()
+        for col in (0, 6, 0, 6, 0, 5):
+            board.place_disc(col, Color.WHITE if col == 0 else Color.RED)
+        computer = ComputerPlayer(board)
+        score, column = computer.solve()
+        self.assertEqual(column, 0)
+        self.assertGreater(score, 0)
+
+    def test_solve_blocks_opponent(self):
+        """
+        Test that the perfect-play mode blocks a threat it cannot beat with a win of its own.
+        """
+        board = Board(rows=4, columns=5)
+        for col, color in ((0, Color.RED), (4, Color.WHITE), (1, Color.RED), (4, Color.WHITE), (2, Color.RED)):
+            board.place_disc(col, color)
+        score, column = ComputerPlayer(board).solve()
+        self.assertEqual(column, 3)
+        self.assertLessEqual(score, 0)
+
+    def test_early_solve_is_bounded(self):
+        """
+        Test that an early position the solver cannot finish in time still gets a move quickly, from the search.
+        """
+        board = board_from_moves("33333322", (Color.WHITE, Color.RED))
+        computer = ComputerPlayer(board, opponent_color=Color.RED)
+        computer.set_color(Color.WHITE)
+        start = time.perf_counter()
+        score, column = computer.solve(time_budget_ms=100)
+        self.assertLess(time.perf_counter() - start, 2)
+        self.assertIsNone(score)
+        self.assertTrue(computer.is_valid_move(column))
+        self.assertRaises(SearchTimeout, Solver().solve, 0, 0, None, 50)
+
+    def test_opening_book_round_trip(self):
+        """
+        Test that a generated opening book is saved and loaded without loss and agrees with the solver.
+        """
+        book = OpeningBook.generate(2, rows=4, columns=4)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.bin")
+            book.save(path)
+            loaded = OpeningBook.load(path)
+        self.assertEqual(len(loaded), len(book))
+        self.assertEqual((loaded.rows, loaded.columns, loaded.plies), (4, 4, 2))
+        self.assertEqual(loaded.get(Solver.key(0, 0)), Solver(4, 4).solve(0, 0))
+
+    def test_opening_book_holds_one_position_per_mirrored_pair(self):
+        """
+        Test that the book stores canonical keys only and answers for both mirror images.
+        """
+        book = OpeningBook.generate(2, rows=3, columns=5)
+        self.assertEqual(len(book), 1 + 3 + 13)  # 25 positions at ply 2, 13 of them distinct up to mirroring
+        board = board_from_moves("01", rows=3, columns=5)
+        key = position_key(board)
+        self.assertEqual(book.get(key), book.get(position_key(board.mirror(), Color.RED)))
+        self.assertEqual(book.get(key), Solver(3, 5).solve(*split_key(key, 3, 5)))
+
+
+class TestMonteCarlo(unittest.TestCase):
+
+    def test_monte_carlo_wins_and_blocks(self):
+        """
+        Test that the tree search plays an immediate win, and blocks a threat it cannot beat.
+        """
+        board = Board()
+        for col in (0, 6, 0, 6, 0, 5):
+            board.place_disc(col, Color.WHITE if col == 0 else Color.RED)
+        computer = ComputerPlayer(board)
+        self.assertEqual(computer.monte_carlo(playouts=100), 0)
+        board = Board(rows=4, columns=5)
+        for col, color in ((0, Color.RED), (4, Color.WHITE), (1, Color.RED), (4, Color.WHITE), (2, Color.RED)):
+            board.place_disc(col, color)
+        search = MonteCarloTreeSearch(4, 5, seed=1)
+        self.assertEqual(search.best_move(board.bitboard(Color.WHITE), board.mask, playouts=500), 3)
+        self.assertEqual(search.playouts, 500)
+
+    def test_tree_reuse_stop_and_workers(self):
+        """
+        Test that the tree is kept after a move and its reply, that a stop request ends the search
+        after one playout with a legal move, and that the helper processes' playouts are counted.
+        """
+        from application.self_play import parse_strategy, strategy_name
+        board = Board()
+        search = MonteCarloTreeSearch(seed=2)
+        board.place_disc(search.best_move(0, 0, playouts=2000), Color.WHITE)
+        board.place_disc(3, Color.RED)
+        search.best_move(board.bitboard(Color.WHITE), board.mask, playouts=10)
+        self.assertGreater(search.reused, 0)
+        computer = ComputerPlayer(board, opponent_color=Color.RED)
+        computer.set_color(Color.WHITE)
+        computer.request_stop()  # cleared when the search starts
+        computer.monte_carlo(playouts=10)
+        self.assertEqual(computer.nodes_searched, 10)
+        self.assertTrue(computer.is_valid_move(search.best_move(0, 0, playouts=1000, stop=lambda: True)))
+        self.assertEqual(search.playouts, 1)
+        parallel = MonteCarloTreeSearch(workers=2)
+        try:
+            self.assertIn(parallel.best_move(0, 0, playouts=200), range(7))
+            self.assertEqual(parallel.playouts, 200)
+        finally:
+            parallel.close()
+        self.assertEqual(strategy_name(parse_strategy("mcts:t50")), "mcts(time_budget_ms=50.0)")
+
+
+class TestSelfPlay(unittest.TestCase):
+
+    def test_play_game_until_the_end(self):
+        """
+        Test that a headless game is played to a win or a full board.
+        """
+        from application.self_play import play_game, easy_strategy
+        result = play_game(easy_strategy, easy_strategy, seed=3)
+        self.assertIn(result["winner"], (0, 1, None))
+        self.assertEqual(sum(result["moves_played"]), result["moves"])
+
+    def test_run_match_totals(self):
+        """
+        Test that a match counts every game once and that the searching strategy reports its nodes.
+        """
+        from application.self_play import run_match, easy_strategy, parse_strategy
+        result = run_match(easy_strategy, parse_strategy("hard:2"), 4)
+        self.assertEqual(result.wins + result.draws + result.losses, 4)
+        self.assertEqual(result.names, ("easy", "hard(depth=2)"))
+        self.assertEqual(result.nodes[0], 0)
+        self.assertGreater(result.nodes_per_second(1), 0)
+
+
+class TestPositionEncoding(unittest.TestCase):
+
+    def test_key_and_moves_round_trip(self):
+        """
+        Test that a board survives the key and the move string, and that the key is the solver's key.
+        """
+        board = board_from_moves("3342156")
+        key = position_key(board)
+        self.assertEqual(position_moves(board), "3342156")
+        self.assertEqual(key, Solver.key(board.bitboard(Color.WHITE), board.mask))
+        self.assertEqual(split_key(key), (board.bitboard(Color.WHITE), board.mask))
+        rebuilt = board_from_key(key)
+        for row in range(board.rows):
+            self.assertEqual(rebuilt[row], board[row])
+        self.assertEqual(position_key(rebuilt, Color.RED), key)
+        self.assertEqual(position_key(Board()), 0)
+
+    def test_store_lookup_with_and_without_index(self):
+        """
+        Test that records are found by key before and after indexing, including records appended after the index.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "positions.c4ps")
+            with PositionStore(path) as store:
+                for moves in ("3", "33", "334", "3342"):
+                    store.append_position(position_key(board_from_moves(moves)), len(moves), 3, moves)
+                store.append_game(position_key(board_from_moves("3344556")), "3344556", 1)
+                key = position_key(board_from_moves("334"))
+                self.assertEqual(store.get(key)[3:], (3, 3, "334"))
+                store.build_index()
+                store.append_position(key, -2, 5)
+                store.append_position(key, -1940, 2)  # a minimax score
+                for score in (2 ** 31, float("inf")):
+                    with self.assertRaises(ValueError):
+                        store.append_position(key, score, 2)
+                self.assertEqual([record[3] for record in store.find(key)], [3, -2, -1940])
+                self.assertEqual(len(list(store.scan(kind=PositionStore.GAME))), 1)
+            with PositionStore(path) as store:
+                self.assertEqual(store.get(key)[3:5], (-1940, 2))
+                self.assertIsNone(store.get(position_key(board_from_moves("0"))))
+            with self.assertRaises(ValueError):
+                PositionStore(path, 7, 8)
+
+    def test_self_play_archive(self):
+        """
+        Test that archived self-play games replay to their stored key and result.
+        """
+        from application.self_play import run_match, easy_strategy
+        with tempfile.TemporaryDirectory() as directory:
+            with PositionStore(os.path.join(directory, "games.c4ps")) as store:
+                match = run_match(easy_strategy, easy_strategy, 3, archive=store)
+                games = list(store.scan(kind=PositionStore.GAME))
+        self.assertEqual(len(games), match.games)
+        for _, _, key, result, _, moves in games:
+            board = board_from_moves(moves)
+            self.assertEqual(position_key(board), key)
+            self.assertEqual(result != 0, board.check_last_move_victory())
+
+
+class TestGameServer(unittest.TestCase):
+
+    def test_game_over_tcp(self):
+        """
+        Test a hard game and the error replies over a real connection, then a few load-generator games.
+        """
+        import asyncio
+        from application.server import GameServer
+        from benchmarks.bench_server import run_load
+
+        async def scenario():
+            async with GameServer(workers=1, time_budget_ms=20) as server:
+                reader, writer = await asyncio.open_connection(server.host, server.port)
+
+                async def command(line):
+                    writer.write(line.encode("ascii") + b"\n")
+                    return (await reader.readline()).decode("ascii").strip()
+
+                replies = [await command(line) for line in ("PING", "NEW 3", "MOVE 1 3", "MOVE 1 7", "MOVE 9 0")]
+                writer.close()
+                await writer.wait_closed()
+                report = await run_load(server.host, server.port, clients=3, games=1, difficulty=2)
+                return replies, server.stats(), report
+
+        replies, stats, report = asyncio.run(scenario())
+        self.assertEqual(replies[:2], ["PONG", "SESSION 1"])
+        self.assertRegex(replies[2], r"^MOVED [0-6] playing$")
+        self.assertTrue(replies[3].startswith("ERR illegal-move"))
+        self.assertTrue(replies[4].startswith("ERR unknown-session"))
+        self.assertEqual(stats["searches"], 1)
+        self.assertEqual((report.games, report.errors), (3, 0))
+
+    def test_backpressure_and_expiry(self):
+        """
+        Test that moves, and games the computer opens, are refused, unplayed, when the search queue is full,
+        and that idle sessions are dropped.
+        """
+        import asyncio
+        from application.server import GameServer
+
+        async def scenario():
+            async with GameServer(workers=1, max_pending=0, session_timeout=0.1) as server:
+                session = (await server.handle("NEW 3")).split()[1]
+                refused = await server.handle(f"MOVE {session} 3")
+                board = await server.handle(f"BOARD {session}")
+                refused_new = await server.handle("NEW 3 computer")
+                sessions = len(server.sessions)
+                await asyncio.sleep(0.3)
+                return refused, board, refused_new, sessions, await server.handle(f"BOARD {session}"), server.stats()
+
+        refused, board, refused_new, sessions, expired, stats = asyncio.run(scenario())
+        self.assertTrue(refused.startswith("ERR busy"))
+        self.assertEqual(board, "BOARD ")
+        self.assertTrue(refused_new.startswith("ERR busy"))
+        self.assertEqual(sessions, 1)
+        self.assertTrue(expired.startswith("ERR unknown-session"))
+        self.assertEqual((stats["rejected"], stats["expired"]), (2, 1))
+
+
+class TestSearchScheduler(unittest.TestCase):
+
+    def test_budgets_follow_the_queue(self):
+        """
+        Test that the budgets shrink as searches pile up, within the level's bounds, and grow back once they finish.
+        """
+        scheduler = SearchScheduler(slots=2, target_latency_ms=400, policies={3: LevelPolicy(4, 50, 300)})
+        self.assertIsNone(scheduler.acquire(2))
+        grants = [scheduler.acquire(3) for _ in range(20)]
+        self.assertEqual([grant.time_budget_ms for grant in grants[:4]], [300, 300, 800 / 3, 200])
+        self.assertEqual(grants[-1].time_budget_ms, 50)
+        self.assertEqual(scheduler.queue_depth, 20)
+        for grant in grants:
+            scheduler.release(grant)
+        metrics = scheduler.metrics()
+        self.assertEqual((metrics["queue_depth"], metrics["peak_queue_depth"], metrics["grants"]), (0, 20, 20))
+        self.assertEqual((metrics["granted_ms_min"], metrics["granted_ms_max"]), (50, 300))
+        self.assertEqual(scheduler.acquire(3).time_budget_ms, 300)
+
+    def test_minimum_depth_under_load(self):
+        """
+        Test that a hard search keeps the level's minimum depth even when the load leaves it almost no time.
+        """
+        scheduler = SearchScheduler(policies={3: LevelPolicy(min_depth=4, min_ms=1, max_ms=1)})
+        board = Board()
+        for col, color in ((3, Color.RED), (3, Color.WHITE), (2, Color.RED), (4, Color.WHITE)):
+            board.place_disc(col, color)
+        player = ComputerPlayer(board)
+        player.set_color(Color.WHITE)
+        column = scheduler.play(player, 3, Color.RED)
+        self.assertTrue(player.is_valid_move(column))
+        self.assertGreaterEqual(player.last_search_depth, 4)
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_engine_and_text_ui_do_not_load_pygame(self):
+        """
+        Test that the engine, the text UI and the game manager can be imported without pygame being loaded.
+        """
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(
+            [sys.executable, "-c", "import sys, core.computer, ui.ui, application.game_manager; "
+                                   "print('pygame' in sys.modules)"],
+            cwd=root, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+    def test_tests_do_not_load_optional_modules(self):
+        """
+        Test that importing the tests, as main.main does, loads neither NumPy nor the server's and cache's modules.
+        """
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(
+            [sys.executable, "-c", "import sys, tests.tests; print(sorted(name for name in "
+                                   "('numpy', 'sqlite3', 'asyncio', 'multiprocessing') if name in sys.modules))"],
+            cwd=root, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "[]")
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_perft_counts(self):
+        """
+        Test the perft node counts from the empty board, where no game can end in the first 4 plies.
+        """
+        self.assertEqual([perft(Board(), depth) for depth in range(1, 5)], [7, 49, 343, 2401])
+
+    def test_compare_flags_regressions(self):
+        """
+        Test that compare reports slower timings and changed perft counts, but not faster ones.
+        """
+        baseline = {"results": {"opening/minimax_d3": {"seconds": 0.010, "nodes": 100},
+                                "opening/perft_d2": {"seconds": 0.010, "nodes": 49},
+                                "opening/is_full": {"seconds": 0.010}}}
+        current = {"results": {"opening/minimax_d3": {"seconds": 0.020, "nodes": 100},
+                               "opening/perft_d2": {"seconds": 0.010, "nodes": 48},
+                               "opening/is_full": {"seconds": 0.005}}}
+        regressions = compare(current, baseline, threshold=0.10)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("opening/minimax_d3"))
+        self.assertTrue(regressions[1].startswith("opening/perft_d2"))
@@ -1,10 +1,13 @@
 import pygame
 import sys
 import os
+from time import perf_counter
 from core.board import Board
 from core.player import Player
 from core.computer import ComputerPlayer
 from core.color_class import Color
+from application.ai_worker import ComputerMoveWorker
+from application.ponder import Ponderer
 from exceptions.exceptions import ColumnFilled, OutOfBoundsExceptions
 
 # Constants
@@ -13,6 +16,9 @@ SCREEN_HEIGHT = 600
 CELL_SIZE = 100
 RADIUS = CELL_SIZE // 2 - 5
 FONT_SIZE = 30
+FPS = 30
+MIN_THINKING_MS = 500  # the computer never answers faster than this, so its move can be followed
+COMPUTER_TIMEOUT_MS = 10000  # after this the search is stopped and its best move so far is played
 
 # Colors
 WHITE = (255, 255, 255)
@@ -32,9 +38,31 @@ COLOR_OPTIONS = {
     5: YELLOW
 }
 
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()  # Initialize the mixer for playing sounds
+# Screen and font, created by init_display() when the GUI is actually started
+screen = None
+font = None
+
+
+def init_display():
+    """
+    Initialize pygame, the mixer, the window and the font.
+    Nothing is initialized at import time, so importing this module costs no window or audio setup.
+    """
+    global screen, font
+    if screen is not None:
+        return
+    pygame.init()
+    try:
+        pygame.mixer.init()  # Initialize the mixer for playing sounds
+    except pygame.error:
+        pass  # no audio device, the game is silent anyway
+
+    # Create the screen
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Connect Four")
+
+    # Fonts
+    font = pygame.font.SysFont("monospace", FONT_SIZE)
 
 
 
@@ -56,33 +84,52 @@ except pygame.error as e:
     print(f"Error loading sound files: {e}")
     sys.exit()"""
 
-# Create the screen
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Connect Four")
-
-# Fonts
-font = pygame.font.SysFont("monospace", FONT_SIZE)
-
 
 class ConnectFourGUI:
-    def __init__(self):
+    def __init__(self, workers=1, ponder=False):
+        """
+        :param workers: Number of processes the computer may use for its hard difficulty search.
+        :param ponder: Let the hard computer search on the human's time (see application.ponder).
+        """
         self.board = Board()
+        self.workers = workers
+        self.ponder = ponder
+        self.ponderer = None
         self.human_player = None
         self.computer_player = None
         self.current_player = None
         self.difficulty = None
         self.is_running = True
         self.game_over = False
+        self._worker = None
+        self._snapshot = None  # copy of the board shown while the search plays moves on the real one
+
+    @property
+    def thinking(self):
+        return self._worker is not None
+
+    @property
+    def thinking_ms(self):
+        return self._worker.elapsed_ms if self._worker is not None else 0.0
+
+    @property
+    def display_board(self):
+        """
+        The board to draw: while the computer thinks, the position from before its search.
+        """
+        return self._snapshot if self._snapshot is not None else self.board
 
     def setup_game(self, player_color, difficulty):
         """
         Set up the game: assign colors and initialize players.
         """
         self.human_player = Player(self.board, player_color)
-        self.computer_player = ComputerPlayer(self.board)
+        self.computer_player = ComputerPlayer(self.board, workers=self.workers, opponent_color=player_color)
         self.computer_player.set_color(WHITE)  # Set computer player color to white
         self.current_player = self.human_player
         self.difficulty = difficulty
+        if self.ponder and difficulty == 3:
+            self.ponderer = Ponderer(self.computer_player)
 
     def play_turn(self, column):
         """
@@ -109,6 +156,45 @@ class ConnectFourGUI:
         except (ColumnFilled, OutOfBoundsExceptions):  # Handle errors gracefully
             pass
 
+    def start_computer_turn(self):
+        """
+        Start computing the computer's move in the background.
+        """
+        self._snapshot = self.board.copy()
+        self._worker = ComputerMoveWorker(self.computer_player, timeout_ms=COMPUTER_TIMEOUT_MS)
+        column = self.ponderer.take(self.board) if self.ponderer is not None else None
+        if column is not None:
+            self._worker.start_with_result(column)
+        else:
+            self._worker.start(self.difficulty, self.human_player.color)
+
+    def poll_computer_turn(self):
+        """
+        Play the computer's move if its search is over.
+        :return: True when the move was played, False while the computer is still thinking.
+        """
+        if self._worker is None or self._worker.elapsed_ms < MIN_THINKING_MS:
+            return False
+        column = self._worker.poll()
+        if column is None:
+            return False
+        self._worker = None
+        self._snapshot = None
+        try:
+            self.board.place_disc(column, self.computer_player.color)
+        except (ColumnFilled, OutOfBoundsExceptions):  # Handle errors gracefully
+            pass
+        if self.ponderer is not None:
+            self.ponderer.start(self.board, self.human_player.color)
+        return True
+
+    def cancel_computer_turn(self):
+        """
+        Make the computer play its best move found so far right away.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+
     def switch_player(self):
         """
         Switch the current player between the human and computer.
@@ -123,48 +209,132 @@ class ConnectFourGUI:
         """
         if self.board.check_victory(self.current_player.color):
             self.game_over = True
+            self.stop_pondering()
             return True
         if self.board.is_full():
             self.game_over = True
+            self.stop_pondering()
             return False
         return False
 
+    def stop_pondering(self):
+        if self.ponderer is not None:
+            self.ponderer.stop()
+
 
-def draw_board(board, human_color, computer_color):
+class BoardRenderer:
     """
-    Draw the Connect Four board on the screen.
+    Draws the board by redrawing only what changed since the previous frame.
+
+    The grey board with its black holes is drawn once on a cached surface. A frame compares every
+    cell with what was drawn last time, restores the changed cells from the cached surface, draws
+    their disc, and returns the rectangles that changed so only those are pushed to the display.
+    An optional overlay (a text label) is drawn on top, and the cells under it are refreshed
+    whenever it moves, changes or disappears.
     """
-    vertical_offset = (SCREEN_HEIGHT - (board.rows * CELL_SIZE)) // 2
-    for row in range(board.rows):
-        for col in range(board.columns):
-            pygame.draw.rect(
-                screen,
-                GREY,
-                (col * CELL_SIZE, vertical_offset + row * CELL_SIZE, CELL_SIZE, CELL_SIZE),
-            )
-            pygame.draw.circle(
-                screen,
-                BLACK,
-                (col * CELL_SIZE + CELL_SIZE // 2, vertical_offset + row * CELL_SIZE + CELL_SIZE // 2),
-                RADIUS,
-            )
-    for row in range(board.rows):
-        for col in range(board.columns):
-            if board.get_element(row, col) == human_color:
-                pygame.draw.circle(
-                    screen,
-                    human_color,
-                    (col * CELL_SIZE + CELL_SIZE // 2, vertical_offset + row * CELL_SIZE + CELL_SIZE // 2),
-                    RADIUS,
-                )
-            elif board.get_element(row, col) == computer_color:
-                pygame.draw.circle(
-                    screen,
-                    computer_color,
-                    (col * CELL_SIZE + CELL_SIZE // 2, vertical_offset + row * CELL_SIZE + CELL_SIZE // 2),
-                    RADIUS,
-                )
-    pygame.display.update()
+
+    def __init__(self, surface, rows, columns):
+        self._surface = surface
+        self._rows = rows
+        self._columns = columns
+        self._vertical_offset = (SCREEN_HEIGHT - (rows * CELL_SIZE)) // 2
+        self._background = pygame.Surface((columns * CELL_SIZE, rows * CELL_SIZE))
+        self._background.fill(GREY)
+        for row in range(rows):
+            for col in range(columns):
+                pygame.draw.circle(self._background, BLACK,
+                                   (col * CELL_SIZE + CELL_SIZE // 2, row * CELL_SIZE + CELL_SIZE // 2), RADIUS)
+        self._drawn = None  # cell colors of the last frame, None forces a full redraw
+        self._overlay_rect = None
+        self.frames = 0
+        self.last_frame_ms = 0.0
+        self.total_frame_ms = 0.0
+
+    def invalidate(self):
+        """
+        Force the next frame to redraw the whole board (after something else drew on the screen).
+        """
+        self._drawn = None
+
+    def _cell_rect(self, row, col):
+        return pygame.Rect(col * CELL_SIZE, self._vertical_offset + row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+
+    def render(self, board, human_color, computer_color, overlay=None, overlay_position=None):
+        """
+        Draw a frame.
+        :param overlay: Surface drawn over the board (e.g. the thinking indicator), or None.
+        :param overlay_position: Top-left corner of the overlay.
+        :return: The list of screen rectangles that changed.
+        """
+        start = perf_counter()
+        full_redraw = self._drawn is None
+        if full_redraw:
+            self._surface.blit(self._background, (0, self._vertical_offset))
+            self._drawn = [[' '] * self._columns for _ in range(self._rows)]
+        overlay_rect = overlay.get_rect(topleft=overlay_position) if overlay is not None else None
+        stale_areas = [rect for rect in (self._overlay_rect, overlay_rect) if rect is not None]
+
+        dirty = []
+        for row in range(self._rows):
+            drawn_row = self._drawn[row]
+            for col in range(self._columns):
+                element = board.get_element(row, col)
+                rect = self._cell_rect(row, col)
+                if element == drawn_row[col] and not full_redraw and rect.collidelist(stale_areas) == -1:
+                    continue
+                self._surface.blit(self._background, rect, rect.move(0, -self._vertical_offset))
+                if element == human_color or element == computer_color:
+                    pygame.draw.circle(self._surface, element, rect.center, RADIUS)
+                drawn_row[col] = element
+                dirty.append(rect)
+
+        if overlay is not None:
+            self._surface.blit(overlay, overlay_rect)
+            dirty.append(overlay_rect)
+        self._overlay_rect = overlay_rect
+        if full_redraw:
+            dirty = [pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)]
+
+        self.frames += 1
+        self.last_frame_ms = (perf_counter() - start) * 1000
+        self.total_frame_ms += self.last_frame_ms
+        return dirty
+
+    @property
+    def average_frame_ms(self):
+        return self.total_frame_ms / self.frames if self.frames else 0.0
+
+
+_renderer = None
+
+
+def _board_renderer(board):
+    global _renderer
+    if _renderer is None or (_renderer._rows, _renderer._columns) != (board.rows, board.columns):
+        _renderer = BoardRenderer(screen, board.rows, board.columns)
+    return _renderer
+
+
+def draw_board(board, human_color, computer_color, update=True, overlay=None, overlay_position=None):
+    """
+    Draw the Connect Four board on the screen, redrawing only the cells that changed.
+    :param update: Push the changed rectangles to the display right away.
+    :return: The list of changed rectangles.
+    """
+    dirty = _board_renderer(board).render(board, human_color, computer_color, overlay, overlay_position)
+    if update and dirty:
+        pygame.display.update(dirty)
+    return dirty
+
+
+def thinking_label(elapsed_ms):
+    """
+    Render the "thinking" indicator, with dots that move while the computer searches.
+    :return: (label surface, top-left position)
+    """
+    dots = "." * (int(elapsed_ms // 400) % 3 + 1)
+    label = font.render(f"Thinking{dots:<3}", True, WHITE, BLACK)
+    return label, (SCREEN_WIDTH // 2 - label.get_width() // 2, 5)
 
 
 def show_menu():
@@ -201,7 +371,7 @@ def show_menu():
     difficulty = None
 
     while player_color is None or difficulty is None:
-        for event in pygame.event.get():
+        for event in [pygame.event.wait()] + pygame.event.get():  # sleep until something happens
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -218,41 +388,58 @@ def show_menu():
 
 
 def main():
+    init_display()
+
     # Show menu to get player preferences
     player_color, difficulty = show_menu()
 
     # Initialize game
-    game = ConnectFourGUI()
+    game = ConnectFourGUI(ponder=True)
     game.setup_game(player_color=player_color, difficulty=difficulty)
 
+    clock = pygame.time.Clock()
+    _board_renderer(game.board).invalidate()  # the menu was drawn over the board
+    draw_board(game.board, game.human_player.color, game.computer_player.color)
     running = True
     while running:
-        draw_board(game.board, game.human_player.color, game.computer_player.color)
-        for event in pygame.event.get():
+        if game.thinking or game.current_player == game.computer_player and not game.game_over:
+            events = pygame.event.get()  # animate the indicator and poll the search
+        else:
+            events = [pygame.event.wait()] + pygame.event.get()  # idle: sleep until the player acts
+        for event in events:
             if event.type == pygame.QUIT:
+                game.cancel_computer_turn()
+                game.stop_pondering()
                 pygame.quit()
                 sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN and not game.game_over:
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                game.cancel_computer_turn()  # the computer plays its best move so far
+            if event.type == pygame.MOUSEBUTTONDOWN and not game.game_over \
+                    and game.current_player == game.human_player:
                 pos_x = event.pos[0]
                 col = pos_x // CELL_SIZE
                 if 0 <= col < game.board.columns:  # Ensure column is valid
                     if game.play_turn(col):
                         if game.check_game_over():
-                            draw_board(game.board, game.human_player.color, game.computer_player.color)
                             pygame.mixer.stop()
                             #pygame.mixer.Sound.play(win_sound)
                         else:
                             game.switch_player()
 
         if game.current_player == game.computer_player and not game.game_over:
-            pygame.time.wait(500)  # Simulate thinking
-            game.computer_turn()
-            if game.check_game_over():
-                draw_board(game.board, game.human_player.color, game.computer_player.color)
-                pygame.mixer.stop()
-                #pygame.mixer.Sound.play(lose_sound)
-            else:
-                game.switch_player()
+            # the search runs on a worker thread, the loop keeps drawing frames meanwhile
+            if not game.thinking:
+                game.start_computer_turn()
+            elif game.poll_computer_turn():
+                if game.check_game_over():
+                    pygame.mixer.stop()
+                    #pygame.mixer.Sound.play(lose_sound)
+                else:
+                    game.switch_player()
+
+        overlay, overlay_position = thinking_label(game.thinking_ms) if game.thinking else (None, None)
+        draw_board(game.display_board, game.human_player.color, game.computer_player.color,
+                   overlay=overlay, overlay_position=overlay_position)
 
         if game.game_over:
             text = "Draw!" if game.board.is_full() else (
@@ -263,7 +450,12 @@ def main():
             )
             screen.blit(label, (SCREEN_WIDTH // 2 - label.get_width() // 2, CELL_SIZE // 2))
             pygame.display.update()
-            pygame.time.wait(10000)
+            # keep the result on screen for 10 seconds, still answering to the window being closed
+            deadline = pygame.time.get_ticks() + 10000
+            while pygame.time.get_ticks() < deadline:
+                # a timeout of 0 would wait forever, so at least 1 ms when the deadline passes meanwhile
+                if pygame.event.wait(max(1, deadline - pygame.time.get_ticks())).type == pygame.QUIT:
+                    break
             running = False
 
-
+        clock.tick(FPS)
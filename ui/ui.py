@@ -22,7 +22,7 @@ class UI:
         """
         Initialize the UI and the game manager.
         """
-        self._game = ConnectFourApp()
+        self._game = ConnectFourApp(ponder=True)
 
     @staticmethod
     def display_welcome():